@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import time
+
+ARCSTATS_PATH = '/proc/spl/kstat/zfs/arcstats'
+MEMINFO_PATH = '/proc/meminfo'
+
+# Cumulative arcstats counters, reported as delta between two snapshots
+ARC_COUNTERS = [
+    'hits', 'misses',
+    'demand_data_hits', 'demand_data_misses',
+    'demand_metadata_hits', 'demand_metadata_misses',
+    'prefetch_data_hits', 'prefetch_data_misses',
+    'prefetch_metadata_hits', 'prefetch_metadata_misses',
+    'deleted', 'evict_skip', 'mutex_miss', 'memory_throttle_count',
+]
+# arcstats gauges, reported as start / end / change
+ARC_GAUGES = ['size', 'c', 'mru_size', 'mfu_size', 'data_size',
+              'metadata_size']
+# /proc/meminfo gauges (kB -> bytes)
+MEMINFO_GAUGES = ['MemFree', 'MemAvailable', 'Buffers', 'Cached']
+
+
+def parse_arcstats(output):
+    '''
+    Parse /proc/spl/kstat/zfs/arcstats
+
+    | 13 1 0x01 123 33456 5405263735 38496839284921   <- kstat header
+    | name                            type data
+    | hits                            4    1234567
+
+    Return {name: int}
+    '''
+    stats = {}
+    for line in output.splitlines():
+        fields = line.split()
+        if len(fields) != 3 or fields[0] == 'name':
+            continue
+        try:
+            stats[fields[0]] = int(fields[2])
+        except ValueError:
+            continue
+    return stats
+
+
+def parse_meminfo(output):
+    '''
+    Parse /proc/meminfo, return {name: bytes}
+    '''
+    stats = {}
+    for line in output.splitlines():
+        name, _, value = line.partition(':')
+        fields = value.split()
+        if not fields or not fields[0].isdigit():
+            continue
+        scale = 1024 if fields[1:] == ['kB'] else 1
+        stats[name.strip()] = int(fields[0]) * scale
+    return stats
+
+
+class ArcSnapshot(object):
+    '''
+    arcstats / meminfo values read at one phase boundary
+    '''
+
+    def __init__(self, label, arcstats, meminfo, timestamp=None):
+        self.label = label
+        self.arcstats = arcstats
+        self.meminfo = meminfo
+        self.time = timestamp or time.time()
+
+    def to_dict(self):
+        return {'label': self.label, 'time': self.time,
+                'arcstats': self.arcstats, 'meminfo': self.meminfo}
+
+
+def _ratio(hits, misses):
+    total = hits + misses
+    return round(hits / total, 4) if total else None
+
+
+def arc_delta(start, end):
+    '''
+    Compare two ArcSnapshot
+
+    Return dict
+    | duration:  seconds between snapshots
+    | counters:  {counter: end - start} (hits, misses, prefetch, evictions)
+    | gauges:    {gauge: {'start', 'end', 'change'}} (ARC size, meminfo)
+    | hit_ratio / demand_data_hit_ratio / prefetch_data_hit_ratio
+    | evictions: ARC buffers evicted (deleted counter)
+    '''
+    counters = {name: end.arcstats[name] - start.arcstats[name]
+                for name in ARC_COUNTERS
+                if name in start.arcstats and name in end.arcstats}
+    gauges = {}
+    for prefix, names, before, after in (
+            ('arc', ARC_GAUGES, start.arcstats, end.arcstats),
+            ('mem', MEMINFO_GAUGES, start.meminfo, end.meminfo)):
+        for name in names:
+            if name in before and name in after:
+                gauges[f'{prefix}_{name}'] = {
+                    'start': before[name], 'end': after[name],
+                    'change': after[name] - before[name]}
+
+    return {
+        'start': start.label,
+        'end': end.label,
+        'duration': round(end.time - start.time, 1),
+        'counters': counters,
+        'gauges': gauges,
+        'hit_ratio': _ratio(counters.get('hits', 0),
+                            counters.get('misses', 0)),
+        'demand_data_hit_ratio': _ratio(
+            counters.get('demand_data_hits', 0),
+            counters.get('demand_data_misses', 0)),
+        'prefetch_data_hit_ratio': _ratio(
+            counters.get('prefetch_data_hits', 0),
+            counters.get('prefetch_data_misses', 0)),
+        'evictions': counters.get('deleted'),
+    }
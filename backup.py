@@ -1,11 +1,14 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
-import time
 from selenium.common.exceptions import NoSuchElementException
 from selenium.webdriver.common.by import By
 
 from NAS_Libraries.robotlogger import RobotLogger
 from NAS_Libraries.robotkeyword import keyword
+from qnaplib.errinj.nas_utils.maskwait import wait_loading_mask
+from qnaplib.errinj.nas_utils.netidle import wait_network_idle
+from qnaplib.errinj.nas_utils.poller import wait_until
+from qnaplib.errinj.nas_utils.table import extract_column
 from HDP_Libraries.main import HDP
 from HDP_Libraries.locators import Locators as Loc
 
@@ -28,12 +31,12 @@ class Backup:
         """
         LOGGER.info('|___Get job status___|')
 
-        self.hdp.validate_loading_page(driver)
+        wait_loading_mask(driver, Loc.HDP_LOADING_PAGE_CSS)
         driver.find_element(By.CSS_SELECTOR, Loc.HDP_BACKUP_CSS).click()
         # Select backup job
         driver.find_element(
             By.XPATH, Loc.HDP_SELECT_JOB_NAME_XPATH.format(job_name)).click()
-        self.hdp.validate_loading_page(driver)
+        wait_loading_mask(driver, Loc.HDP_LOADING_PAGE_CSS)
         element = driver.find_element(By.CSS_SELECTOR,
                                       Loc.HDP_MOUSE_OUT_BACKUP_CSS)
         mouse_driver.move_to_element(element).click().perform()
@@ -62,22 +65,19 @@ class Backup:
         """
         LOGGER.info('|___Validate job is stopped___|')
 
-        start_time = time.time()
         timeout = timeout or self.hdp.check_timeout
         driver.find_element(By.CSS_SELECTOR,
                             Loc.HDP_BACKUP_MORE_BUTTON_CSS).click()
 
-        while True:
-            if time.time() - start_time > int(timeout):
-                raise ValueError("Job is not stopped")
-
-            try:
-                driver.find_element(By.XPATH, Loc.HDP_STOP_BACKUP_XPATH)
-            except NoSuchElementException:
-                break
-
+        def pending(_):
             LOGGER.info("Job is still running, pending retry..")
-            time.sleep(2)
+
+        wait_until(
+            lambda: not driver.find_elements(
+                By.XPATH, Loc.HDP_STOP_BACKUP_XPATH),
+            timeout=int(timeout), pending=pending, interval=2,
+            first_interval=0.25, name='job stopped', logger=LOGGER,
+            error="Job is not stopped")
 
         # Click back more button
         driver.find_element(By.CSS_SELECTOR,
@@ -107,14 +107,14 @@ class Backup:
         driver.find_element(By.CSS_SELECTOR, Loc.HDP_BACKUP_CSS).click()
         driver.find_element(
             By.XPATH, Loc.HDP_SELECT_JOB_NAME_XPATH.format(job_name)).click()
-        self.hdp.validate_loading_page(driver)
+        wait_loading_mask(driver, Loc.HDP_LOADING_PAGE_CSS)
 
         # Stop job
         driver.find_element(By.CSS_SELECTOR,
                             Loc.HDP_BACKUP_MORE_BUTTON_CSS).click()
         driver.find_element(By.XPATH, Loc.HDP_STOP_BACKUP_XPATH).click()
         driver.find_element(By.XPATH, Loc.HDP_YES_BUTTON_XPATH).click()
-        self.hdp.validate_loading_page(driver)
+        wait_loading_mask(driver, Loc.HDP_LOADING_PAGE_CSS)
 
         # Validate job is stopped
         self.validate_job_is_stopped(driver)
@@ -134,22 +134,22 @@ class Backup:
         """
         LOGGER.info('|___Validate job is deleted___|')
 
-        timeout = timeout or self.hdp.check_timeout
-        start_time = time.time()
-
-        while True:
-            if time.time() - start_time > int(timeout):
-                raise ValueError("Job is not deleted")
-
+        def probe():
             try:
                 driver.find_element(
                     By.XPATH,
                     Loc.HDP_SELECT_JOB_NAME_XPATH.format(job_name)).click()
             except NoSuchElementException:
-                break
+                return True
+            return False
 
+        def pending(_):
             LOGGER.info("Job is not deleted yet, pending retry..")
-            time.sleep(2)
+
+        timeout = timeout or self.hdp.check_timeout
+        wait_until(probe, timeout=int(timeout), pending=pending, interval=2,
+                   first_interval=0.25, name='job deleted', logger=LOGGER,
+                   error="Job is not deleted")
 
         LOGGER.info("Job is deleted successfully\n")
         return True
@@ -170,7 +170,7 @@ class Backup:
         # Select backup job
         driver.find_element(
             By.XPATH, Loc.HDP_SELECT_JOB_NAME_XPATH.format(job_name)).click()
-        self.hdp.validate_loading_page(driver)
+        wait_loading_mask(driver, Loc.HDP_LOADING_PAGE_CSS)
         element = driver.find_element(By.CSS_SELECTOR,
                                       Loc.HDP_MOUSE_OUT_BACKUP_CSS)
         mouse_driver.move_to_element(element).click().perform()
@@ -184,7 +184,8 @@ class Backup:
         driver.find_element(By.XPATH, Loc.HDP_DELETE_BACKUP_XPATH).click()
         driver.find_element(By.ID, Loc.HDP_ACCEPT_DELETE_BACKUP_ID).click()
         driver.find_element(By.XPATH, Loc.HDP_OK_BUTTON_XPATH).click()
-        self.hdp.validate_loading_page(driver)
+        wait_loading_mask(driver, Loc.HDP_LOADING_PAGE_CSS)
+        wait_network_idle(driver, logger=LOGGER)
 
         # Validate job is deleted
         self.validate_job_deleted(driver, job_name)
@@ -203,7 +204,7 @@ class Backup:
         """
         LOGGER.info('|___Delete all backup jobs___|')
 
-        self.hdp.validate_loading_page(driver)
+        wait_loading_mask(driver, Loc.HDP_LOADING_PAGE_CSS)
         driver.find_element(By.CSS_SELECTOR, Loc.HDP_BACKUP_CSS).click()
         jobs_count = driver.find_elements(By.XPATH,
                                           Loc.HDP_BACKUP_JOBS_COUNT_XPATH)
@@ -230,18 +231,13 @@ class Backup:
         driver.find_element(By.CSS_SELECTOR, Loc.HDP_BACKUP_CSS).click()
         driver.find_element(
             By.XPATH, Loc.HDP_SELECT_JOB_NAME_XPATH.format(job_name)).click()
-        self.hdp.validate_loading_page(driver)
-
-        # Get Volumes and Volumes count used in backup job
-        volumes_count = driver.find_elements(
-            By.XPATH, Loc.HDP_BACKUP_VOLUME_COUNT_XPATH)
-        LOGGER.debug(f"Volumes count: {volumes_count}")
-        volumes = []
-        for volume in range(1, len(volumes_count)+1):
-            volumes.append(driver.find_element(
-                By.XPATH, Loc.HDP_BACKUP_VOLUMES_TEXT_XPATH.format(volume)).
-                           text)
-            LOGGER.info(f"Volumes: {volumes}")
+        wait_loading_mask(driver, Loc.HDP_LOADING_PAGE_CSS)
+
+        # Get Volumes used in backup job
+        volumes = extract_column(
+            driver, (By.XPATH, Loc.HDP_BACKUP_VOLUME_COUNT_XPATH),
+            (By.XPATH, Loc.HDP_BACKUP_VOLUMES_TEXT_XPATH))
+        LOGGER.debug(f"Volumes count: {len(volumes)}")
 
         LOGGER.info(f"Retrieved HDP backup volumes: {volumes}\n")
         return volumes
@@ -261,7 +257,7 @@ class Backup:
         driver.find_element(By.CSS_SELECTOR, Loc.HDP_BACKUP_CSS).click()
         driver.find_element(
             By.XPATH, Loc.HDP_SELECT_JOB_NAME_XPATH.format(job_name)).click()
-        self.hdp.validate_loading_page(driver)
+        wait_loading_mask(driver, Loc.HDP_LOADING_PAGE_CSS)
 
         # Click back more button
         driver.find_element(By.CSS_SELECTOR,
@@ -270,7 +266,8 @@ class Backup:
         # Click Disable button
         driver.find_element(By.XPATH, Loc.HDP_DISABLE_BACKUP_XPATH).click()
         driver.find_element(By.XPATH, Loc.HDP_OK_BUTTON_XPATH).click()
-        self.hdp.validate_loading_page(driver)
+        wait_loading_mask(driver, Loc.HDP_LOADING_PAGE_CSS)
+        wait_network_idle(driver, logger=LOGGER)
         driver.find_element(By.XPATH, Loc.HDP_OK_BUTTON_XPATH).click()
         backup_status = driver.find_element(
             By.XPATH, Loc.HDP_DISABLED_BACKUP_STRING_XPATH).text
@@ -298,7 +295,7 @@ class Backup:
         driver.find_element(By.CSS_SELECTOR, Loc.HDP_BACKUP_CSS).click()
         driver.find_element(
             By.XPATH, Loc.HDP_SELECT_JOB_NAME_XPATH.format(job_name)).click()
-        self.hdp.validate_loading_page(driver)
+        wait_loading_mask(driver, Loc.HDP_LOADING_PAGE_CSS)
 
         # Click back more button
         driver.find_element(By.CSS_SELECTOR,
@@ -307,7 +304,8 @@ class Backup:
         # Click Enable button
         driver.find_element(By.XPATH, Loc.HDP_ENABLE_BACKUP_XPATH).click()
         driver.find_element(By.XPATH, Loc.HDP_OK_BUTTON_XPATH).click()
-        self.hdp.validate_loading_page(driver)
+        wait_loading_mask(driver, Loc.HDP_LOADING_PAGE_CSS)
+        wait_network_idle(driver, logger=LOGGER)
         driver.find_element(By.XPATH, Loc.HDP_OK_BUTTON_XPATH).click()
         backup_status = driver.find_element(
             By.XPATH, Loc.HDP_ENABLED_BACKUP_STRING_XPATH).text
@@ -9,6 +9,8 @@ from selenium.webdriver.support import expected_conditions as ec
 from selenium.common.exceptions import ElementNotInteractableException
 from NAS_Libraries.robotlogger import RobotLogger
 from NAS_Libraries.robotkeyword import keyword
+from qnaplib.errinj.nas_utils.maskwait import wait_loading_mask
+from qnaplib.errinj.nas_utils.table import extract_column
 from HDP_Libraries.main import HDP
 from HDP_Libraries.locators import Locators as Loc
 
@@ -30,7 +32,7 @@ class BackupExplorer:
         LOGGER.info('|___Open Backup Explorer___|')
 
         driver.switch_to.window(driver.window_handles[0])
-        self.hdp.validate_loading_page(driver)
+        wait_loading_mask(driver, Loc.HDP_LOADING_PAGE_CSS)
         # Select Backup Explorer from backup page
         driver.find_element(By.CSS_SELECTOR, Loc.HDP_BACKUP_CSS).click()
         driver.find_element(By.CSS_SELECTOR, Loc.HDP_BACKUP_MORE_BUTTON_CSS).\
@@ -78,7 +80,7 @@ class BackupExplorer:
             raise ValueError(
                 "Drive letter is required argument to download file")
 
-        self.hdp.validate_loading_page(driver)
+        wait_loading_mask(driver, Loc.HDP_LOADING_PAGE_CSS)
         # Select drive from which files to be downloaded
         driver.switch_to.window(driver.window_handles[1])
         LOGGER.debug(f"Window handles: {driver.window_handles}")
@@ -90,7 +92,7 @@ class BackupExplorer:
         # Click download to download the files
         driver.find_element(
             By.XPATH, Loc.HDP_EXPLORER_USER_DOWNLOAD_XPATH).click()
-        self.hdp.validate_loading_page(driver, timeout=500)
+        wait_loading_mask(driver, Loc.HDP_LOADING_PAGE_CSS, timeout=500)
 
         # Validate too many files to download pop up
         pop_up_flag = self.validate_too_files_pop_up(driver)
@@ -148,7 +150,7 @@ class BackupExplorer:
         driver.find_element(
             By.XPATH, Loc.HDP_EXPLORER_SELECT_DRIVE_NAME_XPATH.format(
                 drive_letter)).click()
-        self.hdp.validate_loading_page(driver)
+        wait_loading_mask(driver, Loc.HDP_LOADING_PAGE_CSS)
 
         # Select Random first file occurrence
         if path is None or filename is None:
@@ -162,7 +164,7 @@ class BackupExplorer:
         # Click download to download the files
         driver.find_element(
             By.XPATH, Loc.HDP_EXPLORER_USER_DOWNLOAD_XPATH).click()
-        self.hdp.validate_loading_page(driver, timeout=150)
+        wait_loading_mask(driver, Loc.HDP_LOADING_PAGE_CSS, timeout=150)
 
         # Switch back to main window
         driver.switch_to.window(driver.window_handles[0])
@@ -197,7 +199,7 @@ class BackupExplorer:
                 element.click()
             except ElementNotInteractableException:
                 mouse_driver.move_to_element(element).click().perform()
-            self.hdp.validate_loading_page(driver)
+            wait_loading_mask(driver, Loc.HDP_LOADING_PAGE_CSS)
 
             # Scroll to first element
             # move_to_element used only top to bottom approach,
@@ -217,7 +219,7 @@ class BackupExplorer:
             element.click()
         except ElementNotInteractableException:
             mouse_driver.move_to_element(element).click().perform()
-        self.hdp.validate_loading_page(driver)
+        wait_loading_mask(driver, Loc.HDP_LOADING_PAGE_CSS)
 
         # Validate file is selected to download
         try:
@@ -256,7 +258,7 @@ class BackupExplorer:
             driver.find_element(
                 By.XPATH, Loc.HDP_EXPLORER_SELECT_FIRST_DRIVE_FOLDER_XPATH). \
                 click()
-            self.hdp.validate_loading_page(driver)
+            wait_loading_mask(driver, Loc.HDP_LOADING_PAGE_CSS)
 
         # Select file based on occurrence
         driver.find_element(
@@ -451,33 +453,30 @@ class BackupExplorer:
         LOGGER.info("|___Validate Calendar scroll dates___|")
 
         driver.switch_to.window(driver.window_handles[1])
-        self.hdp.validate_loading_page(driver)
+        wait_loading_mask(driver, Loc.HDP_LOADING_PAGE_CSS)
         # Get Today's date
         today = self.get_today_date()
 
         # Get current date occurrence from Calendar
-        dates_count = driver.find_elements(
-            By.CSS_SELECTOR, Loc.HDP_EXPLORER_SCROLL_DATES_COUNT_CSS)
-        LOGGER.debug(f"Total dates count: {len(dates_count)}")
-        for i in range(1, len(dates_count)+1):
-            date_text = driver.find_element(
-                By.CSS_SELECTOR, Loc.HDP_EXPLORER_DATES_TEXT_CSS.format(
-                    i)).text
-            LOGGER.debug(f"Retrieved date text: {date_text}")
+        dates = extract_column(
+            driver, (By.CSS_SELECTOR, Loc.HDP_EXPLORER_SCROLL_DATES_COUNT_CSS),
+            (By.CSS_SELECTOR, Loc.HDP_EXPLORER_DATES_TEXT_CSS))
+        LOGGER.debug(f"Retrieved dates: {dates}")
+        for i, date_text in enumerate(dates):
             if not date_text:
                 continue
             if today == int(date_text):
                 current_date = date_text
-                ascending_date = driver.find_element(
-                    By.CSS_SELECTOR, Loc.HDP_EXPLORER_DATES_TEXT_CSS.format(
-                        i-1)).text
-                descending_date = driver.find_element(
-                    By.CSS_SELECTOR, Loc.HDP_EXPLORER_DATES_TEXT_CSS.format(
-                        i+1)).text
+                ascending_date = dates[i-1] if i > 0 else None
+                descending_date = dates[i+1] if i + 1 < len(dates) else None
                 break
+        else:
+            raise ValueError(f"Today's date {today} not found in calendar "
+                             f"scroll dates: {dates}")
 
         # Validate current date, ascending date, descending date
-        if ascending_date > current_date > descending_date:
+        if None in (ascending_date, descending_date) or \
+                ascending_date > current_date > descending_date:
             raise ValueError(f"Expected dates mismatch:\n"
                              f"Today's Date: {today}\n"
                              f"Current Date: {current_date}\n"
@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import uuid
+from baselib.robotlogger import RobotLogger
+LOGGER = RobotLogger(__name__)
+
+
+class BatchResult(object):
+    '''
+    Output of one command in a CommandBatch
+    '''
+
+    def __init__(self, cmd, output='', exit_code=None, duration=None):
+        self.cmd = cmd
+        self.output = output
+        # None means command not executed (stop_on_error)
+        self.exit_code = exit_code
+        # Seconds spent on NAS side (None if date lacks %N)
+        self.duration = duration
+
+    @property
+    def ok(self):
+        return self.exit_code == 0
+
+    def __repr__(self):
+        return f'BatchResult({self.cmd!r}, exit_code={self.exit_code})'
+
+
+class CommandBatch(object):
+    '''
+    Queue independent NAS commands and send them in one round trip
+
+    Commands are framed by begin/end marker lines carrying the exit code
+    and a ns timestamp, so each command gets its own output, exit code
+    and duration back. Each command runs in its own subshell: `cd`/`export`
+    /`exit` do not leak to the next command, and stop_on_error skips the
+    rest of the batch after the first failing command (transaction-like).
+
+    Usage
+    | with nas.batch() as batch:
+    |     batch.add('rpcdebug -m nfs -s all')
+    |     batch.add('rpcdebug -m rpc -s all')
+    | batch.results
+    '''
+
+    def __init__(self, cli, stop_on_error=False):
+        self.cli = cli
+        self.stop_on_error = stop_on_error
+        self.cmds = []
+        self.checks = []
+        self.results = []
+
+    def __len__(self):
+        return len(self.cmds)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None and self.cmds and not self.results:
+            self.run()
+        return False
+
+    def add(self, cmd, check=True):
+        '''
+        Queue command, return its index in results
+
+        Arguments
+        | cmd:   shell command
+        | check: raise ValueError after run if command exit code != 0
+        '''
+        self.cmds.append(cmd)
+        self.checks.append(check)
+        return len(self.cmds) - 1
+
+    def script(self, token):
+        lines = ['rc=0']
+        for idx, cmd in enumerate(self.cmds):
+            cmd = cmd.strip().rstrip(';')
+            # Newline before end marker: output may lack a trailing one
+            body = (f'echo "{token} B {idx} $(date +%s%N)"; ( {cmd} ) '
+                    f'2>&1; rc=$?; printf \'\\n%s E %s %s %s\\n\' '
+                    f'"{token}" {idx} $rc "$(date +%s%N)"')
+            if self.stop_on_error:
+                body = f'if [ $rc -eq 0 ]; then {body}; fi'
+            lines.append(body)
+        return f'( {" ; ".join(lines)} ) ; true'
+
+    def run(self):
+        '''
+        Send all queued commands as one framed script
+
+        Return list of BatchResult in queued order
+        '''
+        token = f'@@BATCH_{uuid.uuid4().hex[:8]}@@'
+        out = self.cli.run(self.script(token))
+
+        self.results = [BatchResult(cmd) for cmd in self.cmds]
+        begin, idx, lines = None, None, []
+        for line in out.splitlines():
+            fields = line.split()
+            if not fields or fields[0] != token:
+                if idx is not None:
+                    lines.append(line)
+                continue
+
+            if fields[1] == 'B':
+                idx, lines = int(fields[2]), []
+                begin = fields[3] if len(fields) > 3 else ''
+            elif fields[1] == 'E' and idx is not None:
+                result = self.results[idx]
+                result.output = '\n'.join(lines).strip()
+                result.exit_code = int(fields[3])
+                end = fields[4] if len(fields) > 4 else ''
+                if begin.isdigit() and end.isdigit():
+                    result.duration = (int(end) - int(begin)) / 1e9
+                idx = None
+
+        for result in self.results:
+            LOGGER.debug(f'Batch CMD [{result.cmd}] exit code '
+                         f'[{result.exit_code}]')
+
+        skipped = False
+        for result, check in zip(self.results, self.checks):
+            if result.exit_code is None:
+                # Not run after an earlier failure, or batch died midway
+                if check and not skipped:
+                    raise ValueError(f'CMD [{result.cmd}] has no exit code, '
+                                     f'batch output:\n{out}')
+                continue
+            if check and not result.ok:
+                raise ValueError(f'CMD [{result.cmd}] failed with exit code '
+                                 f'{result.exit_code}\n{result.output}')
+            skipped = skipped or (self.stop_on_error and not result.ok)
+        return self.results
+
+    def outputs(self):
+        '''
+        Run batch if not run yet and return outputs only
+        '''
+        if not self.results:
+            self.run()
+        return [result.output for result in self.results]
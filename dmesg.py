@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import time
+import threading
+from collections import deque
+from typing import TYPE_CHECKING
+from baselib.robotlogger import RobotLogger
+from .stream import RemoteStream
+LOGGER = RobotLogger(__name__)
+
+if TYPE_CHECKING:
+    from .main import NAS
+
+
+class DmesgWatcher(object):
+    '''
+    Follow kernel ring buffer with `dmesg -w` over one long-lived channel
+
+    Every line gets a sequence number (cursor). Recent lines are kept in an
+    in-memory ring so several waiters can search history from their own
+    cursor and block until a matching line arrives.
+    '''
+
+    def __init__(self, client: "NAS", ring_size=20000):
+        self.client = client
+        self.ring = deque(maxlen=ring_size)
+        # Sequence number for next received line
+        self.seq = 0
+        # Lines before this sequence are hidden (dmesg cleared)
+        self.watermark = 0
+
+        self._cond = threading.Condition()
+        self._stream = None
+
+    @property
+    def alive(self):
+        return self._stream is not None and self._stream.alive
+
+    @property
+    def cursor(self):
+        '''
+        Sequence number of the next line, use as `since` of wait_for
+        '''
+        with self._cond:
+            return self.seq
+
+    def start(self):
+        if self.alive:
+            return self
+
+        with self._cond:
+            self.ring.clear()
+            self.seq = 0
+            self.watermark = 0
+        self._stream = RemoteStream(
+            self.client.ip_addr, self.client.username, self.client.password,
+            cmd='dmesg -w', on_line=self._on_line)
+        self._stream.start()
+        LOGGER.info('dmesg watcher started')
+        return self
+
+    def stop(self):
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream = None
+        with self._cond:
+            self._cond.notify_all()
+        LOGGER.info('dmesg watcher stopped')
+        return True
+
+    def clear(self):
+        '''
+        Hide all lines received so far (pair with `dmesg -c`)
+        '''
+        with self._cond:
+            self.watermark = self.seq
+
+    def _on_line(self, line):
+        with self._cond:
+            self.ring.append((self.seq, line))
+            self.seq += 1
+            self._cond.notify_all()
+
+    def lines(self, since=None):
+        '''
+        Return buffered lines from cursor `since` (default: last clear)
+        '''
+        with self._cond:
+            since = self.watermark if since is None else max(
+                since, self.watermark)
+            return [line for seq, line in self.ring if seq >= since]
+
+    def wait_for(self, pattern, timeout, since=None):
+        '''
+        Block till a line containing pattern shows up
+
+        Arguments
+        | pattern: substring to look for
+        | timeout: seconds to wait
+        | since:   cursor to search from (default: last clear)
+
+        Return (cursor, line) of first match, None on timeout or when the
+        stream ends
+        '''
+        deadline = time.time() + float(timeout)
+        with self._cond:
+            next_seq = self.watermark if since is None else max(
+                since, self.watermark)
+            while True:
+                for seq, line in self.ring:
+                    if seq >= next_seq and pattern in line:
+                        return seq, line
+                next_seq = self.seq
+
+                remain = deadline - time.time()
+                if remain <= 0 or not self.alive:
+                    return None
+                self._cond.wait(min(remain, 1))
@@ -0,0 +1,262 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# pylint: disable=broad-except
+'''
+Run NAS keyword suites across a fleet of NAS units in parallel
+
+Each device of the inventory gets one worker, workers pull suites from a
+shared queue and run them as separate robot processes (one NAS client per
+process, bound through NAS_IP / NAS_USER / NAS_PWD variables). A failed
+suite is re-queued (preferably to another device) till retries run out,
+a device failing its reachability check is dropped from the fleet.
+Final output of every suite is merged into one report with rebot.
+
+Inventory (JSON)
+| [
+|   {"name": "hero1", "ip": "10.0.0.11", "user": "admin", "password": "x"},
+|   {"name": "hero2", "ip": "10.0.0.12", "user": "admin", "password": "x"}
+| ]
+
+Usage
+| python -m qnaplib.errinj.nas_utils.fleet -i fleet.json -d results \\
+|     tc01_vdev_write_count1_raid1.robot tc02_vdev_write_count2_raid1.robot
+'''
+import os
+import sys
+import json
+import time
+import queue
+import socket
+import logging
+import argparse
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from robot import rebot
+
+LOGGER = logging.getLogger(__name__)
+
+
+class Device(object):
+
+    def __init__(self, name, ip, user='admin', password=None, variables=None):
+        self.name = name
+        self.ip = ip
+        self.user = user
+        self.password = password
+        # Extra robot variables for this device (e.g. DISK_TYPE)
+        self.variables = variables or {}
+        self.healthy = True
+
+    def reachable(self, port=22, timeout=10):
+        try:
+            with socket.create_connection((self.ip, port), timeout=timeout):
+                return True
+        except OSError:
+            return False
+
+    def robot_variables(self):
+        variables = {'NAS_IP': self.ip, 'NAS_USER': self.user,
+                     'NAS_PWD': self.password}
+        variables.update(self.variables)
+        return variables
+
+
+def load_inventory(path):
+    '''
+    Load devices from JSON inventory file
+    '''
+    with open(path, encoding='utf-8') as inv:
+        data = json.load(inv)
+
+    devices = []
+    for entry in data:
+        if 'ip' not in entry:
+            raise ValueError(f'Inventory entry without ip: {entry}')
+        entry = dict(entry)
+        devices.append(Device(
+            name=entry.pop('name', entry['ip']), ip=entry.pop('ip'),
+            user=entry.pop('user', 'admin'),
+            password=entry.pop('password', None),
+            variables=entry.pop('variables', None)))
+    return devices
+
+
+class SuiteRun(object):
+
+    def __init__(self, suite):
+        self.suite = suite
+        self.attempts = []  # (device name, rc, output.xml)
+        self.tried_on = set()
+
+    @property
+    def name(self):
+        return os.path.splitext(os.path.basename(self.suite))[0]
+
+    @property
+    def output(self):
+        return self.attempts[-1][2] if self.attempts else None
+
+    @property
+    def passed(self):
+        return bool(self.attempts) and self.attempts[-1][1] == 0
+
+
+class FleetRunner(object):
+    '''
+    Shard suites across devices, one worker (and robot process) per device
+    '''
+
+    def __init__(self, devices, suites, outputdir='fleet_results',
+                 retries=1, robot_args=None, suite_timeout=None):
+        if not devices:
+            raise ValueError('No device in fleet!')
+        self.devices = devices
+        self.runs = [SuiteRun(suite) for suite in suites]
+        self.outputdir = os.path.abspath(outputdir)
+        self.retries = int(retries)
+        self.robot_args = list(robot_args or [])
+        self.suite_timeout = suite_timeout
+
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._unfinished = 0
+
+    def _robot_cmd(self, device, run, outdir):
+        cmd = [sys.executable, '-m', 'robot', '--outputdir', outdir,
+               '--output', 'output.xml', '--log', 'NONE', '--report', 'NONE',
+               '--name', f'{run.name} [{device.name}]']
+        for key, val in device.robot_variables().items():
+            if val is not None:
+                cmd += ['--variable', f'{key}:{val}']
+        return cmd + self.robot_args + [run.suite]
+
+    def _run_suite(self, device, run):
+        attempt = len(run.attempts) + 1
+        outdir = os.path.join(self.outputdir, device.name,
+                              f'{run.name}_{attempt}')
+        os.makedirs(outdir, exist_ok=True)
+
+        LOGGER.info(f'[{device.name}] start {run.name} (attempt {attempt})')
+        start_time = time.time()
+        with open(os.path.join(outdir, 'console.log'), 'w') as console:
+            try:
+                rc = subprocess.call(
+                    self._robot_cmd(device, run, outdir), stdout=console,
+                    stderr=subprocess.STDOUT, timeout=self.suite_timeout)
+            except subprocess.TimeoutExpired:
+                rc = 255
+
+        output = os.path.join(outdir, 'output.xml')
+        run.attempts.append(
+            (device.name, rc, output if os.path.exists(output) else None))
+        run.tried_on.add(device.name)
+        LOGGER.info(f'[{device.name}] {run.name} rc={rc} '
+                    f'({time.time() - start_time:.0f}s)')
+        return rc
+
+    def _requeue(self, run, device):
+        '''
+        Put failed suite back while it has retries left
+        '''
+        if len(run.attempts) > self.retries:
+            return False
+        self._queue.put(run)
+        LOGGER.info(f'{run.name} re-queued after failure on {device.name}')
+        return True
+
+    def _worker(self, device):
+        while True:
+            with self._lock:
+                if self._unfinished == 0:
+                    return
+            try:
+                run = self._queue.get(timeout=1)
+            except queue.Empty:
+                continue
+
+            # Prefer retrying on another healthy device
+            healthy = [dev for dev in self.devices if dev.healthy]
+            if device.name in run.tried_on and \
+                    any(dev.name not in run.tried_on for dev in healthy):
+                self._queue.put(run)
+                time.sleep(1)
+                continue
+
+            if not device.reachable():
+                LOGGER.error(f'[{device.name}] unreachable, drop from fleet')
+                device.healthy = False
+                self._queue.put(run)
+                with self._lock:
+                    if not any(dev.healthy for dev in self.devices):
+                        self._unfinished = 0
+                return
+
+            rc = self._run_suite(device, run)
+            if rc == 0 or not self._requeue(run, device):
+                with self._lock:
+                    self._unfinished -= 1
+
+    def run(self):
+        '''
+        Run all suites, return (merged output path, all passed)
+        '''
+        os.makedirs(self.outputdir, exist_ok=True)
+        for run in self.runs:
+            self._queue.put(run)
+        self._unfinished = len(self.runs)
+
+        with ThreadPoolExecutor(max_workers=len(self.devices)) as pool:
+            for future in [pool.submit(self._worker, dev)
+                           for dev in self.devices]:
+                future.result()
+
+        return self.merge(), all(run.passed for run in self.runs)
+
+    def merge(self):
+        '''
+        Merge final output of every suite into one report
+        '''
+        outputs = [run.output for run in self.runs if run.output]
+        for run in self.runs:
+            tries = ', '.join(f'{dev}:rc={rc}' for dev, rc, _ in run.attempts)
+            LOGGER.info(f'{run.name}: {"PASS" if run.passed else "FAIL"} '
+                        f'({tries or "not run"})')
+        if not outputs:
+            LOGGER.error('No robot output to merge!')
+            return None
+
+        merged = os.path.join(self.outputdir, 'output.xml')
+        rebot(*outputs, name='NAS Fleet', outputdir=self.outputdir,
+              output=merged, log='log.html', report='report.html')
+        return merged
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Run NAS robot suites across a fleet of NAS units')
+    parser.add_argument('suites', nargs='+', help='robot suite files')
+    parser.add_argument('-i', '--inventory', required=True,
+                        help='JSON inventory of NAS devices')
+    parser.add_argument('-d', '--outputdir', default='fleet_results')
+    parser.add_argument('-r', '--retries', type=int, default=1,
+                        help='retries per failed suite (default 1)')
+    parser.add_argument('-t', '--suite-timeout', type=int, default=None,
+                        help='kill suite after N seconds')
+    parser.add_argument('--robot-arg', action='append', default=[],
+                        help='extra argument passed to robot (repeatable)')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO,
+                        format='%(asctime)s %(levelname)s %(message)s')
+    runner = FleetRunner(
+        load_inventory(args.inventory), args.suites,
+        outputdir=args.outputdir, retries=args.retries,
+        robot_args=args.robot_arg, suite_timeout=args.suite_timeout)
+    merged, passed = runner.run()
+    LOGGER.info(f'Merged output: {merged}')
+    return 0 if passed else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -8,6 +8,8 @@ from selenium.common.exceptions import NoSuchElementException
 
 from NAS_Libraries.robotlogger import RobotLogger
 from NAS_Libraries.robotkeyword import keyword
+from qnaplib.errinj.nas_utils.maskwait import wait_loading_mask
+from qnaplib.errinj.nas_utils.netidle import wait_network_idle
 from HDP_Libraries.main import HDP
 from HDP_Libraries.locators import Locators as Loc
 
@@ -30,7 +32,7 @@ class Inventory:
         LOGGER.info('|___Delete inventory___|')
 
         driver.find_element(By.CSS_SELECTOR, Loc.HDP_INVENTORY_CSS).click()
-        self.hdp.validate_loading_page(driver)
+        wait_loading_mask(driver, Loc.HDP_LOADING_PAGE_CSS)
         try:
             driver.find_element(By.XPATH, Loc.HDP_WINDOWS_INV_XPATH).click()
         except NoSuchElementException:
@@ -43,7 +45,8 @@ class Inventory:
         driver.find_element(By.XPATH, delete_xpath).click()
         driver.find_element(By.XPATH, Loc.HDP_INV_DELETE_ACCEPT_XPATH).click()
         driver.find_element(By.XPATH, Loc.HDP_OK_BUTTON_XPATH).click()
-        self.hdp.validate_loading_page(driver)
+        wait_loading_mask(driver, Loc.HDP_LOADING_PAGE_CSS)
+        wait_network_idle(driver, logger=LOGGER)
 
         # Validate Inventory is deleted
         WebDriverWait(driver, 20).until_not(ec.presence_of_element_located((
@@ -63,7 +66,7 @@ class Inventory:
         LOGGER.info('|___Delete all inventories___|')
 
         driver.find_element(By.CSS_SELECTOR, Loc.HDP_INVENTORY_CSS).click()
-        self.hdp.validate_loading_page(driver)
+        wait_loading_mask(driver, Loc.HDP_LOADING_PAGE_CSS)
         try:
             driver.find_element(By.XPATH, Loc.HDP_WINDOWS_INV_XPATH).click()
         except NoSuchElementException:
@@ -78,7 +81,8 @@ class Inventory:
             driver.find_element(By.XPATH,
                                 Loc.HDP_INV_DELETE_ACCEPT_XPATH).click()
             driver.find_element(By.XPATH, Loc.HDP_OK_BUTTON_XPATH).click()
-            self.hdp.validate_loading_page(driver)
+            wait_loading_mask(driver, Loc.HDP_LOADING_PAGE_CSS)
+            wait_network_idle(driver, logger=LOGGER)
 
         # Validate all inventories deleted
         WebDriverWait(driver, 20).until(ec.presence_of_element_located((
@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import re
+import csv
+import json
+import time
+import threading
+from typing import TYPE_CHECKING
+from .stream import RemoteStream
+from .zpool_status import parse_size
+
+if TYPE_CHECKING:
+    from .main import NAS
+
+# Columns of `zpool iostat -v -l` after the vdev name
+IOSTAT_COLUMNS = [
+    'alloc', 'free', 'read_ops', 'write_ops', 'read_bw', 'write_bw',
+    'total_wait_r', 'total_wait_w', 'disk_wait_r', 'disk_wait_w',
+    'syncq_wait_r', 'syncq_wait_w', 'asyncq_wait_r', 'asyncq_wait_w',
+    'scrub_wait', 'trim_wait',
+]
+# Columns kept in the compact series (alloc / free / queue waits dropped)
+SERIES_COLUMNS = [
+    'read_ops', 'write_ops', 'read_bw', 'write_bw',
+    'total_wait_r', 'total_wait_w', 'disk_wait_r', 'disk_wait_w',
+]
+LATENCY_RE = re.compile(r'^([\d.]+)(ns|us|ms|s)$')
+LATENCY_UNITS = {'ns': 1e-9, 'us': 1e-6, 'ms': 1e-3, 's': 1}
+COUNT_RE = re.compile(r'^([\d.]+)([KMGTPE]?)$')
+
+
+def parse_iostat_value(column, value):
+    '''
+    Convert one iostat cell: bandwidth -> bytes, ops -> count,
+    wait -> seconds, '-' -> None
+    '''
+    if value == '-':
+        return None
+    if column.endswith('wait') or '_wait_' in column:
+        match = LATENCY_RE.match(value)
+        return float(match.group(1)) * LATENCY_UNITS[match.group(2)] \
+            if match else None
+    match = COUNT_RE.match(value)
+    if not match:
+        return None
+    number, unit = match.groups()
+    if column.endswith('_bw') or column in ('alloc', 'free'):
+        return parse_size(number, unit)
+    # Operations use 1000 based suffix
+    power = 'KMGTPE'.index(unit) + 1 if unit else 0
+    return int(float(number) * 1000 ** power)
+
+
+class IostatParser(object):
+    '''
+    Incremental parser of `zpool iostat -v -l <pool> <interval>`
+
+    Feed lines one by one, every complete interval block is turned into
+    {vdev: {column: value}} and handed to on_sample(sample).
+    The first block (averages since boot) is skipped.
+    '''
+
+    def __init__(self, on_sample):
+        self.on_sample = on_sample
+        self.blocks = 0
+        self._rows = {}
+        self._in_rows = False
+
+    def feed(self, line):
+        stripped = line.strip()
+        if not stripped:
+            return
+        if set(stripped) <= set('- '):
+            # Dashes open the rows of a block and close it
+            if self._in_rows and self._rows:
+                self._flush()
+            else:
+                self._in_rows = True
+            return
+        fields = stripped.split()
+        if not self._in_rows or fields[0] in ('pool', 'capacity'):
+            return
+        values = fields[1:]
+        self._rows[fields[0]] = {
+            column: parse_iostat_value(column, value)
+            for column, value in zip(IOSTAT_COLUMNS, values)}
+
+    def _flush(self):
+        rows, self._rows = self._rows, {}
+        self._in_rows = False
+        self.blocks += 1
+        if self.blocks > 1:
+            self.on_sample(rows)
+
+
+class IostatSampler(object):
+    '''
+    Run `zpool iostat -v -l` on one long-lived channel and keep compact
+    per-vdev series: {vdev: [[t, read_ops, write_ops, ..], ..]}
+    '''
+
+    def __init__(self, client: "NAS", zpool_name, interval=1):
+        self.client = client
+        self.zpool_name = zpool_name
+        self.interval = interval
+        self.series = {}
+        self.start_time = None
+        self.stop_time = None
+
+        self._lock = threading.Lock()
+        self._parser = IostatParser(self._on_sample)
+        self._stream = None
+
+    @property
+    def alive(self):
+        return self._stream is not None and self._stream.alive
+
+    def _on_sample(self, rows):
+        now = round(time.time() - self.start_time, 1)
+        with self._lock:
+            for vdev, values in rows.items():
+                self.series.setdefault(vdev, []).append(
+                    [now] + [values.get(col) for col in SERIES_COLUMNS])
+
+    def start(self):
+        self.start_time = time.time()
+        self._stream = RemoteStream(
+            self.client.ip_addr, self.client.username, self.client.password,
+            cmd=f'zpool iostat -v -l {self.zpool_name} {self.interval}',
+            on_line=self._parser.feed)
+        self._stream.start()
+        return self
+
+    def stop(self):
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream = None
+        self.stop_time = time.time()
+        return self
+
+    def summary(self):
+        '''
+        Per vdev sample count, peak / average write latency and bandwidth
+        '''
+        idx = {col: SERIES_COLUMNS.index(col) + 1 for col in SERIES_COLUMNS}
+        result = {}
+        with self._lock:
+            for vdev, samples in self.series.items():
+                vdev_sum = {'samples': len(samples)}
+                for col in ('total_wait_w', 'write_bw'):
+                    values = [sample[idx[col]] for sample in samples
+                              if sample[idx[col]] is not None]
+                    vdev_sum[f'max_{col}'] = max(values) if values else None
+                    vdev_sum[f'avg_{col}'] = \
+                        sum(values) / len(values) if values else None
+                result[vdev] = vdev_sum
+        return result
+
+    def export(self, json_file, csv_file=None):
+        with self._lock:
+            data = {
+                'zpool': self.zpool_name,
+                'interval': self.interval,
+                'start_time': self.start_time,
+                'columns': ['time'] + SERIES_COLUMNS,
+                'series': self.series,
+            }
+            with open(json_file, 'w') as out:
+                json.dump(data, out)
+            if csv_file:
+                with open(csv_file, 'w', newline='') as out:
+                    writer = csv.writer(out)
+                    writer.writerow(['vdev', 'time'] + SERIES_COLUMNS)
+                    for vdev, samples in self.series.items():
+                        for sample in samples:
+                            writer.writerow([vdev] + sample)
+        return json_file
@@ -0,0 +1,263 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# pylint: disable=broad-except
+import os
+import time
+import uuid
+import socket
+import sqlite3
+import threading
+from baselib.robotlogger import RobotLogger
+LOGGER = RobotLogger(__name__)
+
+
+def conflict(res_a, res_b):
+    '''
+    Resources are paths, a lease on a parent covers its children
+    - 'nas:10.0.0.1' conflicts with 'nas:10.0.0.1/disk/3'
+    - 'nas:10.0.0.1/disk/3' does not conflict with 'nas:10.0.0.1/disk/4'
+    '''
+    return res_a == res_b or res_a.startswith(f'{res_b}/') or \
+        res_b.startswith(f'{res_a}/')
+
+
+class Lease(object):
+    '''
+    Granted lease of a set of resources, renewed by a heartbeat thread
+    '''
+
+    def __init__(self, manager, lease_id, resources, owner, ttl):
+        self.manager = manager
+        self.lease_id = lease_id
+        self.resources = resources
+        self.owner = owner
+        self.ttl = ttl
+        self.released = False
+        # Heartbeat thread must not log to robot (dropped off main
+        # thread), it only records what check() reports
+        self.lost = False
+        self.lost_message = None
+        self.heartbeat_error = None
+
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._heartbeat_loop, name=f'lease-{lease_id[:8]}',
+            daemon=True)
+        self._thread.start()
+
+    def _heartbeat_loop(self):
+        while not self._stop.wait(self.ttl / 3):
+            try:
+                renewed = self.manager.heartbeat(self.lease_id, self.ttl)
+            except Exception as err:
+                # DB busy / temporarily unavailable, retry next beat
+                self.heartbeat_error = f'{time.ctime()}: {err}'
+                continue
+            if not renewed:
+                # Lease expired and may be taken over, nothing to renew
+                self.lost_message = (
+                    f'Lease of {self.resources} lost at {time.ctime()}, '
+                    f'{self.owner} no longer owns them (last heartbeat '
+                    f'error: {self.heartbeat_error})')
+                self.lost = True
+                return
+
+    def check(self):
+        '''
+        Report heartbeat errors, raise ValueError if lease was lost
+        (expired before renewal); call from main thread
+        '''
+        if self.heartbeat_error is not None:
+            LOGGER.info(f'Lease heartbeat of {self.resources} failed: '
+                        f'{self.heartbeat_error}')
+            self.heartbeat_error = None
+        if self.lost and not self.released:
+            LOGGER.error(self.lost_message)
+            raise ValueError(self.lost_message)
+        return True
+
+    def release(self):
+        if self.released:
+            return True
+        self._stop.set()
+        self.manager.release(self.lease_id)
+        self.released = True
+        LOGGER.info(f'Lease released {self.resources}')
+        return True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+        return False
+
+
+class LeaseManager(object):
+    '''
+    Hand out NAS devices (or disk subsets) to concurrent suites
+
+    State lives in one SQLite file, so runs on the same host (or sharing
+    the file on a local disk) coordinate without any service:
+    - leases expire after ttl unless renewed by heartbeat
+    - waiters are served in FIFO order, a request is granted only when
+      none of its resources is leased and no earlier waiter wants them
+    - waiters not seen for waiter_ttl (crashed run) are dropped
+
+    Resources are strings such as 'nas:<ip>' or 'nas:<ip>/disk/<port>'
+    '''
+
+    def __init__(self, db_path=None, ttl=600, waiter_ttl=60):
+        self.db_path = db_path or os.environ.get(
+            'NAS_LEASE_DB', os.path.expanduser('~/.nas_leases.sqlite'))
+        self.ttl = int(ttl)
+        self.waiter_ttl = int(waiter_ttl)
+        self.owner = f'{socket.gethostname()}:{os.getpid()}'
+
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS leases ('
+                'lease_id TEXT, resource TEXT, owner TEXT, '
+                'acquired REAL, expires REAL)')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS waiters ('
+                'seq INTEGER PRIMARY KEY AUTOINCREMENT, lease_id TEXT, '
+                'resources TEXT, owner TEXT, seen REAL)')
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30,
+                               isolation_level=None)
+        return _Transaction(conn)
+
+    def _purge(self, conn, now):
+        conn.execute('DELETE FROM leases WHERE expires < ?', (now,))
+        conn.execute('DELETE FROM waiters WHERE seen < ?',
+                     (now - self.waiter_ttl,))
+
+    def _try_grant(self, lease_id, resources, ttl):
+        now = time.time()
+        with self._connect() as conn:
+            self._purge(conn, now)
+            leased = [row[0] for row in conn.execute(
+                'SELECT resource FROM leases')]
+            waiters = conn.execute(
+                'SELECT lease_id, resources FROM waiters ORDER BY seq'
+            ).fetchall()
+
+            # Keep own place in queue alive
+            conn.execute('UPDATE waiters SET seen = ? WHERE lease_id = ?',
+                         (now, lease_id))
+
+            if any(conflict(res, held) for res in resources
+                   for held in leased):
+                return False
+            for waiter_id, waiter_res in waiters:
+                if waiter_id == lease_id:
+                    break
+                # Earlier waiter wants (some of) the same resources
+                if any(conflict(res, other) for res in resources
+                       for other in waiter_res.split(',')):
+                    return False
+
+            conn.executemany(
+                'INSERT INTO leases VALUES (?, ?, ?, ?, ?)',
+                [(lease_id, res, self.owner, now, now + ttl)
+                 for res in resources])
+            conn.execute('DELETE FROM waiters WHERE lease_id = ?',
+                         (lease_id,))
+            return True
+
+    def acquire(self, resources, timeout=3600, ttl=None, interval=5):
+        '''
+        Wait till all resources are free and lease them together
+
+        Arguments
+        | resources: resource string or list (e.g. ['nas:10.0.0.1'])
+        | timeout:   seconds to wait in queue
+        | ttl:       lease expires if not renewed within ttl seconds
+
+        Return Lease (heartbeat started, call release() when done)
+        '''
+        if isinstance(resources, str):
+            resources = [resources]
+        resources = sorted(set(resources))
+        # Robot passes keyword arguments as strings
+        ttl = int(ttl or self.ttl)
+        timeout = float(timeout)
+        interval = float(interval)
+        lease_id = uuid.uuid4().hex
+
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT INTO waiters (lease_id, resources, owner, seen) '
+                'VALUES (?, ?, ?, ?)',
+                (lease_id, ','.join(resources), self.owner, time.time()))
+
+        start_time = time.time()
+        logged = False
+        try:
+            while not self._try_grant(lease_id, resources, ttl):
+                if time.time() - start_time > timeout:
+                    raise ValueError(f'Lease of {resources} not granted in '
+                                     f'{timeout}s, held by '
+                                     f'{self.holders(resources)}')
+                if not logged:
+                    LOGGER.info(f'{resources} in use by '
+                                f'{self.holders(resources)}, waiting ..')
+                    logged = True
+                time.sleep(interval)
+        except BaseException:
+            with self._connect() as conn:
+                conn.execute('DELETE FROM waiters WHERE lease_id = ?',
+                             (lease_id,))
+            raise
+
+        LOGGER.info(f'Lease granted {resources} '
+                    f'(waited {time.time() - start_time:.0f}s)')
+        return Lease(self, lease_id, resources, self.owner, ttl)
+
+    def heartbeat(self, lease_id, ttl=None):
+        '''
+        Renew lease, return False if lease no longer exists
+        '''
+        with self._connect() as conn:
+            cur = conn.execute(
+                'UPDATE leases SET expires = ? WHERE lease_id = ?',
+                (time.time() + (ttl or self.ttl), lease_id))
+            return cur.rowcount > 0
+
+    def release(self, lease_id):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM leases WHERE lease_id = ?', (lease_id,))
+        return True
+
+    def holders(self, resources=None):
+        '''
+        Return {resource: owner} of active leases (optionally filtered)
+        '''
+        with self._connect() as conn:
+            self._purge(conn, time.time())
+            rows = conn.execute('SELECT resource, owner FROM leases').fetchall()
+        return {res: owner for res, owner in rows
+                if resources is None or
+                any(conflict(res, want) for want in resources)}
+
+
+class _Transaction(object):
+    '''
+    sqlite connection as `BEGIN IMMEDIATE` .. `COMMIT` context
+    '''
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute('BEGIN IMMEDIATE')
+        return self.conn
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            self.conn.execute('ROLLBACK' if exc_type else 'COMMIT')
+        finally:
+            self.conn.close()
+        return False
@@ -1,24 +1,75 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import os
+import json
 import time
-from selenium.webdriver.support.wait import WebDriverWait
-from selenium.webdriver.support import expected_conditions as ec
+from contextlib import contextmanager
+from urllib.parse import urlparse
 from selenium.webdriver.common.by import By
-from selenium.common.exceptions import TimeoutException
+from selenium.common.exceptions import WebDriverException
+try:
+    import fcntl
+except ImportError:  # Windows
+    import msvcrt
+    fcntl = None
 
 from NAS_Libraries.robotlogger import RobotLogger
 from NAS_Libraries.robotkeyword import keyword
+from qnaplib.errinj.nas_utils.poller import wait_until
+from qnaplib.errinj.nas_utils.netidle import wait_network_idle
+from qnaplib.errinj.nas_utils.netidle import export_network_timings
 from HDP_Libraries.locators import Locators as Loc
 from HDP_Libraries.main import HDP
 
 LOGGER = RobotLogger(__name__)
 
+# Authenticated HDP sessions, {'<nas ip>|<user>': {'cookies', ..}}
+SESSION_CACHE_FILE = os.environ.get(
+    'HDP_SESSION_CACHE',
+    os.path.join(os.path.expanduser('~'), '.hdp_session_cache.json'))
+
 
 class Login:
     def __init__(self):
         self.hdp = HDP()
 
+    @keyword('HDP: Wait network idle')
+    def wait_network_idle(self, driver, idle_ms=500, timeout=60):
+        """
+        Lib to wait till HDP has no /HyperDataProtector/ request in flight
+        - Browser must be launched with netidle.enable_network_logging,
+          otherwise returns at once
+
+        Arguments
+        | driver: Web driver of HDP
+        | idle_ms: Time in ms without request in flight
+        | timeout: Time in sec to wait
+        """
+        LOGGER.info('|___Wait HDP network idle___|')
+
+        samples = wait_network_idle(driver, idle=int(idle_ms) / 1000,
+                                    timeout=int(timeout), logger=LOGGER)
+
+        LOGGER.info(f'HDP network idle, {len(samples)} requests completed\n')
+        return samples
+
+    @keyword('HDP: Export API timings')
+    def export_api_timings(self, driver, filename='hdp_api_timings.json'):
+        """
+        Lib to save latency of HDP API calls recorded so far
+
+        Arguments
+        | driver: Web driver of HDP
+        | filename: JSON file name under output directory
+        """
+        LOGGER.info('|___Export HDP API timings___|')
+
+        path = export_network_timings(driver, filename)
+
+        LOGGER.info(f'HDP API timings saved to {path}\n')
+        return path
+
     @keyword('HDP: Login: Enter values by ID')
     def enter_values_by_id(self, driver, web_element, text):
         """
@@ -92,6 +143,186 @@ class Login:
         LOGGER.info("Logged in to HDP successfully\n")
         return True
 
+    @staticmethod
+    def _load_session_cache():
+        try:
+            with open(SESSION_CACHE_FILE) as cache:
+                return json.load(cache)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    @contextmanager
+    def _session_cache_lock(timeout=60):
+        # Serialise load-modify-write of parallel runs on the same host
+        lock_file = f'{SESSION_CACHE_FILE}.lock'
+        fd = os.open(lock_file, os.O_RDWR | os.O_CREAT, 0o600)
+        deadline = time.time() + timeout
+        try:
+            while True:
+                try:
+                    if fcntl is not None:
+                        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    else:
+                        msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+                    break
+                except OSError:
+                    if time.time() > deadline:
+                        raise ValueError(f'{lock_file} still locked after '
+                                         f'{timeout}s by another run')
+                    time.sleep(0.2)
+            yield
+        finally:
+            # Closing the file releases the lock
+            os.close(fd)
+
+    def _update_session_cache(self, key, session=None):
+        '''
+        Store session of key (drop it if session is None)
+        - Cache holds live NAS cookies: owner-only file, replaced
+          atomically so readers never see a partial write
+        '''
+        with self._session_cache_lock():
+            sessions = self._load_session_cache()
+            if session is None:
+                sessions.pop(key, None)
+            else:
+                sessions[key] = session
+            tmpfile = f'{SESSION_CACHE_FILE}.{os.getpid()}.tmp'
+            fd = os.open(tmpfile, os.O_WRONLY | os.O_CREAT | os.O_TRUNC,
+                         0o600)
+            with os.fdopen(fd, 'w') as cache:
+                json.dump(sessions, cache, indent=2)
+            os.replace(tmpfile, SESSION_CACHE_FILE)
+
+    @staticmethod
+    def _session_key(url, username, nas_ip=None):
+        return f'{nas_ip or urlparse(url).hostname}|{username}'
+
+    @keyword('HDP: Login: Save session')
+    def save_session(self, driver, username, nas_ip=None):
+        """
+        Lib to cache cookies and local storage of logged in HDP, so other
+        drivers can skip login (HDP: Login: Restore session)
+
+        Arguments
+        | driver: Web driver of logged in HDP
+        | username: NAS username logged in
+        | nas_ip: NAS IP, default host of current URL
+        """
+        LOGGER.info('|___Save HDP session___|')
+
+        key = self._session_key(driver.current_url, username, nas_ip)
+        self._update_session_cache(key, {
+            'url': driver.current_url,
+            'cookies': driver.get_cookies(),
+            'local_storage': driver.execute_script(
+                'return Object.assign({}, window.localStorage);'),
+            'time': time.time(),
+        })
+
+        LOGGER.info(f'HDP session of {key} saved to {SESSION_CACHE_FILE}\n')
+        return True
+
+    @keyword('HDP: Login: Restore session')
+    def restore_session(self, driver, url, username, nas_ip=None,
+                        timeout=60):
+        """
+        Lib to open HDP with cached session instead of logging in
+        - Cookies and local storage are injected on NAS origin, then
+          HDP is opened; guide is skipped if shown
+        - Cached session is dropped if NAS shows login page (expired)
+
+        Arguments
+        | driver: Web driver of HDP
+        | url: HDP URL
+        | username: NAS username of cached session
+        | nas_ip: NAS IP, default host of url
+        | timeout: time in sec to wait for HDP or login page
+
+        Return True if HDP is logged in, False if full login is needed
+        """
+        LOGGER.info('|___Restore HDP session___|')
+
+        key = self._session_key(url, username, nas_ip)
+        session = self._load_session_cache().get(key)
+        if session is None:
+            LOGGER.info(f'No cached HDP session of {key}\n')
+            return False
+
+        # Cookies / storage can only be set on a page of NAS origin
+        driver.get(url)
+        try:
+            driver.delete_all_cookies()
+            for cookie in session['cookies']:
+                cookie.pop('sameSite', None)
+                if 'expiry' in cookie:
+                    cookie['expiry'] = int(cookie['expiry'])
+                driver.add_cookie(cookie)
+            driver.execute_script(
+                'var items = arguments[0];'
+                'Object.keys(items).forEach(function (k) {'
+                '    window.localStorage.setItem(k, items[k]); });',
+                session['local_storage'])
+        except WebDriverException as err:
+            LOGGER.info(f'Cached HDP session not applied: {err.msg}\n')
+            return False
+        driver.get(session['url'])
+
+        # NAS either shows HDP (session valid) or login page (expired)
+        def probe():
+            if driver.find_elements(By.ID, Loc.NAS_USERNAME_ID):
+                return 'expired'
+            if driver.title == Loc.HDP_TITLE:
+                return 'valid'
+            return None
+
+        state = wait_until(probe, timeout=int(timeout), interval=2,
+                           first_interval=0.25, name='HDP session restored',
+                           logger=LOGGER,
+                           error='Neither HDP nor login page is loaded')
+        if state == 'expired':
+            self._update_session_cache(key)
+            LOGGER.info(f'Cached HDP session of {key} expired\n')
+            return False
+
+        if driver.find_elements(By.XPATH, Loc.HDP_SKIP_GUIDE_XPATH):
+            self.skip_guide(driver)
+
+        LOGGER.info(f'HDP logged in with cached session of {key}\n')
+        return True
+
+    @keyword('HDP: Login: Login HDP with session')
+    def login_hdp_with_session(self, driver, url, username, password,
+                               nas_ip=None):
+        """
+        Lib to log in to HDP reusing cached session when still valid,
+        else full login (HDP: Login: Login HDP) whose session is cached
+
+        Arguments
+        | driver: Web driver element for HDP
+        | url: HDP URL
+        | username: NAS username to login
+        | password: NAS password to login
+        | nas_ip: NAS IP, default host of url
+
+        Return 'reused' or 'login'
+        """
+        LOGGER.info('|___Login to HDP with session___|')
+
+        if self.restore_session(driver, url, username, nas_ip):
+            LOGGER.info('Logged in to HDP with cached session\n')
+            return 'reused'
+
+        driver.delete_all_cookies()
+        driver.get(url)
+        self.login_hdp(driver, username, password)
+        self.save_session(driver, username,
+                          nas_ip or urlparse(url).hostname)
+
+        LOGGER.info('Logged in to HDP and cached session\n')
+        return 'login'
+
     @keyword('HDP: Login: Validate URL is loaded')
     def validate_url_is_loaded(self, driver, timeout=None):
         """
@@ -103,20 +334,15 @@ class Login:
         """
         LOGGER.info("|___Validate URL is loaded___|")
 
-        timeout = timeout or self.hdp.check_timeout
-        start_time = time.time()
-        while True:
-            if time.time() - start_time > int(timeout):
-                raise ValueError("URL is not loaded in browser")
-
-            try:
-                WebDriverWait(driver, 2).until(ec.presence_of_element_located((
-                    By.ID, Loc.NAS_USERNAME_ID)))
-                break
-            except TimeoutException:
-                LOGGER.info("URL is not loaded yet, pending retry...")
+        def pending(_):
+            LOGGER.info("URL is not loaded yet, pending retry...")
 
-            time.sleep(2)
+        timeout = timeout or self.hdp.check_timeout
+        wait_until(
+            lambda: driver.find_elements(By.ID, Loc.NAS_USERNAME_ID),
+            timeout=int(timeout), pending=pending, interval=2,
+            first_interval=0.25, name='HDP URL loaded', logger=LOGGER,
+            error="URL is not loaded in browser")
 
         LOGGER.info("URL is loaded successfully\n")
         return True
@@ -132,20 +358,15 @@ class Login:
         """
         LOGGER.info("|___Validate HDP is logged in___|")
 
+        def pending(_):
+            LOGGER.info("HDP is not logged in yet, pending retry...")
+
         timeout = timeout or self.hdp.check_timeout
-        start_time = time.time()
-        while True:
-            if time.time() - start_time > int(timeout):
-                raise ValueError("URL is not loaded in browser")
-
-            try:
-                WebDriverWait(driver, 2).until(ec.presence_of_element_located((
-                    By.XPATH, Loc.HDP_SKIP_GUIDE_XPATH)))
-                break
-            except TimeoutException:
-                LOGGER.info("HDP is not logged in yet, pending retry...")
-
-            time.sleep(2)
+        wait_until(
+            lambda: driver.find_elements(By.XPATH, Loc.HDP_SKIP_GUIDE_XPATH),
+            timeout=int(timeout), pending=pending, interval=2,
+            first_interval=0.25, name='HDP logged in', logger=LOGGER,
+            error="URL is not loaded in browser")
 
         LOGGER.info("HDP is logged in successfully\n")
         return True
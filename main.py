@@ -1,6 +1,8 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 # pylint: disable=
+import os
+import atexit
 from typing import TYPE_CHECKING
 from qnaplib.hero.main import HEROClient
 from qnaplib.ts.main import TSClient
@@ -9,6 +11,8 @@ from baselib.robotlogger import RobotLogger
 from baselib.robotkeyword import keyword
 from baselib.mount import Mount
 import qnaplib.errinj.nas_utils as NAS_UTILS
+from qnaplib.errinj.nas_utils.batch import CommandBatch
+from qnaplib.errinj.nas_utils.lease import LeaseManager
 
 LOGGER = RobotLogger(__name__)
 
@@ -23,6 +27,18 @@ class NAS:
         # NAS product tag (auto detect)
         self.product = None
 
+        # Keep login info for extra channels (e.g. streaming commands)
+        self.ip_addr = ip_addr
+        self.username = username
+        self.password = password
+
+        # Lease NAS before touching it (enabled by NAS_LEASE_DB env)
+        # NAS_LEASE_MODE=disks: share NAS, lease disks by Reserve disks
+        self.lease = None
+        if ip_addr and os.environ.get('NAS_LEASE_DB') and \
+                os.environ.get('NAS_LEASE_MODE', 'device') == 'device':
+            self.acquire_lease()
+
         # Define product and load corresponding client
         if ip_addr:
             self.product = self.define_product(ip_addr, username, password)
@@ -42,10 +58,12 @@ class NAS:
 
     @property
     def cli(self):
+        self.check_lease()
         return self.instance.cli
 
     @property
     def qcli(self):
+        self.check_lease()
         return self.instance.qcli
 
     @property
@@ -58,12 +76,59 @@ class NAS:
 
     @property
     def fltinj(self):
+        self.check_lease()
         return self.instance.fltinj
 
     @property
     def lux(self):
         return self.client.lux
 
+    @keyword('NAS: Acquire lease')
+    def acquire_lease(self, resources=None, timeout=None, ttl=None):
+        '''
+        Lease NAS from the shared lease DB (wait in queue if in use)
+        - Called by __init__ if NAS_LEASE_DB env is set
+        - Released by `NAS: Release lease` (suite teardown) or on exit
+
+        Arguments
+        | resources: resources to lease (default: whole NAS 'nas:<ip>')
+        | timeout:   seconds to wait (default NAS_LEASE_TIMEOUT or 3600)
+        | ttl:       lease ttl, renewed by heartbeat (default 600)
+        '''
+        if self.lease is not None and not self.lease.released:
+            return True
+
+        # Robot passes keyword arguments as strings
+        timeout = int(timeout or os.environ.get('NAS_LEASE_TIMEOUT', 3600))
+        ttl = int(ttl or 600)
+        self.lease = LeaseManager(ttl=ttl).acquire(
+            resources or f'nas:{self.ip_addr}', timeout=timeout)
+        atexit.register(self.lease.release)
+        return True
+
+    @keyword('NAS: Release lease')
+    def release_lease(self):
+        '''
+        Release NAS lease (no-op if leasing not used)
+        '''
+        if self.lease is not None:
+            self.lease.release()
+        return True
+
+    @keyword('NAS: Check lease')
+    def check_lease(self):
+        '''
+        Fail if NAS / disk lease of this run was lost (expired and
+        possibly taken by another run), so tests stop driving the NAS
+        - Checked on every cli / qcli / fltinj access
+        '''
+        if self.lease is not None:
+            self.lease.check()
+        for lease in getattr(getattr(self, 'utils', None), 'disk_leases',
+                             []):
+            lease.check()
+        return True
+
     def define_product(self, ip_addr, username, password):
         client = LinuxClient(ip_addr, username, password)
         is_hero = client.run(
@@ -95,6 +160,25 @@ class NAS:
             return True
         return self.cli.run(cmd)
 
+    def batch(self, stop_on_error=False):
+        '''
+        Create CommandBatch to send several commands in one round trip
+        '''
+        return CommandBatch(self.cli, stop_on_error=stop_on_error)
+
+    @keyword('NAS: CLI run batch')
+    def run_batch(self, *cmds, stop_on_error=False):
+        '''
+        Run several CLI commands on NAS in one round trip
+        - Raise error if any command exit code != 0
+
+        Return list of command outputs
+        '''
+        batch = self.batch(stop_on_error=stop_on_error)
+        for cmd in cmds:
+            batch.add(cmd)
+        return batch.outputs()
+
     @keyword('NAS: Mount server')
     def mount(self, server_ip=None, server_path=None, local_path=None,
               username=None, password=None, version='1.0'):
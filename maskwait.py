@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import time
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.common.by import By
+from .poller import wait_until
+
+# Runs in browser (async): arguments = css selector, debounce ms,
+# timeout ms, callback. One MutationObserver per document is shared by all
+# waiters, each waiter resolves true once no element matches the selector
+# for debounce ms, false on timeout.
+MASK_WAIT_SCRIPT = '''
+var selector = arguments[0], debounce = arguments[1], timeout = arguments[2];
+var done = arguments[arguments.length - 1];
+
+var state = window.__nasMaskWait;
+if (!state) {
+    state = window.__nasMaskWait = {waiters: [], observer: null};
+}
+if (!state.observer) {
+    state.observer = new MutationObserver(function () {
+        state.waiters.slice().forEach(function (w) { w.check(); });
+    });
+    state.observer.observe(document.documentElement, {
+        childList: true, subtree: true, attributes: true,
+        attributeFilter: ['class', 'style']});
+}
+
+var waiter = {settle: null, deadline: null};
+function finish(result) {
+    clearTimeout(waiter.settle);
+    clearTimeout(waiter.deadline);
+    var idx = state.waiters.indexOf(waiter);
+    if (idx >= 0) { state.waiters.splice(idx, 1); }
+    done(result);
+}
+waiter.check = function () {
+    if (document.querySelector(selector) !== null) {
+        clearTimeout(waiter.settle);
+        waiter.settle = null;
+    } else if (waiter.settle === null) {
+        waiter.settle = setTimeout(function () { finish(true); }, debounce);
+    }
+};
+state.waiters.push(waiter);
+waiter.deadline = setTimeout(function () { finish(false); }, timeout);
+waiter.check();
+'''
+
+
+def _css_selector(locator):
+    if isinstance(locator, str):
+        return locator
+    by, value = locator
+    if by == By.CLASS_NAME:
+        return f'.{value}'
+    if by == By.ID:
+        return f'#{value}'
+    if by in (By.CSS_SELECTOR, By.TAG_NAME):
+        return value
+    raise ValueError(f'Loading mask locator must be css / class / id: '
+                     f'{locator}')
+
+
+def wait_loading_mask(driver, locator, timeout=120, debounce=0.3,
+                      name='loading mask', logger=None, error=None):
+    '''
+    Wait till loading mask is gone and stays gone for debounce seconds
+
+    Waits inside the page (MutationObserver + execute_async_script), so it
+    returns as soon as the mask disappears, with one WebDriver call. Falls
+    back to polling find_elements if the page navigates while waiting.
+
+    Arguments
+    | driver:   selenium web driver
+    | locator:  css selector or (By, value) of mask element
+    |           (css selector / class / id)
+    | timeout:  max seconds to wait
+    | debounce: seconds mask has to stay gone
+    | error:    message of ValueError raised on timeout
+
+    Return seconds waited
+    '''
+    timeout = float(timeout)
+    selector = _css_selector(locator)
+    error = error or f'{name} still shown after {timeout:.0f}s'
+    start_time = time.time()
+
+    # Script timeout is driver wide, restore it for later async scripts
+    script_timeout = driver.timeouts.script
+    try:
+        driver.set_script_timeout(timeout + 10)
+        try:
+            gone = driver.execute_async_script(
+                MASK_WAIT_SCRIPT, selector, int(debounce * 1000),
+                int(timeout * 1000))
+        finally:
+            driver.set_script_timeout(script_timeout)
+    except WebDriverException as err:
+        # Document unloaded (navigation) while waiting, poll new page
+        if logger is not None:
+            logger.debug(f'{name} observer interrupted ({err.msg}), polling')
+        remaining = max(timeout - (time.time() - start_time), 0)
+        gone = wait_until(
+            lambda: not driver.find_elements(By.CSS_SELECTOR, selector),
+            remaining, interval=1, first_interval=0.1, stable=2,
+            stable_interval=debounce, name=name, logger=logger, error=error)
+
+    if not gone:
+        raise ValueError(error)
+    elapsed = time.time() - start_time
+    if logger is not None:
+        logger.debug(f'{name} gone after {elapsed:.2f}s')
+    return elapsed
@@ -14,11 +14,19 @@ from selenium.common.exceptions import InvalidSessionIdException
 from selenium.webdriver.common.action_chains import ActionChains
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.keys import Keys
+from robot.libraries.BuiltIn import BuiltIn
 
 from NetBak_Libraries.locators import NetBakLocators as Loc
 
 from NAS_Libraries.robotlogger import RobotLogger
 from NAS_Libraries.robotkeyword import keyword
+from qnaplib.errinj.nas_utils.poller import wait_until
+from qnaplib.errinj.nas_utils.table import extract_column
+from qnaplib.errinj.nas_utils.maskwait import wait_loading_mask
+from qnaplib.errinj.nas_utils.netidle import enable_network_logging
+from qnaplib.errinj.nas_utils.netidle import drop_network_monitor
+from qnaplib.errinj.nas_utils.netidle import wait_network_idle
+from qnaplib.errinj.nas_utils.netidle import export_network_timings
 
 LOGGER = RobotLogger(__name__)
 
@@ -27,6 +35,8 @@ class NetBak:
     def __init__(self):
         self.driver = None
         self.check_timeout = 120
+        # Logged in app kept alive across tests (NetBak: Open session)
+        self.session = None
         self.mouse_pointer = None
 
     @property
@@ -56,6 +66,8 @@ class NetBak:
 
         opts = Options()
         opts.binary_location = app_path
+        # Record CDP Network events (NetBak: Wait network idle)
+        enable_network_logging(opts)
         if self._get_selenium_version < '4.0.0':
             self.driver = webdriver.Chrome(executable_path=chromedriver_path,
                                            options=opts)
@@ -75,6 +87,43 @@ class NetBak:
         LOGGER.info('App launched successfully\n')
         return True
 
+    @keyword('NetBak: Wait network idle')
+    def wait_network_idle(self, pattern='/HyperDataProtector/', idle_ms=500,
+                          timeout=60):
+        """
+        Lib to wait till app has no backend request in flight
+
+        Arguments
+        | pattern: Regex of request URLs to wait for
+        | idle_ms: Time in ms without matching request in flight
+        | timeout: Time in sec to wait
+        """
+        LOGGER.info('|___Wait network idle___|')
+
+        samples = wait_network_idle(
+            self.driver, idle=int(idle_ms) / 1000, timeout=int(timeout),
+            pattern=pattern, logger=LOGGER)
+
+        LOGGER.info(f'Network idle, {len(samples)} requests completed\n')
+        return samples
+
+    @keyword('NetBak: Export API timings')
+    def export_api_timings(self, filename='netbak_api_timings.json',
+                           pattern='/HyperDataProtector/'):
+        """
+        Lib to save latency of backend requests recorded so far
+
+        Arguments
+        | filename: JSON file name under output directory
+        | pattern: Regex of request URLs
+        """
+        LOGGER.info('|___Export API timings___|')
+
+        path = export_network_timings(self.driver, filename, pattern)
+
+        LOGGER.info(f'API timings saved to {path}\n')
+        return path
+
     def _enter_values(self, web_element, text):
         """
         Lib to enter (write) values as strings based on web element
@@ -203,10 +252,117 @@ class NetBak:
             return True
         LOGGER.debug(f"Open windows: {windows}")
         self.driver.close()
+        drop_network_monitor(self.driver)
+        self.session = None
 
         LOGGER.info('App closed successfully\n')
         return True
 
+    def _session_is_healthy(self):
+        """
+        Lib to check app window is alive and still logged in
+        """
+        try:
+            self.driver.window_handles
+            return bool(
+                self.driver.find_elements(
+                    By.CSS_SELECTOR, Loc.DEVICE_TARGET_TAB_CSS) or
+                self.driver.find_elements(
+                    By.CSS_SELECTOR, Loc.OVERVIEW_TAB_CSS))
+        except Exception as err:
+            LOGGER.debug(f"App session not usable: {err}")
+            return False
+
+    def _quit_app(self):
+        """
+        Lib to end driver and app, ignoring already dead sessions
+        """
+        self.session = None
+        if self.driver is None:
+            return True
+        try:
+            self.driver.quit()
+        except Exception as err:
+            LOGGER.debug(f"Driver quit failed: {err}")
+        drop_network_monitor(self.driver)
+        self.driver = None
+        return True
+
+    @keyword('NetBak: Open session')
+    def open_session(self, chromedriver_path, app_path, nas_ip, username,
+                     password, cold_start=False):
+        """
+        Lib to get a logged in app, reusing the one of previous test
+        - Reused if launched with same app / NAS / user, app window alive
+          and still logged in; UI is reset by refreshing app
+        - Relaunched (Launch app + Login app) otherwise, after a failed
+          test, after Logout app, or on cold start
+        - Tests tagged netbak_cold_start always get a fresh app
+
+        Arguments
+        | chromedriver_path: Executable path of chromedriver
+        | app_path: Executable path of NetBak app
+        | nas_ip: NAS IP to be entered to connect to app
+        | username: Username of the NAS
+        | password: Password of the NAS
+        | cold_start: Set True to force relaunch
+
+        Return 'reused' or 'launched'
+        """
+        LOGGER.info('|___Open app session___|')
+
+        key = (chromedriver_path, app_path, nas_ip, username)
+        tags = BuiltIn().get_variable_value('@{TEST TAGS}', [])
+        cold_start = cold_start or 'netbak_cold_start' in tags
+
+        if not cold_start and self.session == key and \
+                self._session_is_healthy():
+            try:
+                self.refresh_app()
+                self.validate_nb_loading_page()
+                LOGGER.info('Reusing app session\n')
+                return 'reused'
+            except Exception as err:
+                LOGGER.info(f'App session reset failed, relaunching: {err}')
+
+        self._quit_app()
+        self.launch_app(chromedriver_path, app_path)
+        self.login_app(nas_ip, username, password)
+        self.session = key
+
+        LOGGER.info('Launched new app session\n')
+        return 'launched'
+
+    @keyword('NetBak: Release session')
+    def release_session(self):
+        """
+        Lib to end test using app session (Test Teardown)
+        - Session is kept for next test if test passed
+        - App is closed if test failed or session was not reusable
+        """
+        LOGGER.info('|___Release app session___|')
+
+        status = BuiltIn().get_variable_value('${TEST STATUS}', 'PASS')
+        if self.session is not None and status == 'PASS':
+            LOGGER.info('App session kept for next test\n')
+            return True
+
+        self._quit_app()
+        LOGGER.info(f'App session closed (test {status})\n')
+        return True
+
+    @keyword('NetBak: Close session')
+    def close_session(self):
+        """
+        Lib to close app session at the end of suite (Suite Teardown)
+        """
+        LOGGER.info('|___Close app session___|')
+
+        self._quit_app()
+
+        LOGGER.info('App session closed\n')
+        return True
+
     @keyword('NetBak: Validate invalid NAS IPs')
     def validate_invalid_ip(self, nas_ips):
         """
@@ -580,20 +736,21 @@ class NetBak:
         """
         LOGGER.info('|___Validate expected backup job status___|')
 
-        timeout = timeout or self.check_timeout
-        start_time = time.time()
-        while True:
-            if time.time() - start_time > int(timeout):
-                raise ValueError(f"Backup job is not in "
-                                 f"{expected_status} state")
+        def probe():
             job_status = self.driver.find_element(By.CLASS_NAME,
                                                   Loc.BACKUP_STATUS_CLS).text
             LOGGER.debug(f'Current job status:{job_status}')
-            if expected_status in job_status:
-                break
+            return expected_status in job_status
+
+        def pending(_):
             LOGGER.info(f"Backup job is still not found in {expected_status} "
                         f"state, pending retry...")
-            time.sleep(2)
+
+        timeout = timeout or self.check_timeout
+        wait_until(probe, timeout=int(timeout), pending=pending, interval=2,
+                   first_interval=0.25, name='backup job status',
+                   logger=LOGGER,
+                   error=f"Backup job is not in {expected_status} state")
 
         LOGGER.info(f'Job is found in {expected_status} state\n')
         return True
@@ -1553,6 +1710,8 @@ class NetBak:
         # Logout from app
         self.driver.find_element(By.CSS_SELECTOR, Loc.MORE_BUTTON_CSS).click()
         self.driver.find_element(By.XPATH, Loc.LOGOUT_APP_XPATH).click()
+        # Session is no longer logged in, next Open session relaunches
+        self.session = None
 
         # Validate app is logged out
         try:
@@ -1793,19 +1952,10 @@ class NetBak:
         LOGGER.info("|___Validate NB loading page___|")
 
         timeout = timeout or self.check_timeout
-        start_time = time.time()
-
-        while True:
-            if time.time() - start_time > int(timeout):
-                raise ValueError("NetBak page is still loading after waiting")
-
-            try:
-                self.driver.find_element(By.CLASS_NAME, Loc.LOADING_PAGE_CLS)
-            except NoSuchElementException:
-                break
-
-            LOGGER.debug("NB page is still loading, pending retry...")
-            time.sleep(2)
+        wait_loading_mask(
+            self.driver, (By.CLASS_NAME, Loc.LOADING_PAGE_CLS),
+            timeout=int(timeout), name='NB loading page', logger=LOGGER,
+            error="NetBak page is still loading after waiting")
 
         LOGGER.info("NB page loaded successfully\n")
         return True
@@ -1828,14 +1978,11 @@ class NetBak:
         except TimeoutException:
             self.driver.find_element(By.CSS_SELECTOR,
                                      Loc.OVERVIEW_TAB_CSS).click()
-        # Get Volumes count used in backup job
-        volumes_count = self.driver.find_elements(
-            By.CSS_SELECTOR, Loc.OVERVIEW_VOLUMES_COUNT_CSS)
-        LOGGER.debug(f"Volumes count: {volumes_count}")
-        volumes = []
-        for volume in range(1, len(volumes_count)+1):
-            volumes.append(self.driver.find_element(
-                By.XPATH, Loc.OVERVIEW_VOLUMES_TEXT_XPATH.format(volume)).text)
+        # Get Volumes used in backup job
+        volumes = extract_column(
+            self.driver, (By.CSS_SELECTOR, Loc.OVERVIEW_VOLUMES_COUNT_CSS),
+            (By.XPATH, Loc.OVERVIEW_VOLUMES_TEXT_XPATH))
+        LOGGER.debug(f"Volumes count: {len(volumes)}")
 
         LOGGER.info(f"Retrieved volumes in NB backup job: {volumes}\n")
         return volumes
@@ -2045,12 +2192,14 @@ class NetBak:
 
         logs_results = []
         self.validate_nb_loading_page()
-        logs_count = self.driver.find_elements(
-            By.CSS_SELECTOR, Loc.JOB_HISTORY_DATA_CSS)
-        LOGGER.debug(f"Logs count in page: {logs_count}")
-        for i in range(3, len(logs_count) + 3):
-            result = self.driver.find_element(
-                By.CSS_SELECTOR, Loc.JOB_HISTORY_RESULT_CSS.format(i)).text
+        # Result cells of log rows start at 3rd row of grid
+        results = extract_column(
+            self.driver, (By.CSS_SELECTOR, Loc.JOB_HISTORY_DATA_CSS),
+            (By.CSS_SELECTOR, Loc.JOB_HISTORY_RESULT_CSS), start=3)
+        LOGGER.debug(f"Logs count in page: {len(results)}")
+        for result in results:
+            if result is None:
+                raise ValueError("Log result not found in job history")
             if "." in result:
                 result = result.split(".")[0]
             if result not in logs_results:
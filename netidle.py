@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+import re
+import json
+import time
+import weakref
+from robot.libraries.BuiltIn import BuiltIn
+from robot.running.context import EXECUTION_CONTEXTS
+from selenium.common.exceptions import WebDriverException
+from .poller import wait_until
+
+# Chrome performance log carries CDP Network.* events
+NETWORK_LOG_PREFS = {'performance': 'ALL'}
+HDP_API_PATTERN = '/HyperDataProtector/'
+
+
+def enable_network_logging(opts):
+    '''
+    Let Chrome driver created with opts record CDP Network events
+    (must be called before webdriver.Chrome(options=opts))
+    '''
+    opts.set_capability('goog:loggingPrefs', NETWORK_LOG_PREFS)
+    return opts
+
+
+class NetworkMonitor(object):
+    '''
+    Follow CDP Network events of one Chrome driver
+
+    Reading the performance log drains it for the whole driver, so one
+    monitor per driver records every request, from
+    Network.requestWillBeSent till Network.loadingFinished / loadingFailed;
+    queries filter by URL pattern. Every completed request is kept as a
+    latency sample.
+    '''
+
+    def __init__(self, driver):
+        # Weak reference: registry entry goes away with the driver
+        self._driver = weakref.ref(driver)
+        self.inflight = {}
+        self.samples = []
+        self.start_time = time.time()
+        self.supported = True
+
+    @property
+    def driver(self):
+        return self._driver()
+
+    def _on_event(self, method, params):
+        request_id = params.get('requestId')
+        if method == 'Network.requestWillBeSent':
+            request = params.get('request', {})
+            self.inflight[request_id] = {
+                'url': request.get('url', ''),
+                'method': request.get('method'),
+                'start': params.get('timestamp'), 'status': None}
+        elif request_id not in self.inflight:
+            return
+        elif method == 'Network.responseReceived':
+            self.inflight[request_id]['status'] = \
+                params.get('response', {}).get('status')
+        elif method in ('Network.loadingFinished', 'Network.loadingFailed'):
+            request = self.inflight.pop(request_id)
+            start, end = request.pop('start'), params.get('timestamp')
+            request['latency_ms'] = round((end - start) * 1000, 1) \
+                if start is not None and end is not None else None
+            request['failed'] = method == 'Network.loadingFailed'
+            request['time'] = time.time()
+            self.samples.append(request)
+
+    def poll(self, pattern=HDP_API_PATTERN):
+        '''
+        Drain performance log, return number of requests matching pattern
+        in flight (None if driver was not started with
+        enable_network_logging)
+        '''
+        if not self.supported or self.driver is None:
+            return None
+        try:
+            entries = self.driver.get_log('performance')
+        except WebDriverException:
+            self.supported = False
+            return None
+        for entry in entries:
+            message = json.loads(entry['message']).get('message', {})
+            if message.get('method', '').startswith('Network.'):
+                self._on_event(message['method'], message.get('params', {}))
+        regex = re.compile(pattern)
+        return sum(1 for request in self.inflight.values()
+                   if regex.search(request['url']))
+
+    def matching(self, pattern=HDP_API_PATTERN, first=0):
+        '''
+        Return samples[first:] whose URL matches pattern
+        '''
+        regex = re.compile(pattern)
+        return [sample for sample in self.samples[first:]
+                if regex.search(sample['url'])]
+
+    def _last_activity(self, regex):
+        for sample in reversed(self.samples):
+            if regex.search(sample['url']):
+                return sample['time']
+        return self.start_time
+
+    def wait_idle(self, idle=0.5, timeout=60, pattern=HDP_API_PATTERN):
+        '''
+        Wait till no request matching pattern is in flight for idle seconds
+
+        Return matching samples completed while waiting (None if not
+        supported)
+        '''
+        first = len(self.samples)
+        regex = re.compile(pattern)
+
+        def probe():
+            inflight = self.poll(pattern)
+            if inflight is None:
+                return True
+            return inflight == 0 and \
+                time.time() - self._last_activity(regex) >= float(idle)
+
+        wait_until(probe, timeout, interval=0.25, first_interval=0.05,
+                   jitter=0, name='network idle',
+                   error=f'{pattern} requests still in flight '
+                         f'after {timeout}s')
+        return self.matching(pattern, first) if self.supported else None
+
+    def summary(self, pattern=HDP_API_PATTERN):
+        '''
+        Return {method path: {'count', 'avg_ms', 'max_ms', 'failed'}}
+        '''
+        grouped = {}
+        for sample in self.matching(pattern):
+            path = sample['url'].split('?')[0].split('://')[-1]
+            path = path[path.find('/'):] if '/' in path else path
+            grouped.setdefault(f'{sample["method"]} {path}', []).append(sample)
+
+        result = {}
+        for key, samples in grouped.items():
+            latencies = [sample['latency_ms'] for sample in samples
+                         if sample['latency_ms'] is not None]
+            result[key] = {
+                'count': len(samples),
+                'avg_ms': round(sum(latencies) / len(latencies), 1)
+                          if latencies else None,
+                'max_ms': max(latencies) if latencies else None,
+                'failed': sum(int(sample['failed']) for sample in samples),
+            }
+        return result
+
+    def export(self, json_file, pattern=HDP_API_PATTERN):
+        with open(json_file, 'w') as out:
+            json.dump({'pattern': pattern, 'summary': self.summary(pattern),
+                       'samples': self.matching(pattern)}, out, indent=2)
+        return json_file
+
+
+# One monitor per driver, dropped when the driver is garbage collected
+# or by drop_network_monitor when it quits
+_MONITORS = weakref.WeakKeyDictionary()
+
+
+def get_network_monitor(driver):
+    '''
+    Return NetworkMonitor of driver (one per browser session)
+    '''
+    if driver not in _MONITORS:
+        _MONITORS[driver] = NetworkMonitor(driver)
+    return _MONITORS[driver]
+
+
+def drop_network_monitor(driver):
+    '''
+    Forget monitor of driver (call when driver quits)
+    '''
+    _MONITORS.pop(driver, None)
+
+
+def wait_network_idle(driver, idle=0.5, timeout=60, pattern=HDP_API_PATTERN,
+                      logger=None):
+    '''
+    Wait till no request matching pattern is in flight for idle seconds,
+    log latency of backend calls completed meanwhile
+    - Returns at once if driver does not record network events
+
+    Return list of {'url', 'method', 'status', 'latency_ms', 'failed'}
+    '''
+    samples = get_network_monitor(driver).wait_idle(idle, timeout, pattern)
+    if logger is not None:
+        for sample in samples or []:
+            logger.debug(f'API {sample["method"]} {sample["url"]} '
+                         f'{sample["status"]} {sample["latency_ms"]}ms')
+    return samples or []
+
+
+def export_network_timings(driver, filename='hdp_api_timings.json',
+                           pattern=HDP_API_PATTERN):
+    '''
+    Write latency samples of driver under ${OUTPUT DIR} (or current dir)
+    '''
+    outdir = '.'
+    if EXECUTION_CONTEXTS.current is not None:
+        outdir = BuiltIn().get_variable_value('${OUTPUT DIR}', '.')
+    monitor = get_network_monitor(driver)
+    monitor.poll(pattern)
+    return monitor.export(os.path.join(outdir, filename), pattern)
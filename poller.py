@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import time
+import random
+
+
+class Poller(object):
+    '''
+    Wait till a probe reports the expected condition
+
+    - First probe runs immediately, following probes back off exponentially
+      from first_interval up to interval (max sleep between probes)
+    - jitter spreads sleeps by +/- ratio so parallel waits do not align
+    - stable=N requires N consecutive matching probes, spaced by
+      stable_interval, before the wait succeeds
+    - Never sleeps past the deadline; one last probe runs at the deadline
+
+    Metrics of the last wait are kept in probes / elapsed (time to
+    condition) and summary().
+    '''
+
+    def __init__(self, timeout, interval=5, first_interval=1, backoff=2,
+                 jitter=0.1, stable=1, stable_interval=None, name='condition',
+                 logger=None):
+        self.timeout = float(timeout)
+        self.interval = float(interval)
+        self.first_interval = min(float(first_interval), self.interval)
+        self.backoff = float(backoff)
+        self.jitter = float(jitter)
+        self.stable = int(stable)
+        self.stable_interval = float(
+            interval if stable_interval is None else stable_interval)
+        self.name = name
+        self.logger = logger
+
+        self.probes = 0
+        self.elapsed = None
+
+    def _sleep_time(self, delay, deadline):
+        if self.jitter:
+            delay *= 1 + random.uniform(-self.jitter, self.jitter)
+        return max(0, min(delay, deadline - time.time()))
+
+    def summary(self):
+        return (f'{self.name}: {self.probes} probes, '
+                f'{self.elapsed:.1f}s to condition')
+
+    def wait(self, probe, pending=None, error=None):
+        '''
+        Run probe() till it returns a truthy value
+
+        Arguments
+        | probe:   callable, return truthy value once condition is met
+        | pending: callable(value), called after each probe which does not
+        |          end the wait (e.g. log pending retry message)
+        | error:   message of ValueError raised on timeout
+
+        Return the last probe value
+        '''
+        start_time = time.time()
+        deadline = start_time + self.timeout
+        delay = self.first_interval
+        matched = 0
+        self.probes = 0
+        self.elapsed = None
+
+        while True:
+            value = probe()
+            self.probes += 1
+
+            if value:
+                matched += 1
+                if matched >= self.stable:
+                    self.elapsed = time.time() - start_time
+                    if self.logger is not None:
+                        self.logger.debug(f'Wait {self.summary()}')
+                    return value
+                next_sleep = self.stable_interval
+            else:
+                matched = 0
+                next_sleep = delay
+                delay = min(delay * self.backoff, self.interval)
+
+            if time.time() >= deadline:
+                if self.logger is not None:
+                    self.logger.debug(
+                        f'Wait {self.name}: {self.probes} probes, '
+                        f'timeout after {self.timeout:.0f}s')
+                raise ValueError(
+                    error or f'{self.name} not met in {self.timeout}s')
+
+            if pending is not None:
+                pending(value)
+            time.sleep(self._sleep_time(next_sleep, deadline))
+
+
+def wait_until(probe, timeout, pending=None, error=None, **kwargs):
+    '''
+    Shortcut of Poller(timeout, **kwargs).wait(probe, pending, error)
+    '''
+    return Poller(timeout, **kwargs).wait(probe, pending=pending, error=error)
@@ -7,6 +7,8 @@ from selenium.webdriver.common.by import By
 
 from NAS_Libraries.robotlogger import RobotLogger
 from NAS_Libraries.robotkeyword import keyword
+from qnaplib.errinj.nas_utils.maskwait import wait_loading_mask
+from qnaplib.errinj.nas_utils.netidle import wait_network_idle
 from HDP_Libraries.main import HDP
 from HDP_Libraries.locators import Locators as Loc
 
@@ -36,7 +38,8 @@ class Repository:
         driver.find_element(By.XPATH, more_button).click()
         driver.find_element(By.XPATH, Loc.HDP_DETACH_REPOSITORY_XPATH).click()
         driver.find_element(By.XPATH, Loc.HDP_OK_BUTTON_XPATH).click()
-        self.hdp.validate_loading_page(driver)
+        wait_loading_mask(driver, Loc.HDP_LOADING_PAGE_CSS)
+        wait_network_idle(driver, logger=LOGGER)
 
         # Validate repository is detached
         driver.find_element(By.XPATH, more_button).click()
@@ -66,7 +69,8 @@ class Repository:
                       f"/ancestor::div[3]/div[6]/div"
         driver.find_element(By.XPATH, more_button).click()
         driver.find_element(By.XPATH, Loc.HDP_ATTACH_REPOSITORY_XPATH).click()
-        self.hdp.validate_loading_page(driver)
+        wait_loading_mask(driver, Loc.HDP_LOADING_PAGE_CSS)
+        wait_network_idle(driver, logger=LOGGER)
 
         # Validate repository is attached
         driver.find_element(By.XPATH, more_button).click()
@@ -99,7 +103,8 @@ class Repository:
         driver.find_element(By.XPATH,
                             Loc.HDP_DELETE_ACCEPT_REPOSITORY_XPATH).click()
         driver.find_element(By.XPATH, Loc.HDP_OK_BUTTON_XPATH).click()
-        self.hdp.validate_loading_page(driver)
+        wait_loading_mask(driver, Loc.HDP_LOADING_PAGE_CSS)
+        wait_network_idle(driver, logger=LOGGER)
 
         # Validate repository is deleted
         WebDriverWait(driver, 20).until_not(ec.presence_of_element_located((
@@ -130,7 +135,8 @@ class Repository:
             driver.find_element(By.XPATH,
                                 Loc.HDP_DELETE_ACCEPT_REPOSITORY_XPATH).click()
             driver.find_element(By.XPATH, Loc.HDP_OK_BUTTON_XPATH).click()
-            self.hdp.validate_loading_page(driver)
+            wait_loading_mask(driver, Loc.HDP_LOADING_PAGE_CSS)
+            wait_network_idle(driver, logger=LOGGER)
 
         # Validate all repositories deleted
         WebDriverWait(driver, 20).until(ec.visibility_of_element_located((
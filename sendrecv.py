@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import re
+import time
+import uuid
+import threading
+from typing import TYPE_CHECKING
+from .stream import RemoteStream
+
+if TYPE_CHECKING:
+    from .main import NAS
+
+# `zfs send -P -v` lines (tab separated)
+# full	zpool2/fs@snap2	1073741824
+# incremental	snap1	zpool2/fs@snap2	52428800
+# size	1073741824
+# 10:21:05	268435456	zpool2/fs@snap2
+PROGRESS_RE = re.compile(r'^\d{2}:\d{2}:\d{2}\s+(\d+)\s+\S+$')
+ESTIMATE_RE = re.compile(r'^(?:full|incremental)\s.*\s(\d+)$')
+SIZE_RE = re.compile(r'^size\s+(\d+)$')
+
+
+class SendRecvStream(object):
+    '''
+    `zfs send -P -v | zfs recv` on a dedicated SSH channel
+
+    Progress lines printed by zfs send every second are recorded as
+    (seconds since start, bytes sent), so throughput is known end to end
+    and per phase:
+    - setup:     start till first progress line (estimate, holds, open)
+    - streaming: first till last progress line
+    - finish:    last progress line till exit (recv commit / sync)
+    '''
+
+    def __init__(self, client: "NAS", snapshot, target, from_snap=None,
+                 raw=False, recv_options='-F'):
+        self.client = client
+        self.snapshot = snapshot
+        self.target = target
+        self.from_snap = from_snap
+        self.raw = raw
+        self.recv_options = recv_options
+
+        self.estimate = None
+        self.samples = []
+        self.output = []
+        self.exit_code = None
+        self.start_time = None
+        self.end_time = None
+
+        self._token = f'@@SENDRECV_{uuid.uuid4().hex[:8]}@@'
+        self._lock = threading.Lock()
+        self._stream = None
+
+    @property
+    def cmd(self):
+        send_opts = '-P -v'
+        if self.raw:
+            send_opts += ' -w'
+        if self.from_snap:
+            send_opts += f' -i {self.from_snap}'
+        return (f'set -o pipefail 2>/dev/null; '
+                f'( zfs send {send_opts} {self.snapshot} | '
+                f'zfs recv {self.recv_options} {self.target} ) 2>&1; '
+                f'echo "{self._token} $?"')
+
+    @property
+    def alive(self):
+        return self._stream is not None and self._stream.alive
+
+    @property
+    def finished(self):
+        return self.exit_code is not None or \
+            (self._stream is not None and not self._stream.alive)
+
+    def _on_line(self, line):
+        now = time.time()
+        stripped = line.strip()
+        with self._lock:
+            if stripped.startswith(self._token):
+                self.exit_code = int(stripped.split()[-1])
+                self.end_time = now
+                return
+            match = PROGRESS_RE.match(stripped)
+            if match:
+                self.samples.append(
+                    (round(now - self.start_time, 2), int(match.group(1))))
+                return
+            match = SIZE_RE.match(stripped) or ESTIMATE_RE.match(stripped)
+            if match:
+                self.estimate = int(match.group(1))
+                return
+            if stripped:
+                self.output.append(stripped)
+
+    def start(self):
+        self.start_time = time.time()
+        self._stream = RemoteStream(
+            self.client.ip_addr, self.client.username, self.client.password,
+            cmd=self.cmd, on_line=self._on_line)
+        self._stream.start()
+        return self
+
+    def stop(self):
+        if self._stream is not None:
+            self._stream.stop()
+        if self.end_time is None:
+            self.end_time = time.time()
+        return self
+
+    def result(self):
+        '''
+        Return dict
+        | snapshot / target / from_snap / raw / exit_code / output
+        | bytes:     bytes sent (last progress, else estimate)
+        | estimate:  size estimated by zfs send
+        | duration / rate:    end to end seconds, bytes/s
+        | phases:    {setup|streaming|finish: {'duration', 'bytes', 'rate'}}
+        | samples:   [(seconds, bytes sent), ..]
+        '''
+        with self._lock:
+            samples = list(self.samples)
+        end = (self.end_time or time.time()) - self.start_time
+        sent = samples[-1][1] if samples else 0
+        if self.exit_code == 0 and self.estimate:
+            # Last second of stream is not reported by progress lines
+            sent = max(sent, self.estimate)
+
+        first = samples[0] if samples else (end, 0)
+        last = samples[-1] if samples else (end, 0)
+        phases = {
+            'setup': (first[0], first[1]),
+            'streaming': (last[0] - first[0], last[1] - first[1]),
+            'finish': (end - last[0], sent - last[1]),
+        }
+        return {
+            'snapshot': self.snapshot,
+            'target': self.target,
+            'from_snap': self.from_snap,
+            'raw': self.raw,
+            'exit_code': self.exit_code,
+            'output': '\n'.join(self.output),
+            'bytes': sent,
+            'estimate': self.estimate,
+            'duration': round(end, 2),
+            'rate': int(sent / end) if end > 0 else None,
+            'phases': {
+                name: {'duration': round(duration, 2), 'bytes': size,
+                       'rate': int(size / duration) if duration > 0 else None}
+                for name, (duration, size) in phases.items()},
+            'samples': samples,
+        }
@@ -1,12 +1,16 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 # pylint: disable=redefined-builtin, unused-argument, invalid-name
+# pylint: disable=broad-except
 from typing import TYPE_CHECKING
 import tool.tool as tool
 from baselib.robotlogger import RobotLogger
 from baselib.robotkeyword import keyword
 LOGGER = RobotLogger(__name__)
 
+# ZFS user property of golden pool snapshot, pool disks at capture
+GOLDEN_DISKS_PROP = 'nas:golden_disks'
+
 if TYPE_CHECKING:
     from .main import NAS
 
@@ -16,6 +20,11 @@ class Setup(object):
     def __init__(self, client: "NAS"):
         self.client = client
 
+        # Golden state captured by Capture golden state (or loaded back
+        # from the NAS by Reset to golden state in a later suite)
+        # {'pool_id', 'snap_name', 'datasets', 'disks'}
+        self.golden = None
+
     @property
     def product(self):
         return self.client.product
@@ -43,9 +52,20 @@ class Setup(object):
         - Delete all LUNs
         - Delete all volume and pool
         - Disable all global spare disks
+
+        If disks are reserved (Reserve disks), only the run's own disks
+        are restored / recovered, NAS wide objects are left to their owners.
+        qcli only removes all pools at once, so pools left on reserved
+        disks are reported and must be removed by the suite
         '''
         self.client.utils.plug_in_disk()
         self.client.utils.recover_raid_disks_error(timeout=240)
+        # Pools are re-created, golden state no longer valid
+        self.golden = None
+        if self.client.utils.reserved_ports is not None:
+            LOGGER.info('Disks reserved, skip NAS wide clean up')
+            self._check_reserved_pools()
+            return
         self.qcli.hdd.disable_all_enclosure_spare()
         self.qcli.iscsibackup.delete_all_jobs()
         self.client.utils.check_jobs_expected_state('updated', timeout=500)
@@ -61,6 +81,166 @@ class Setup(object):
         elif self.product == 'TS':
             self.qcli.pool.remove_all_but_keep_major_pool(force=True)
             self.qcli.volume.remove_all_but_keep_major_vol()
+        self.client.utils.invalidate_storage_info()
+        self.client.zfs.invalidate_zdb_index()
+
+    def _check_reserved_pools(self):
+        '''
+        Report pools left on the reserved disks (they are no longer free
+        for Get reserved free disks of the next run)
+        '''
+        utils = self.client.utils
+        storage = utils._get_storage_info(refresh=True)
+        pools = sorted({storage[port]['Pool'] for port in utils.reserved_ports
+                        if port in storage and
+                        storage[port]['Pool'] not in ('', '-', '--')})
+        if pools:
+            LOGGER.info(f'Pools {pools} left on reserved disks '
+                        f'{utils.reserved_ports}, remove them before '
+                        f'releasing the disks')
+        return pools
+
+    @keyword('NAS: Setup: Capture golden state')
+    def capture_golden_state(self, pool_id, snap_name='golden'):
+        '''
+        Capture known-good pool / dataset layout for fast reset (HERO only)
+        - Take recursive snapshot of every dataset of zpool<pool_id>
+        - Remember dataset list and pool disks to verify on reset; disks
+          are also kept on the NAS (user property nas:golden_disks of
+          the pool snapshot), so later suites can reset without capture
+        - Call once after pool / shared folder / test files are prepared
+        '''
+        LOGGER.info('|___Capture Golden State___|')
+
+        if self.product != 'HERO':
+            raise ValueError('Golden state is only supported on HERO!')
+
+        zpool = f'zpool{pool_id}'
+        self.client.cli.run(
+            f'zfs destroy -r {zpool}@{snap_name} > /dev/null 2>&1 || true')
+        self.client.zfs.create_zfs_snapshot(zpool, snap_name, recursive=True)
+
+        datasets = self.client.cli.run(
+            f'zfs list -H -o name -t filesystem,volume -r {zpool}').split()
+        disks = self.client.utils.get_pool_raid_disks(pool_id)
+        self.client.cli.run(f'zfs set {GOLDEN_DISKS_PROP}={",".join(disks)} '
+                            f'{zpool}@{snap_name}')
+        self.golden = {
+            'pool_id': str(pool_id),
+            'snap_name': snap_name,
+            'datasets': datasets,
+            'disks': disks,
+        }
+
+        LOGGER.info(f'Golden state captured: {len(datasets)} datasets\n')
+        return True
+
+    def _load_golden_state(self, pool_id, snap_name):
+        '''
+        Rebuild golden state from the NAS: datasets holding the golden
+        snapshot and disks recorded by Capture golden state
+
+        Return golden state dict, None if no golden snapshot on pool
+        '''
+        zpool = f'zpool{pool_id}'
+        disks = self.client.cli.run(
+            f'zfs get -H -o value {GOLDEN_DISKS_PROP} {zpool}@{snap_name} '
+            f'2>/dev/null || true').strip()
+        if disks in ('', '-'):
+            return None
+        snapshots = self.client.cli.run(
+            f'zfs list -H -o name -t snapshot -r {zpool}').split()
+        return {
+            'pool_id': str(pool_id),
+            'snap_name': snap_name,
+            'datasets': [snap.split('@')[0] for snap in snapshots
+                         if snap.endswith(f'@{snap_name}')],
+            'disks': disks.split(','),
+        }
+
+    @keyword('NAS: Setup: Reset to golden state')
+    def reset_golden_state(self, reimport=False, pool_id=None,
+                           snap_name='golden'):
+        '''
+        Reset NAS to the captured golden state instead of re-creating it
+        - Golden state of this suite is used, else (new robot process)
+          it is loaded from golden snapshot of zpool<pool_id> on the NAS
+        - Restore unplugged drives and recover disk error
+        - Export / import pool if pool not Ready (or reimport=True)
+        - Destroy datasets created after capture, rollback every golden
+          dataset to the golden snapshot
+        - Fall back to full Clean environment if golden state missing or
+          damaged (the golden state is dropped then)
+
+        Arguments
+        | reimport:  Boolean, export / import pool even if Ready
+        | pool_id:   Pool of golden state captured by an earlier suite
+        | snap_name: Golden snapshot name given to Capture golden state
+
+        Return:
+        | golden / clean (which reset path was taken)
+        '''
+        LOGGER.info('|___Reset To Golden State___|')
+
+        if self.golden is None and pool_id is not None and \
+                self.product == 'HERO':
+            self.golden = self._load_golden_state(pool_id, snap_name)
+            if self.golden is not None:
+                LOGGER.info(f'Golden state loaded from '
+                            f'zpool{pool_id}@{snap_name}')
+
+        if self.golden is None:
+            LOGGER.info('No golden state, fall back to clean environment')
+            self.clean_env()
+            return 'clean'
+
+        utils = self.client.utils
+        zfs = self.client.zfs
+        pool_id = self.golden['pool_id']
+        zpool = f'zpool{pool_id}'
+        snap_name = self.golden['snap_name']
+        try:
+            # Restore drive state
+            utils.plug_in_disk()
+            utils.recover_raid_disks_error(timeout=240)
+            if utils.get_pool_raid_disks(pool_id) != self.golden['disks']:
+                raise ValueError('Pool disks differ from golden state')
+
+            # Pool still in error state, re-import to reset runtime state
+            status = self.qcli.pool.info(
+                action='get', section='table', column='Status',
+                pool_id=pool_id)
+            if reimport or status != 'Ready':
+                zfs.export_zfs_pool(pool_id)
+                zfs.import_zfs_pool(pool_id)
+                self.client.cli.run('zfs mount -a')
+
+            datasets = self.client.cli.run(
+                f'zfs list -H -o name -t filesystem,volume -r {zpool}').split()
+            missing = set(self.golden['datasets']) - set(datasets)
+            if missing:
+                raise ValueError(f'Golden datasets missing: {missing}')
+
+            # Drop datasets created after capture (children first)
+            for dataset in sorted(set(datasets) - set(self.golden['datasets']),
+                                  reverse=True):
+                self.client.cli.run(f'zfs destroy -r {dataset}')
+
+            for dataset in self.golden['datasets']:
+                zfs.rollback_zfs_snapshot(f'{dataset}@{snap_name}',
+                                          recursive=True)
+        except Exception as err:
+            LOGGER.info(f'Golden state damaged ({err}), '
+                        'fall back to clean environment')
+            self.golden = None
+            self.clean_env()
+            return 'clean'
+        finally:
+            utils.invalidate_storage_info()
+            zfs.invalidate_zdb_index(pool_id)
+
+        LOGGER.info('NAS reset to golden state\n')
+        return 'golden'
 
     @keyword('NAS: Setup: Clean iSCSI objects')
     def clean_iscsi(self):
@@ -69,6 +249,7 @@ class Setup(object):
         '''
         self.qcli.iscsi.remove_all_targets()
         self.qcli.iscsi.remove_all_luns()
+        self.client.zfs.invalidate_zdb_index()
 
     def _convert_raidlevel(self, raid_level):
         if raid_level is None:
@@ -156,10 +337,19 @@ return the pool / volume ID directly
         | raid_disk = diskID (if not provide, auto select disks)
         | raid_disk_num = how many disks to build tha raid (if not provide,
         | select minimum raid disk requirement)
+
+        If disks are reserved (Reserve disks) and raid_disks not provided,
+        raid disks are picked from the free reserved disks
         '''
         raid_level = self._convert_raidlevel(raid_level)
+        if raid_disks is None and \
+                self.client.utils.reserved_ports is not None:
+            raid_disks = self.client.utils.get_reserved_free_disks(
+                count=raid_disk_num)
         kwargs = tool.passing_func_args(locals())
         pool_id = self.qcli.pool.create(**kwargs)
+        self.client.utils.invalidate_storage_info()
+        self.client.zfs.invalidate_zdb_index(pool_id)
         return pool_id
 
     @keyword('NAS: Setup: Set Rebuild Priority')
@@ -232,6 +422,7 @@ return the pool / volume ID directly
             lun_id = self.qcli.iscsi.create_block_lun(
                 pool_id=pool_id, capacity=capacity,
                 allocation=allocation, name=name)
+        self.client.zfs.invalidate_zdb_index(pool_id)
         return lun_id
 
     @keyword('NAS: Setup: Enable LUN')
@@ -313,7 +504,9 @@ return the pool / volume ID directly
         - This method is only for HERO
         '''
         kwargs = tool.passing_func_args(locals())
-        return self.qcli.sharedfolder.create(**kwargs)
+        ret = self.qcli.sharedfolder.create(**kwargs)
+        self.client.zfs.invalidate_zdb_index(pool_id)
+        return ret
 
     @keyword('NAS: Setup: Set global spare disk')
     def set_global_spare(self, enslosure_id=None, disktype='hdd'):
@@ -323,7 +516,9 @@ return the pool / volume ID directly
         disk_id = self.qcli.hdd.pick_spare_disk(enslosure_id, disktype)
         # check and update disk volume config
         self.client.utils.check_update_disk_volume_conf(disk_id)
-        return self.qcli.hdd.set_enclosure_spare(disk_id, enable='Enabled')
+        ret = self.qcli.hdd.set_enclosure_spare(disk_id, enable='Enabled')
+        self.client.utils.invalidate_storage_info()
+        return ret
 
     @keyword('NAS: Setup: Set pool hot spare disk')
     def set_hot_spare(self, pool_id, disktype='hdd'):
@@ -332,7 +527,9 @@ return the pool / volume ID directly
         - This method is only for HERO
         '''
         kwargs = tool.passing_func_args(locals())
-        return self.qcli.pool.enable_hot_spare(**kwargs)
+        ret = self.qcli.pool.enable_hot_spare(**kwargs)
+        self.client.utils.invalidate_storage_info()
+        return ret
 
     @keyword('NAS: Setup: Add iscsi backup job')
     def add_iscsi_backup_job(self, lun_id, job_name=None, image_name=None,
@@ -429,6 +626,7 @@ return the pool / volume ID directly
         '''
         kwargs = tool.passing_func_args(locals())
         snap_id = self.qcli.iscsisnapshot.take(**kwargs)
+        self.client.zfs.invalidate_zdb_index()
         return snap_id
 
     @keyword('NAS: Setup: Delete all ISCSI snapshots')
@@ -437,6 +635,7 @@ return the pool / volume ID directly
         Lib to delete all the ISCSI snapshots of the LUN
         '''
         self.qcli.iscsisnapshot.delete_all(lun_id)
+        self.client.zfs.invalidate_zdb_index()
         return True
 
     @keyword('NAS: Setup: Get LUN info')
@@ -473,6 +672,7 @@ return the pool / volume ID directly
         '''
         kwargs = tool.passing_func_args(locals())
         cache_id = self.qcli.cache.create(**kwargs)
+        self.client.utils.invalidate_storage_info()
         return cache_id
 
     @keyword('NAS: Setup: Get Volume info')
@@ -501,6 +701,7 @@ return the pool / volume ID directly
         '''
         kwargs = tool.passing_func_args(locals())
         snap_id = self.qcli.sharedfoldersnapshot.take(**kwargs)
+        self.client.zfs.invalidate_zdb_index()
         return snap_id
 
     @keyword('NAS: Setup: Delete all volume snapshots')
@@ -509,6 +710,7 @@ return the pool / volume ID directly
         Lib to delete volume snapshot
         '''
         self.qcli.sharedfoldersnapshot.delete_all(sharename)
+        self.client.zfs.invalidate_zdb_index()
         return True
 
     @keyword('NAS: Setup: Get cache folder BLV ID')
@@ -605,12 +807,22 @@ return the pool / volume ID directly
         return info
 
     @keyword('NAS: Setup: Recover raid group')
-    def recover_raid_group(self, pool_id):
+    def recover_raid_group(self, pool_id, monitor=False, timeout=None):
         '''
         Lib to recover raid group
+
+        Arguments
+        | pool_id: pool ID of raid group to recover
+        | monitor: Boolean, monitor the resilver till it finishes and
+        |          return its summary (see Monitor zpool scan)
+        | timeout: max seconds to wait resilver when monitor=True
         '''
         raid_id = self.qcli.raid.get_pool_raid_id(pool_id)
         self.qcli.raid.recover(raid_id)
+        self.client.utils.invalidate_storage_info()
+        if monitor:
+            return self.client.zfs.monitor_zpool_scan(
+                f'zpool{pool_id}', timeout=timeout)
         return True
 
     @keyword('NAS: Setup: Set snapsync service')
@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# pylint: disable=broad-except
+import threading
+import paramiko
+from baselib.robotlogger import RobotLogger
+LOGGER = RobotLogger(__name__)
+
+
+class RemoteStream(object):
+    '''
+    Follow output of a long running NAS command over a dedicated SSH channel
+
+    Each complete output line is handed to on_line(line) from a reader
+    thread, so callback must be thread safe and must not log to robot.
+    Closing the stream closes the pty, which terminates the remote command.
+    '''
+
+    def __init__(self, ip_addr, username, password, cmd, on_line,
+                 port=22, connect_timeout=30):
+        self.ip_addr = ip_addr
+        self.username = username
+        self.password = password
+        self.port = port
+        self.cmd = cmd
+        self.on_line = on_line
+        self.connect_timeout = connect_timeout
+
+        self.exit_status = None
+        self.error = None
+        self._ssh = None
+        self._channel = None
+        self._thread = None
+        self._stopping = False
+
+    @property
+    def alive(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        '''
+        Open SSH channel and start following command output
+        '''
+        if self.alive:
+            return self
+
+        LOGGER.debug(f'Open stream [{self.cmd}] on {self.ip_addr}')
+        self._ssh = paramiko.SSHClient()
+        self._ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        self._ssh.connect(
+            self.ip_addr, port=self.port, username=self.username,
+            password=self.password, timeout=self.connect_timeout,
+            look_for_keys=False, allow_agent=False)
+        transport = self._ssh.get_transport()
+        transport.set_keepalive(15)
+
+        self._channel = transport.open_session()
+        # pty makes remote command die with the channel
+        self._channel.get_pty()
+        self._channel.exec_command(self.cmd)
+
+        self._stopping = False
+        self.exit_status = None
+        self.error = None
+        self._thread = threading.Thread(
+            target=self._read_loop, name=f'stream-{self.cmd.split()[0]}',
+            daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        '''
+        Close channel (terminate remote command) and wait reader thread
+        '''
+        self._stopping = True
+        for handle in (self._channel, self._ssh):
+            try:
+                if handle is not None:
+                    handle.close()
+            except Exception:
+                pass
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._channel = None
+        self._ssh = None
+        LOGGER.debug(f'Stream [{self.cmd}] closed')
+        return True
+
+    def _read_loop(self):
+        pending = b''
+        try:
+            while True:
+                data = self._channel.recv(65536)
+                if not data:
+                    break
+                pending += data
+                *lines, pending = pending.split(b'\n')
+                for line in lines:
+                    self.on_line(
+                        line.decode('utf-8', 'replace').rstrip('\r'))
+            if pending:
+                self.on_line(pending.decode('utf-8', 'replace').rstrip('\r'))
+            if not self._stopping:
+                self.exit_status = self._channel.recv_exit_status()
+        except Exception as err:
+            if not self._stopping:
+                self.error = err
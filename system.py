@@ -1,11 +1,12 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 import time
-from selenium.common.exceptions import NoSuchElementException
 from selenium.webdriver.common.by import By
 
 from NAS_Libraries.robotlogger import RobotLogger
 from NAS_Libraries.robotkeyword import keyword
+from qnaplib.errinj.nas_utils.maskwait import wait_loading_mask
+from qnaplib.errinj.nas_utils.table import extract_table
 from HDP_Libraries.main import HDP
 from HDP_Libraries.locators import Locators as Loc
 
@@ -16,6 +17,16 @@ class System:
     def __init__(self):
         self.hdp = HDP()
 
+    @staticmethod
+    def _get_hdp_logs(driver):
+        """
+        Get content and date time of every log row in one round trip
+        """
+        return extract_table(
+            driver, (By.CSS_SELECTOR, Loc.HDP_SYSTEM_LOGS_COUNT_CSS),
+            {'content': (By.XPATH, Loc.HDP_SYSTEM_LOGS_CONTENT_XPATH),
+             'date_time': (By.XPATH, Loc.HDP_SYSTEM_LOGS_DATE_TIME_XPATH)})
+
     @keyword('HDP: System: Validate HDP logs after NetBak login')
     def validate_hdp_logs_after_netbak_login(
             self, driver, inv_name, repo_name):
@@ -30,25 +41,21 @@ class System:
         LOGGER.info("|___Validate HDP logs after NetBak login___|")
 
         driver.find_element(By.CSS_SELECTOR, Loc.HDP_SYSTEM_CSS).click()
-        self.hdp.validate_loading_page(driver)
+        wait_loading_mask(driver, Loc.HDP_LOADING_PAGE_CSS)
 
         # Validate logs generated
-        try:
-            driver.find_element(By.CSS_SELECTOR, Loc.HDP_SYSTEM_LOGS_COUNT_CSS)
-        except NoSuchElementException:
+        logs = self._get_hdp_logs(driver)
+        if not logs:
             raise ValueError("No HDP logs generated after NetBak login")
 
-        # Get logs count
-        logs_count = driver.find_elements(
-            By.CSS_SELECTOR, Loc.HDP_SYSTEM_LOGS_COUNT_CSS)
         count = 0
-        for i in range(1, len(logs_count)+1):
+        for log in logs:
             if count == 2:
                 break
-            content = driver.find_element(
-                By.XPATH, Loc.HDP_SYSTEM_LOGS_CONTENT_XPATH.format(i)).text
-            if content in Loc.INV_REFRESH_LOGS.format(inv_name) or \
-                    content in Loc.REPO_REFRESH_LOGS.format(repo_name):
+            content = log['content']
+            if content is not None and (
+                    content in Loc.INV_REFRESH_LOGS.format(inv_name) or
+                    content in Loc.REPO_REFRESH_LOGS.format(repo_name)):
                 LOGGER.debug(f"Found expected HDP logs: {content}")
                 count += 1
 
@@ -72,25 +79,20 @@ class System:
         LOGGER.info("|___Get date time for HDP logs after NetBak login___|")
 
         driver.find_element(By.CSS_SELECTOR, Loc.HDP_SYSTEM_CSS).click()
-        self.hdp.validate_loading_page(driver)
+        wait_loading_mask(driver, Loc.HDP_LOADING_PAGE_CSS)
 
         # # Get date time for refresh logs
-        logs_count = driver.find_elements(
-            By.CSS_SELECTOR, Loc.HDP_SYSTEM_LOGS_COUNT_CSS)
         count = 0
         date_time_logs = []
-        for i in range(1, len(logs_count)+1):
+        for log in self._get_hdp_logs(driver):
             if count == 2:
                 break
-            content = driver.find_element(
-                By.XPATH, Loc.HDP_SYSTEM_LOGS_CONTENT_XPATH.format(i)).text
-            if content in Loc.INV_REFRESH_LOGS.format(inv_name) or \
-                    content in Loc.REPO_REFRESH_LOGS.format(repo_name):
+            content = log['content']
+            if content is not None and (
+                    content in Loc.INV_REFRESH_LOGS.format(inv_name) or
+                    content in Loc.REPO_REFRESH_LOGS.format(repo_name)):
                 LOGGER.debug(f"Found expected HDP logs: {content}")
-                date_time = driver.find_element(
-                    By.XPATH, Loc.HDP_SYSTEM_LOGS_DATE_TIME_XPATH.format(
-                        i)).text
-                date_time_logs.append(date_time)
+                date_time_logs.append(log['date_time'])
                 count += 1
 
         # Validate if date time logs are retrieved
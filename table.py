@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Runs in browser: arguments = row by, row locator, columns, start index
+# columns = [[name, by, locator], ..]
+# - empty locator:           text of row itself
+# - locator with {}:         document wide locator, {} = row position
+#                            (start, start + 1, ..)
+# - other locator:           relative to row element (e.g. './div[4]')
+TABLE_SCRIPT = '''
+var rowBy = arguments[0], rowLoc = arguments[1];
+var columns = arguments[2], start = arguments[3];
+
+function findAll(by, loc, ctx) {
+    if (by === 'xpath') {
+        var res = document.evaluate(loc, ctx, null,
+            XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        var found = [];
+        for (var i = 0; i < res.snapshotLength; i++) {
+            found.push(res.snapshotItem(i));
+        }
+        return found;
+    }
+    if (by === 'class name') { loc = '.' + loc; }
+    if (by === 'id') { loc = '#' + loc; }
+    return Array.prototype.slice.call(ctx.querySelectorAll(loc));
+}
+
+function text(el) {
+    if (!el) { return null; }
+    var value = el.innerText !== undefined ? el.innerText : el.textContent;
+    return (value || '').trim();
+}
+
+return findAll(rowBy, rowLoc, document).map(function (row, idx) {
+    var record = {};
+    columns.forEach(function (col) {
+        var name = col[0], by = col[1], loc = col[2], el;
+        if (!loc) {
+            el = row;
+        } else if (loc.indexOf('{}') >= 0) {
+            el = findAll(by, loc.split('{}').join(String(idx + start)),
+                         document)[0];
+        } else {
+            el = findAll(by, loc, row)[0];
+        }
+        record[name] = text(el);
+    });
+    return record;
+});
+'''
+
+
+def extract_table(driver, rows, columns=None, start=1):
+    '''
+    Read a whole grid with one execute_script call instead of one
+    find_element(..).text round trip per cell
+
+    Arguments
+    | driver:  selenium web driver
+    | rows:    (By, locator) matching every row
+    | columns: {name: (By, locator)}, locator is relative to row, or a
+    |          document wide template with {} replaced by row position
+    |          (start, start + 1, ..), None = text of row itself
+    | start:   position of first row in templates (e.g. nth-of-type(3))
+
+    Return list of {name: text} (text is None if cell not found)
+    '''
+    columns = columns or {'text': None}
+    cols = [[name, loc[0], loc[1]] if loc else [name, None, '']
+            for name, loc in columns.items()]
+    return driver.execute_script(TABLE_SCRIPT, rows[0], rows[1], cols,
+                                 int(start)) or []
+
+
+def extract_column(driver, rows, column=None, start=1):
+    '''
+    Shortcut of extract_table for one column, return list of text
+    '''
+    return [record['text'] for record in
+            extract_table(driver, rows, {'text': column}, start)]
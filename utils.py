@@ -1,7 +1,11 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 # pylint: disable=unused-argument, broad-except, too-many-lines
+import os
+import re
 import time
+import uuid
+import base64
 import random
 from typing import TYPE_CHECKING
 from robot.libraries.BuiltIn import BuiltIn
@@ -9,12 +13,22 @@ from robot.running.context import EXECUTION_CONTEXTS
 import tool.tool as tool
 from baselib.robotlogger import RobotLogger
 from baselib.robotkeyword import keyword
+from .dmesg import DmesgWatcher
+from .poller import Poller, wait_until
+from .lease import LeaseManager
 LOGGER = RobotLogger(__name__)
 
 if TYPE_CHECKING:
     from .main import NAS
 
 
+class ConditionError(ValueError):
+    '''
+    Condition can no longer be met (e.g. more error disks than expected),
+    raised by probes to end a wait before timeout
+    '''
+
+
 class Utils(object):
 
     def __init__(self, client: "NAS"):
@@ -26,6 +40,21 @@ class Utils(object):
         self.ctrler_type = None
         self.ctrler_retry_count = None
 
+        # qcli_storage snapshot shared by read-only keywords
+        # Dropped after storage_cache_ttl seconds or on topology changes
+        self.storage_cache_ttl = 3
+        self._storage_cache = None
+        self._storage_cache_time = 0
+
+        # Streaming dmesg follower (started on demand)
+        self.dmesg_watcher = None
+
+        # Ports reserved for this run (None: whole NAS belongs to run)
+        self.reserved_ports = None
+        self.disk_leases = []
+        # Ports unplugged by this client (port_id given to Plug-out disk)
+        self.unplugged_ports = []
+
     @property
     def cli(self):
         return self.client.cli
@@ -56,9 +85,14 @@ class Utils(object):
 
     @keyword('NAS: Utils: Save debug information')
     def save_debug_info(self):
-        self.clear_dmesg_printing_output()
-        self.cli.run('qcli_storage || true')
-        self.cli.run('df -h  || true')
+        if self.dmesg_watcher is not None:
+            self.dmesg_watcher.clear()
+
+        batch = self.client.batch()
+        for cmd in ('dmesg -c', 'qcli_storage', 'df -h'):
+            batch.add(cmd, check=False)
+        for result in batch.run():
+            LOGGER.debug(f'CMD [{result.cmd}]\n{result.output}')
 
     @keyword('NAS: Utils: Clear dmesg and hide output')
     def clear_dmesg_ignore_output(self):
@@ -68,6 +102,8 @@ class Utils(object):
         - Usually being called before test start
         '''
         LOGGER.info('|___Clear DMESG And Hide Output___|')
+        if self.dmesg_watcher is not None:
+            self.dmesg_watcher.clear()
         cmd = 'dmesg -c > /dev/null 2>&1'
         self.cli.run(cmd)
 
@@ -82,6 +118,8 @@ class Utils(object):
         - Usually being called after test end
         '''
         LOGGER.info('|___Clear DMESG And Printing___|')
+        if self.dmesg_watcher is not None:
+            self.dmesg_watcher.clear()
 
         cmd = 'dmesg -c'
         self.cli.run(cmd)
@@ -89,31 +127,88 @@ class Utils(object):
         LOGGER.info('dmesg cleared and printed to debug level!\n')
         return True
 
+    @keyword('NAS: Utils: Start dmesg watcher')
+    def start_dmesg_watcher(self):
+        '''
+        Start following dmesg (dmesg -w) on a dedicated SSH channel
+        - Check string in dmesg keyword wakes as soon as the line arrives
+        - Started automatically by Check string show up in dmesg
+        '''
+        if self.dmesg_watcher is None:
+            self.dmesg_watcher = DmesgWatcher(self.client)
+        self.dmesg_watcher.start()
+        return True
+
+    @keyword('NAS: Utils: Stop dmesg watcher')
+    def stop_dmesg_watcher(self):
+        '''
+        Stop dmesg watcher and close its SSH channel
+        '''
+        if self.dmesg_watcher is not None:
+            self.dmesg_watcher.stop()
+        return True
+
+    def _ensure_dmesg_watcher(self):
+        '''
+        Return running dmesg watcher or None if streaming is not available
+        '''
+        if self.dmesg_watcher is not None and self.dmesg_watcher.alive:
+            return self.dmesg_watcher
+        try:
+            self.start_dmesg_watcher()
+        except Exception as err:
+            LOGGER.info(f'dmesg watcher not available ({err}), '
+                        'fallback to polling')
+            return None
+        return self.dmesg_watcher
+
     @keyword('NAS: Utils: Check string show up in dmesg')
     def check_str_in_dmesg(self, checkstr, timeout=None):
         '''
         Check if specific string shows up in dmesg output
         - Usually being called after test to check if expected error shows up
+        - Wait on streaming dmesg watcher, fallback to polling dmesg
         '''
         LOGGER.info(f'|___Check String {checkstr} Show Up In DMESG___|')
 
-        timeout = timeout or self.check_timeout
+        timeout = int(timeout or self.check_timeout)
         start_time = time.time()
-        while True:
-            if time.time() - start_time > int(timeout):
-                full_output = self.cli.run('cat dmesglog')
+
+        watcher = self._ensure_dmesg_watcher()
+        if watcher is not None:
+            found = watcher.wait_for(checkstr, timeout=timeout)
+            if found:
+                LOGGER.info(f'dmesg [{found[1]}]')
+                LOGGER.info('String shows up in dmesg!\n')
+                return True
+            if watcher.alive:
+                full_output = '\n'.join(watcher.lines())
                 raise ValueError(f'Check string [{checkstr}] '
                                  f'not found in dmesg\n {full_output}')
+            LOGGER.info('dmesg watcher stopped, fallback to polling')
+
+        remain = timeout - (time.time() - start_time)
+        return self._poll_str_in_dmesg(checkstr, max(remain, 0))
 
+    def _poll_str_in_dmesg(self, checkstr, timeout):
+        def probe():
             # Avoid cmd printing mess debug logs
-            self.cli.run('dmesg > dmesglog')
-            output = self.cli.run(f"grep '{checkstr}' dmesglog || true")
-            if output:
-                break
+            batch = self.client.batch()
+            batch.add('dmesg > dmesglog')
+            batch.add(f"grep '{checkstr}' dmesglog", check=False)
+            return batch.outputs()[-1]
 
+        def pending(_):
             LOGGER.info(f'{checkstr} is not in dmesg logs yet, '
                         f'pending retry...')
-            time.sleep(2)
+
+        try:
+            wait_until(probe, timeout=timeout, pending=pending, interval=2,
+                       name='string in dmesg', logger=LOGGER)
+        except ValueError:
+            full_output = self.cli.run('cat dmesglog')
+            raise ValueError(f'Check string [{checkstr}] '
+                             f'not found in dmesg\n {full_output}')
 
         LOGGER.info('String shows up in dmesg!\n')
         return True
@@ -143,18 +238,18 @@ class Utils(object):
         cmd = f"stat {filepath} | grep Inode | awk '{{print $4}}'"
         LOGGER.info(f'CMD [{cmd}]')
 
-        start_time = time.time()
-        while True:
-            if time.time() - start_time > self.check_timeout:
-                raise ValueError(
-                    f'{filepath} inode cannot be fetched properly!')
-
+        def probe():
             inode = self.cli.run(cmd)
-            if inode.isdigit():
-                break
+            return inode if inode.isdigit() else ''
+
+        def pending(_):
             LOGGER.info(f'{filepath} inode does not have value yet, '
                         'pending retry ..')
-            time.sleep(2)
+
+        inode = wait_until(
+            probe, timeout=self.check_timeout, pending=pending, interval=2,
+            name='file inode', logger=LOGGER,
+            error=f'{filepath} inode cannot be fetched properly!')
 
         LOGGER.info(f'File [{filepath}] inode [{inode}]\n')
         return inode
@@ -208,10 +303,11 @@ class Utils(object):
 
         randstr = tool.random_string(startwith='errinjtest_', length=10)
         filepath = f'{path}/{filename}'
-        self.cli.run(f'sudo rm {filepath} || true')
         cmd = f'sudo echo "{randstr}" > {filepath}'
         LOGGER.info(f'CMD [{cmd}]')
-        self.cli.run(cmd)
+        with self.client.batch() as batch:
+            batch.add(f'sudo rm {filepath}', check=False)
+            batch.add(cmd)
 
         LOGGER.info(f'{filename} created on [{filepath}]\n')
         return filepath
@@ -274,32 +370,49 @@ class Utils(object):
         LOGGER.info(f'Pool [{pool_id}]')
 
         timeout = timeout or self.check_timeout
-        start_time = time.time()
-
-        while True:
-            # Section to handle timeout
-            if time.time() - start_time > int(timeout):
-                raise ValueError(f'Pool [{pool_id}] expected status '
-                                 f'[{expected_status}] not show up!')
 
-            # Section to judge pool status
+        # Section to judge pool status
+        def probe():
             status = self.qcli.pool.info(
                 action='get', section='table',
                 column='Status', pool_id=pool_id)
-            if status == expected_status:
-                break
+            return status == expected_status
 
-            # Section to log and sleep before next retry
+        # Section to log before next retry
+        def pending(_):
             LOGGER.info(f'Pool {expected_status} not show up yet, '
                         'pending retry ..')
-            time.sleep(5)
+
+        wait_until(probe, timeout=int(timeout), pending=pending, interval=5,
+                   name=f'pool {expected_status}', logger=LOGGER,
+                   error=f'Pool [{pool_id}] expected status '
+                         f'[{expected_status}] not show up!')
 
         LOGGER.info(f'Pool [{pool_id}] expected {expected_status} occurs!\n')
         return True
 
-    def _get_storage_info(self):
+    def _get_storage_info(self, refresh=False):
+        '''
+        Get qcli_storage table as dict keyed by port
+        - Reuse the cached snapshot if younger than storage_cache_ttl
+        - refresh=True always fetch a new snapshot (use inside wait loops)
+        '''
+        cache_age = time.time() - self._storage_cache_time
+        if not refresh and self._storage_cache is not None and \
+                cache_age < self.storage_cache_ttl:
+            LOGGER.debug(f'Use storage info snapshot ({cache_age:.1f}s old)')
+            return {port: dict(data)
+                    for port, data in self._storage_cache.items()}
+
+        info = self._parse_storage_info(self.cli.run('qcli_storage'))
+        self._storage_cache = info
+        self._storage_cache_time = time.time()
+        return {port: dict(data) for port, data in info.items()}
+
+    @staticmethod
+    def _parse_storage_info(output):
         info = {}
-        lines = self.cli.run('qcli_storage').split('\n')
+        lines = output.split('\n')
         headers = lines[0].split()
         uidxs = [lines[0].find(head) for head in headers]
         for line in lines[1:]:
@@ -334,6 +447,18 @@ class Utils(object):
         #   }, ...
         return info
 
+    @keyword('NAS: Utils: Invalidate storage info cache')
+    def invalidate_storage_info(self):
+        '''
+        Drop the cached qcli_storage snapshot
+        - Called by keywords which change disk / pool topology
+        - Call it from suite after out-of-band changes (e.g. manual qcli)
+        '''
+        LOGGER.debug('Storage info snapshot invalidated')
+        self._storage_cache = None
+        self._storage_cache_time = 0
+        return True
+
     @keyword('NAS: Utils: Get pool raid disks')
     def get_pool_raid_disks(self, pool_id, spare=True):
         '''
@@ -349,6 +474,10 @@ class Utils(object):
         storage = self._get_storage_info()
         disk_ids = []
         for port, data in storage.items():
+            # Ignore disks reserved by other runs
+            if not self.is_reserved_port(port):
+                continue
+
             # Find disks of pool
             if data['Pool'] == str(pool_id):
                 dev = hex(int(port))[2:]
@@ -425,67 +554,59 @@ class Utils(object):
         LOGGER.info(f'  Check status [{status_str}]')
         LOGGER.info(f'  Expect [{count}] raid disks match the status')
 
-        # Define waiting period (10s) for count=0 scenario
-        # Each checking will minus 1 and pass the check if value == 0
-        # To promise the error disks not showing up in the time period
-        ensure_no_error_times = 5
+        match_disks = []
 
-        timeout = timeout or self.check_timeout
-        start_time = time.time()
+        def probe():
+            storage = self._get_storage_info(refresh=True)
+            match_disks[:] = [
+                disk for disk in disk_ids
+                # Convert diskID to Port
+                if exp_status in storage[str(int(disk[4:], 16))]['Sys_Name']]
 
-        while True:
-            if time.time() - start_time > int(timeout):
-                raise ValueError(f'Raid disks {disk_ids} expected {count} '
-                                 f'{status_str} but the result mismatch!')
+            # Wait for any disks to match the status
+            if count == 'any':
+                return len(match_disks) > 0
 
-            match_disks = []
-            storage = self._get_storage_info()
-            for disk in disk_ids:
-                port = str(int(disk[4:], 16))  # Convert diskID to Port
-                if exp_status in storage[port]['Sys_Name']:
-                    match_disks.append(disk)
+            # Wait for all disks to match the status
+            if count == 'all':
+                return sorted(match_disks) == sorted(disk_ids)
 
-            # Wait for any disks to match the status
+            # Wait for specific number of disks to match the status
+            if int(count) > 0:
+                if len(match_disks) > int(count):
+                    raise ValueError(f'Expect only {count} {status_str} raid '
+                                     f'disk but got {match_disks}!')
+                return len(match_disks) == int(count)
+
+            # Wait for no raid disks to match the status
+            return len(match_disks) == 0
+
+        def pending(_):
             if count == 'any':
-                if len(match_disks) > 0:
-                    break
                 LOGGER.info(f'No disks show {status_str}, pending '
                             f'[any] raid disks show {status_str} ..')
-
-            # Wait for all disks to match the status
             elif count == 'all':
-                if sorted(match_disks) == sorted(disk_ids):
-                    break
                 LOGGER.info(f'Current {status_str} disks {match_disks}, '
                             f'pending [all] raid disks show {status_str} ..')
-
-            # Wait for specific number of disks to match the status
             elif int(count) > 0:
-                if len(match_disks) == int(count):
-                    break
-                elif len(match_disks) > int(count):
-                    raise ValueError(f'Expect only {count} {status_str} raid '
-                                     f'disk but got {match_disks}!')
                 LOGGER.info(f'Current {status_str} disks {match_disks}, '
                             f'pending {count} raid disks show {status_str} ..')
-
-            # Wait for no raid disks to match the status
+            elif not match_disks:
+                LOGGER.info(f'Ensuring {status_str} not show up again ..')
             else:
-                if len(match_disks) == 0:
-                    ensure_no_error_times -= 1
-                    if ensure_no_error_times == 0:
-                        break
-                    else:
-                        LOGGER.info(
-                            f'Ensuring {status_str} not show up again ..')
-                        time.sleep(2)
-                        continue
-                else:
-                    LOGGER.info(
-                        f'{match_disks} still show {status_str}, pending '
-                        f'{count} raid disks show {status_str} ..')
+                LOGGER.info(
+                    f'{match_disks} still show {status_str}, pending '
+                    f'{count} raid disks show {status_str} ..')
 
-            time.sleep(5)
+        # For count=0 scenario the disks need to stay clean for 5 checks
+        # (2s apart) to promise the error disks not showing up in the period
+        stable = 5 if count not in ('any', 'all') and int(count) == 0 else 1
+        timeout = timeout or self.check_timeout
+        wait_until(probe, timeout=int(timeout), pending=pending, interval=5,
+                   stable=stable, stable_interval=2,
+                   name=f'{count} {status_str} disks', logger=LOGGER,
+                   error=f'Raid disks {disk_ids} expected {count} '
+                         f'{status_str} but the result mismatch!')
 
         LOGGER.info(f'Expected {count} {status_str} disks show up!\n')
         return True
@@ -524,6 +645,148 @@ class Utils(object):
         return self._check_raid_disks_status(
             disk_ids=disk_ids, count=count, timeout=timeout, status='warning')
 
+    def _collect_facts(self, zpool=None, dmesg=None):
+        '''
+        Fetch storage / zpool / dmesg state in one remote call
+        - Return dict keyed by 'storage', 'zpool', 'dmesg' (raw output)
+        '''
+        cmds = {'storage': 'qcli_storage'}
+        if zpool:
+            cmds['zpool'] = f'zpool status {zpool}'
+        if dmesg:
+            cmds['dmesg'] = f"dmesg | grep -F -- '{dmesg}'"
+
+        batch = self.client.batch()
+        for cmd in cmds.values():
+            batch.add(cmd, check=False)
+        facts = dict(zip(cmds, batch.outputs()))
+
+        self._storage_cache = self._parse_storage_info(facts['storage'])
+        self._storage_cache_time = time.time()
+        facts['storage'] = self._storage_cache
+        return facts
+
+    @keyword('NAS: Utils: Wait for conditions')
+    def wait_for_conditions(self, error_disks=None, error_count='all',
+                            warning_disks=None, warning_count='all',
+                            pool_id=None, pool_status=None,
+                            zpool=None, zpool_state=None,
+                            dmesg=None, timeout=None):
+        '''
+        Wait for several storage / pool / zpool / dmesg conditions at once
+        - All facts are collected in one batched remote call per tick
+          (pool status via qcli, only if pool condition given)
+        - Wait ends when all conditions hold on the same tick
+        - Time to satisfy of each condition is logged and returned
+
+        Arguments
+        | error_disks:   Disk ids list to check error status
+        | error_count:   all/any/n/0 (see Check error raid disks existence)
+        | warning_disks: Disk ids list to check warning status
+        | warning_count: all/any/n/0
+        | pool_id:       Pool id to check status
+        | pool_status:   Expected pool status (e.g. Warning, Error, Ready)
+        | zpool:         Zpool name to check state (e.g. zpool1)
+        | zpool_state:   Expected zpool state (e.g. DEGRADED)
+        | dmesg:         String expected to show up in dmesg
+        | timeout:       set specific check timeout (default=120s)
+
+        Return:
+        | {condition: seconds to satisfy}
+        '''
+        LOGGER.info('|___Wait For Conditions___|')
+
+        def disks_cond(disk_ids, count, sign, status_str):
+            def check(facts):
+                storage = facts['storage']
+                match_disks = [
+                    disk for disk in disk_ids
+                    if sign in storage[str(int(disk[4:], 16))]['Sys_Name']]
+                if count == 'any':
+                    return len(match_disks) > 0
+                if count == 'all':
+                    return sorted(match_disks) == sorted(disk_ids)
+                if len(match_disks) > int(count):
+                    raise ConditionError(
+                        f'Expect only {count} {status_str} raid disk but '
+                        f'got {match_disks}!')
+                return len(match_disks) == int(count)
+            return check
+
+        def zpool_cond(facts):
+            for line in facts['zpool'].splitlines():
+                if line.split(':')[0].strip() == 'state':
+                    return zpool_state.lower() in line.lower()
+            return False
+
+        conditions = {}
+        if error_disks:
+            conditions[f'{error_count} error disks'] = disks_cond(
+                error_disks, error_count, 'X', 'error')
+        if warning_disks:
+            conditions[f'{warning_count} warning disks'] = disks_cond(
+                warning_disks, warning_count, '!', 'warning')
+        if pool_id and pool_status:
+            conditions[f'pool {pool_id} {pool_status}'] = \
+                lambda facts: facts['pool'] == pool_status
+        if zpool and zpool_state:
+            conditions[f'{zpool} {zpool_state}'] = zpool_cond
+        if dmesg:
+            conditions[f'dmesg [{dmesg}]'] = \
+                lambda facts: dmesg in facts['dmesg']
+        if not conditions:
+            raise ValueError('No condition given to wait for!')
+
+        for name in conditions:
+            LOGGER.info(f'  Wait for [{name}]')
+
+        # As Check error raid disks existence: count=0 must hold for 5
+        # checks (2s apart) so error disks do not show up in the period
+        zero_counts = [count for disks, count in (
+            (error_disks, error_count), (warning_disks, warning_count))
+            if disks and count not in ('any', 'all') and int(count) == 0]
+        stable = 5 if zero_counts else 1
+
+        start_time = time.time()
+        satisfied = {}
+        pending_names = []
+
+        def probe():
+            facts = self._collect_facts(zpool=zpool_state and zpool,
+                                        dmesg=dmesg)
+            if pool_id and pool_status:
+                facts['pool'] = self.qcli.pool.info(
+                    action='get', section='table',
+                    column='Status', pool_id=pool_id)
+
+            pending_names[:] = []
+            for name, check in conditions.items():
+                if check(facts):
+                    satisfied.setdefault(name, time.time() - start_time)
+                else:
+                    pending_names.append(name)
+            return not pending_names
+
+        def pending(_):
+            LOGGER.info(f'Conditions {pending_names} not met yet, '
+                        'pending retry ..')
+
+        timeout = timeout or self.check_timeout
+        try:
+            wait_until(probe, timeout=int(timeout), pending=pending,
+                       interval=5, stable=stable, stable_interval=2,
+                       name='conditions', logger=LOGGER)
+        except ConditionError:
+            raise
+        except ValueError:
+            raise ValueError(f'Conditions {pending_names} not met in '
+                             f'{timeout}s (met: {list(satisfied)})')
+
+        for name, elapsed in satisfied.items():
+            LOGGER.info(f'  [{name}] satisfied after {elapsed:.1f}s')
+        LOGGER.info('All conditions met!\n')
+        return {name: round(elapsed, 1) for name, elapsed in satisfied.items()}
+
     @keyword('NAS: Utils: Recover raid disks error')
     def recover_raid_disks_error(self, timeout=None):
         '''
@@ -534,49 +797,62 @@ class Utils(object):
 
         storage = self._get_storage_info()
         for port, data in storage.items():
-            if 'X' in data['Sys_Name']:
+            if 'X' in data['Sys_Name'] and self.is_reserved_port(port):
                 dev = hex(int(port))
                 LOGGER.info(f'Recovering disk port {port} - {dev}')
                 self.cli.run(f'hal_event --pd_clear_error dev_id={dev}')
+        self.invalidate_storage_info()
 
-        timeout = timeout or self.check_timeout
-        start_time = time.time()
-        retry_flag = True
-
-        while True:
-            if time.time() - start_time > timeout:
-                if retry_flag:
-                    # Recover disks using plug-out, plug-in
-                    # In case not recovered using hal-event
-                    LOGGER.info('Disks not recovered using hal_event, '
-                                'retrying using plug-out, plug-in disks..')
-                    storage = self._get_storage_info()
-
-                    for data in storage.values():
-                        if 'X' in data['Sys_Name']:
-                            self.plug_out_disk(port_id=data['Port'])
-                            self.plug_in_disk()
-
-                    retry_flag = False
-                    timeout += timeout
-                else:
-                    raise ValueError(f'Raid disks error not recover!')
+        error_disks = []
 
-            error_disks = []
-            storage = self._get_storage_info()
+        def probe():
+            storage = self._get_storage_info(refresh=True)
+            error_disks[:] = []
             for data in storage.values():
-                if 'X' in data['Sys_Name']:
+                if 'X' in data['Sys_Name'] and \
+                        self.is_reserved_port(data['Port']):
                     dev = hex(int(data['Port']))[2:]
                     error_disks.append(f'0000{(4 - len(dev)) * "0" + dev}')
+            return not error_disks
 
-            if not error_disks:
-                break
+        def pending(_):
             LOGGER.info(f'{error_disks} still show error, pending retry ..')
-            time.sleep(5)
+
+        timeout = timeout or self.check_timeout
+        poller = Poller(timeout, interval=5, name='recover raid disks',
+                        logger=LOGGER)
+        try:
+            poller.wait(probe, pending=pending)
+        except ValueError:
+            # Recover disks using plug-out, plug-in
+            # In case not recovered using hal-event
+            LOGGER.info('Disks not recovered using hal_event, '
+                        'retrying using plug-out, plug-in disks..')
+            storage = self._get_storage_info(refresh=True)
+
+            for data in storage.values():
+                if 'X' in data['Sys_Name'] and \
+                        self.is_reserved_port(data['Port']):
+                    self.plug_out_disk(port_id=data['Port'])
+                    self.plug_in_disk()
+
+            poller.wait(probe, pending=pending,
+                        error='Raid disks error not recover!')
 
         LOGGER.info(f'All disks recovered!\n')
         return True
 
+    @keyword('NAS: Utils: Get output file path')
+    def get_output_path(self, filename):
+        '''
+        Get path of a result file under robot ${OUTPUT DIR}
+        (current directory if robot is not running)
+        '''
+        outdir = '.'
+        if EXECUTION_CONTEXTS.current is not None:
+            outdir = BuiltIn().get_variable_value('${OUTPUT DIR}', '.')
+        return os.path.join(outdir, filename)
+
     @keyword('NAS: Utils: Run keyword but expect error')
     def run_keyword_expect_error(self, func, *args, **kwargs):
         '''
@@ -632,8 +908,25 @@ class Utils(object):
         '''
         LOGGER.info(f'|___Unplugging port {port_id} disk___|')
 
+        # Keep plug-out inside the run's own disks
+        if self.reserved_ports is not None:
+            if port_id is None:
+                raise ValueError('port_id is required when disks reserved '
+                                 f'(reserved ports {self.reserved_ports})')
+            others = [port for port in str(port_id).split(',')
+                      if not self.is_reserved_port(port.strip())]
+            if others:
+                raise ValueError(f'Ports {others} not reserved by this run '
+                                 f'(reserved ports {self.reserved_ports})')
+
         self.fltinj.disk.pick_disk(port_id, count, disktype, free)
         self.fltinj.disk.plug_out()
+        self.invalidate_storage_info()
+
+        # port_id is mandatory when disks reserved, so own ports are known
+        if port_id is not None:
+            self.unplugged_ports.extend(
+                port.strip() for port in str(port_id).split(','))
 
         LOGGER.info('Unplugged the disks successfully!\n')
         return True
@@ -642,15 +935,143 @@ class Utils(object):
     def plug_in_disk(self):
         '''
         This library will restore unplugged drives
+        - Fault injection only restores all drives at once; if disks are
+          reserved it is skipped unless this client unplugged some of its
+          reserved ports, so an idle run does not plug in disks other runs
+          keep unplugged (runs unplugging at the same time still share it)
         '''
         LOGGER.info('|___Restoring unplugged disks___|')
 
+        if self.reserved_ports is not None and not self.unplugged_ports:
+            LOGGER.info('No reserved disk unplugged by this run\n')
+            return True
+
         self.fltinj.disk.restore_all()
+        self.unplugged_ports = []
         self.fltinj.disk.clear_picked_disk()
+        self.invalidate_storage_info()
 
         LOGGER.info('Restored the disks successfully!\n')
         return True
 
+    def is_reserved_port(self, port):
+        '''
+        Check port belongs to this run (always True if nothing reserved)
+        '''
+        return self.reserved_ports is None or \
+            str(port) in self.reserved_ports
+
+    @keyword('NAS: Utils: Reserve disks')
+    def reserve_disks(self, count=None, ports=None, timeout=None):
+        '''
+        Reserve free disks for this run, so several suites can test on
+        disjoint disks of the same NAS concurrently
+        - Disks are leased from the lease DB (if NAS_LEASE_DB env set),
+          wait till enough free disks can be leased
+        - Create pool / get pool raid disks / recover disks error /
+          plug-out disk are then limited to the reserved ports
+
+        Arguments
+        | count:   Number of free disks to reserve
+        | ports:   Specific ports to reserve (str, e.g. '3,4')
+        | timeout: Time to wait for disks (default=3600s)
+
+        Return:
+        | reserved ports in str format (e.g. '3,4')
+        '''
+        LOGGER.info('|___Reserve Disks___|')
+
+        if count is None and ports is None:
+            raise ValueError('Either count or ports must be provided!')
+        self.release_disk_reservation()
+
+        use_lease = bool(os.environ.get('NAS_LEASE_DB'))
+        manager = LeaseManager() if use_lease else None
+        wanted = [port.strip() for port in str(ports).split(',')] \
+            if ports is not None else None
+        count = len(wanted) if wanted else int(count)
+        reserved = {}
+
+        def probe():
+            storage = self._get_storage_info(refresh=True)
+            candidates = wanted or [
+                port for port, data in storage.items()
+                # Free disks only: no pool and no error
+                if data['Pool'] in ('', '-', '--') and
+                'X' not in data['Sys_Name']]
+
+            for port in candidates:
+                if len(reserved) >= count:
+                    break
+                if port in reserved:
+                    continue
+                if port not in storage:
+                    raise ValueError(f'Port {port} not exist on NAS!')
+                if manager is None:
+                    reserved[port] = None
+                    continue
+                try:
+                    reserved[port] = manager.acquire(
+                        f'nas:{self.client.ip_addr}/disk/{port}', timeout=0)
+                except ValueError:
+                    continue  # Leased by other run
+            return len(reserved) >= count
+
+        def pending(_):
+            LOGGER.info(f'Reserved ports {sorted(reserved)}, pending '
+                        f'{count} free disks ..')
+
+        try:
+            wait_until(probe, timeout=int(timeout or 3600), pending=pending,
+                       interval=30, name='disk reservation', logger=LOGGER,
+                       error=f'Cannot reserve {count} free disks!')
+        except ValueError:
+            for lease in reserved.values():
+                if lease is not None:
+                    lease.release()
+            raise
+
+        self.reserved_ports = sorted(reserved, key=int)
+        self.disk_leases = [lease for lease in reserved.values() if lease]
+        ports = ','.join(self.reserved_ports)
+
+        LOGGER.info(f'Reserved ports [{ports}]\n')
+        return ports
+
+    @keyword('NAS: Utils: Release disk reservation')
+    def release_disk_reservation(self):
+        '''
+        Release reserved disks (no-op if nothing reserved)
+        '''
+        for lease in self.disk_leases:
+            lease.release()
+        self.disk_leases = []
+        self.reserved_ports = None
+        return True
+
+    @keyword('NAS: Utils: Get reserved free disks')
+    def get_reserved_free_disks(self, count=None):
+        '''
+        Get diskIDs of reserved disks which are not used by any pool
+
+        Arguments
+        | count: Number of disks needed (default: all free reserved disks)
+        '''
+        storage = self._get_storage_info(refresh=True)
+        disk_ids = []
+        for port in self.reserved_ports or []:
+            if storage[port]['Pool'] not in ('', '-', '--'):
+                continue
+            dev = hex(int(port))[2:]
+            disk_ids.append(f'0000{(4 - len(dev)) * "0" + dev}')
+
+        if count is not None:
+            if len(disk_ids) < int(count):
+                raise ValueError(f'Only {len(disk_ids)} free reserved '
+                                 f'disks, need {count}!')
+            disk_ids = disk_ids[:int(count)]
+        return disk_ids
+
     @keyword('NAS: Utils: Define controller retry count')
     def define_ctrler_retry_count(self, ata_retry_count, mpt3sas_retry_count):
         '''
@@ -842,37 +1263,97 @@ class Utils(object):
         | cfile: .c file from stap
         | nuuid: NAS user uuid
         | nmpath: NAS mount path
-        | nfile: NAS temporary file used to update the contents of .c file
+        | nfile: NAS temporary file used to upload the contents of .c file
         '''
         LOGGER.info(f'|___Update UUID and Mount Path in .C___|')
 
-        cmd = f'cat /dev/null > {nfile}'
-        self.cli.run(cmd)
-        cmd = f'cat {cfile}'
-        out = self.cli.run(cmd)
-
-        # Update UUID and Mount path
-        split_out = out.strip().splitlines()
-        for line in split_out:
-            if 'nfs4_setfacl' in line:
-                old_uuid = line.split()[-2].split(":")[2]
-                old_mount = line.split('"')[1].split()[-1]
-                LOGGER.debug(f'Old UUID: {old_uuid}, mount: {old_mount}\n'
-                             f'Updating to UUID: {nuuid}, mount: {nmpath}')
-                out = out.replace(old_uuid, nuuid)
-                out = out.replace(old_mount, nmpath)
-        LOGGER.debug(f'Updated contents: {out}\n')
-
-        # Copy updated contents to .c file
-        for line in out.splitlines():
-            cmd = f"echo '{line}' >> {nfile}"
-            self.cli.run(cmd)
-        cmd = f'cp {nfile} {cfile}'
-        self.cli.run(cmd)
+        def update(out):
+            # Update UUID and Mount path
+            split_out = out.strip().splitlines()
+            for line in split_out:
+                if 'nfs4_setfacl' in line:
+                    old_uuid = line.split()[-2].split(":")[2]
+                    old_mount = line.split('"')[1].split()[-1]
+                    LOGGER.debug(f'Old UUID: {old_uuid}, mount: {old_mount}\n'
+                                 f'Updating to UUID: {nuuid}, mount: {nmpath}')
+                    out = out.replace(old_uuid, nuuid)
+                    out = out.replace(old_mount, nmpath)
+            LOGGER.debug(f'Updated contents: {out}\n')
+            return out
+
+        # Upload updated contents to .c file in one transfer
+        self._edit_remote_file(cfile, update, tmpfile=nfile)
 
         LOGGER.info(f'Contents updated successfully..\n')
         return True
 
+    def _queue_file_write(self, batch, path, content, tmpfile=None,
+                          chunk_size=65536):
+        '''
+        Queue commands writing content into NAS file
+        - Content is sent base64 encoded (safe for quotes / binary data)
+        - Written to tmpfile then moved over path (atomic replace),
+          keeping the mode of the existing file
+        - Small content is queued in batch; larger content is uploaded
+          right away, one command per chunk, since a batch goes out as
+          one shell argument (limited to 128 KB by MAX_ARG_STRLEN)
+        '''
+        if isinstance(content, str):
+            content = content.encode()
+        data = base64.b64encode(content).decode()
+        tmpfile = tmpfile or f'{path}.{uuid.uuid4().hex[:8]}.tmp'
+
+        # chunk_size must be multiple of 4 to decode chunks separately
+        chunks = [f"echo '{data[idx:idx + chunk_size]}' | "
+                  f"base64 -d >> {tmpfile}"
+                  for idx in range(0, len(data), chunk_size)]
+        if len(chunks) > 1:
+            self.cli.run(f': > {tmpfile}')
+            for chunk in chunks:
+                self.cli.run(chunk)
+        else:
+            batch.add(f': > {tmpfile}')
+            for chunk in chunks:
+                batch.add(chunk)
+        batch.add(f'if [ -e {path} ]; then '
+                  f'chmod $(stat -c %a {path}) {tmpfile}; fi')
+        batch.add(f'mv -f {tmpfile} {path}')
+        return batch
+
+    @keyword('NAS: Utils: Write remote file')
+    def write_remote_file(self, path, content, tmpfile=None):
+        '''
+        Write content into NAS file in one round trip
+
+        Arguments
+        | path:    NAS file path
+        | content: str or bytes to write (replace whole file)
+        | tmpfile: NAS temporary file used while uploading
+        '''
+        LOGGER.info(f'|___Write remote file {path}___|')
+
+        batch = self.client.batch(stop_on_error=True)
+        self._queue_file_write(batch, path, content, tmpfile=tmpfile)
+        batch.run()
+
+        LOGGER.info(f'{len(content)} bytes written to {path}\n')
+        return True
+
+    def _edit_remote_file(self, path, transform, tmpfile=None):
+        '''
+        Read NAS file, transform(content) -> new content in memory and
+        upload the result in one round trip (skip if nothing changed)
+        '''
+        content = self.cli.run(f'cat {path}')
+        new_content = transform(content)
+        if new_content == content:
+            LOGGER.debug(f'{path} unchanged, skip upload')
+            return False
+
+        if not new_content.endswith('\n'):
+            new_content += '\n'
+        return self.write_remote_file(path, new_content, tmpfile=tmpfile)
+
     @keyword('NAS: Utils: Update permissions in NAS path')
     def update_permissions_in_nas(self, permissions, naspath):
         '''
@@ -1010,25 +1491,24 @@ class Utils(object):
         '''
         LOGGER.info(f'|___Check DISK: 0x{disk_id} info in volume conf___|')
 
-        timeout = timeout or self.check_timeout
-        start_time = time.time()
-        while True:
-            if time.time() - start_time > int(timeout):
-                raise ValueError(f'DISK: 0x{disk_id} has no volume config!')
-
+        def probe():
             cmd = 'cat /etc/volume.conf | grep diskId'
             out = self.cli.run(cmd)
 
             # Check diskID available in volume conf file
-            if any(f'0x{disk_id}' in line.split('=')[-1] for line in
-                   out.strip().splitlines()):
-                break
+            return any(f'0x{disk_id}' in line.split('=')[-1] for line in
+                       out.strip().splitlines())
 
+        def pending(_):
             # Run storage_util command to get disk info updated in volume conf
             self.cli.run('storage_util --volume_scan do_scan_raid=1 force=1')
             LOGGER.info(f'Disk: 0x{disk_id} not found in volume conf yet,'
                         f'pending retry...')
-            time.sleep(2)
+
+        timeout = timeout or self.check_timeout
+        wait_until(probe, timeout=int(timeout), pending=pending, interval=2,
+                   name='disk volume conf', logger=LOGGER,
+                   error=f'DISK: 0x{disk_id} has no volume config!')
 
         LOGGER.info(f'DISK: 0x{disk_id} info shows up in volume conf file!\n')
 
@@ -1039,8 +1519,8 @@ class Utils(object):
         '''
         LOGGER.info('|___Enable RPC debug flag___|')
 
-        self.cli.run('rpcdebug -m nfs -s all')
-        self.cli.run('rpcdebug -m rpc -s all')
+        self.client.run_batch('rpcdebug -m nfs -s all',
+                              'rpcdebug -m rpc -s all')
 
         LOGGER.info('RPC debug flag enabled\n')
         return True
@@ -1052,8 +1532,8 @@ class Utils(object):
         '''
         LOGGER.info('|___Disable RPC debug flag___|')
 
-        self.cli.run('rpcdebug -m nfs -c all')
-        self.cli.run('rpcdebug -m rpc -c all')
+        self.client.run_batch('rpcdebug -m nfs -c all',
+                              'rpcdebug -m rpc -c all')
 
         LOGGER.info('RPC debug flag disabled\n')
         return True
@@ -1128,18 +1608,18 @@ class Utils(object):
         cmd = f"stat {filepath} | grep Size | awk '{{print $2}}'"
         LOGGER.info(f'CMD [{cmd}]')
 
-        start_time = time.time()
-        while True:
-            if time.time() - start_time > self.check_timeout:
-                raise ValueError(
-                    f'{filepath} size cannot be fetched properly!')
-
+        def probe():
             size = self.cli.run(cmd)
-            if size.isdigit():
-                break
+            return size if size.isdigit() else ''
+
+        def pending(_):
             LOGGER.info(f'{filepath} size does not have value yet, '
                         'pending retry ..')
-            time.sleep(2)
+
+        size = wait_until(
+            probe, timeout=self.check_timeout, pending=pending, interval=2,
+            name='file size', logger=LOGGER,
+            error=f'{filepath} size cannot be fetched properly!')
 
         LOGGER.info(f'File size retrieved: {size},\n '
                     f'converting to base size: {base_size}\n')
@@ -1161,23 +1641,21 @@ class Utils(object):
         '''
         LOGGER.info(f'|___Check {expected_status} Cache Pool Existence___|')
 
-        timeout = timeout or self.check_timeout
-        start_time = time.time()
-
-        while True:
-            if time.time() - start_time > timeout:
-                raise ValueError('Cache pool [{cache_id}] expected '
-                                 f'{expected_status} but nothing occur!')
-
+        def probe():
             status = self.client.setup.get_cache_info(
                 action='get', section='table', column='Status',
                 pool_id=cache_id)
-            if status == expected_status:
-                break
+            return status == expected_status
 
+        def pending(_):
             LOGGER.info(f'Pool {expected_status} not show up yet, '
                         'pending retry ..')
-            time.sleep(5)
+
+        timeout = timeout or self.check_timeout
+        wait_until(probe, timeout=int(timeout), pending=pending, interval=5,
+                   name=f'cache {expected_status}', logger=LOGGER,
+                   error=f'Cache pool [{cache_id}] expected '
+                         f'{expected_status} but nothing occur!')
 
         LOGGER.info(f'Cache [{cache_id}] expected {expected_status} occurs!\n')
         return True
@@ -1319,14 +1797,20 @@ class Utils(object):
         LOGGER.info(f'|___Set NFS grace time to {set_time}___|')
 
         # Update grace time
-        cmd = f"sed -i 's/rpc\\.nfsd \\$NO_V3 \\$NO_V4/rpc.nfsd -G " \
-              f"{set_time} \\$NO_V3 \\$NO_V4/g' /etc/init.d/nfs"
-        self.cli.run(cmd)
-
-        # Restart NFS services
-        self.cli.run('/etc/init.d/nfs stop')
-        self.cli.run('/etc/init.d/nfs start')
-        grace_time = self.cli.run('cat /proc/fs/nfsd/nfsv4gracetime')
+        nfs_script = '/etc/init.d/nfs'
+        content = re.sub(r'rpc\.nfsd (-G \d+ )?\$NO_V3 \$NO_V4',
+                         f'rpc.nfsd -G {set_time} $NO_V3 $NO_V4',
+                         self.cli.run(f'cat {nfs_script}'))
+        if not content.endswith('\n'):
+            content += '\n'
+
+        # Upload script and restart NFS services
+        batch = self.client.batch(stop_on_error=True)
+        self._queue_file_write(batch, nfs_script, content)
+        batch.add('/etc/init.d/nfs stop')
+        batch.add('/etc/init.d/nfs start')
+        batch.add('cat /proc/fs/nfsd/nfsv4gracetime')
+        grace_time = batch.outputs()[-1]
 
         if int(grace_time) != int(set_time):
             raise ValueError(f'Grace time not updated..'
@@ -1352,21 +1836,21 @@ class Utils(object):
         uids = self.qcli.snapsync.job_list(
             action='get', section='table', column='uids')
 
-        for job_id in uids:
-            while True:
-                if time.time() - start_time > timeout:
-                    raise ValueError('Expected state for snapsync jobs not '
-                                     f'found for job {job_id}')
+        def pending(_):
+            LOGGER.info('Snapsync job expected state not retrieved, '
+                        'pending retry..')
 
-                state = self.qcli.snapsync.job_list(
+        for job_id in uids:
+            # All jobs share one timeout
+            remain = max(int(timeout) - (time.time() - start_time), 0)
+            wait_until(
+                lambda job_id=job_id: self.qcli.snapsync.job_list(
                     action='get', section='table', column='State',
-                    job_id=job_id)
-                if state == expected_state:
-                    break
-
-                LOGGER.info('Snapsync job expected state not retrieved, '
-                            'pending retry..')
-                time.sleep(5)
+                    job_id=job_id) == expected_state,
+                timeout=remain, pending=pending, interval=5,
+                name=f'snapsync job {job_id} {expected_state}', logger=LOGGER,
+                error='Expected state for snapsync jobs not '
+                      f'found for job {job_id}')
 
         LOGGER.info('Snapsync jobs expected state retrieved\n')
         return True
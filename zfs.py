@@ -1,13 +1,30 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 # pylint: disable=unused-argument, broad-except
+import re
+import csv
+import json
 import time
+import os
 from typing import TYPE_CHECKING
+from robot.libraries.BuiltIn import BuiltIn
+from robot.running.context import EXECUTION_CONTEXTS
 from baselib.robotlogger import RobotLogger
 from baselib.robotkeyword import keyword
 import tool.tool
+from .poller import wait_until
+from .zpool_status import parse_zpool_status, diff_zpool_status
+from .zpool_status import parse_scan_progress, parse_size, parse_size_str
+from .iostat import IostatSampler
+from .arcstats import ARCSTATS_PATH, MEMINFO_PATH, ArcSnapshot
+from .arcstats import parse_arcstats, parse_meminfo, arc_delta
+from .sendrecv import SendRecvStream
 LOGGER = RobotLogger(__name__)
 
+# zdb -d line, e.g.
+# Dataset zpool2/zfs274@snap1 [ZPL], ID 389, cr_txg 1256, 96K, 7 objects
+ZDB_DATASET_RE = re.compile(r'Dataset (\S+) \[(\w+)\], ID (\d+)')
+
 if TYPE_CHECKING:
     from .main import NAS
 
@@ -20,6 +37,20 @@ class ZFS(object):
         # Check timeout
         self.check_timeout = 120
 
+        # Parsed `zdb -d` output per pool id
+        # Dropped by keywords which create / destroy datasets or snapshots
+        self._zdb_index = {}
+
+        # Background `zpool iostat` sampler (Start / Stop zpool iostat)
+        self.iostat_sampler = None
+
+        # ARC snapshots by label, ARC deltas by test case
+        self.arc_snapshots = {}
+        self.arc_metrics = {}
+
+        # Latency of batched snapshot operations (Export ZFS snapshot timings)
+        self.snapshot_timings = []
+
     @property
     def cli(self):
         return self.client.cli
@@ -64,16 +95,9 @@ class ZFS(object):
         |          shall return snap id only if set True
         '''
         LOGGER.info(f'Fetching ZFS pool [{pool_id}] dataset id ..')
-        cmd = (f"zdb -d zpool{pool_id} | grep -n ZVOL "
-               "| grep -v init | awk '{print $5}'")
-        output = self.cli.run(cmd).strip()
-        if not output:
-            cmd = (f"zdb -d zpool{pool_id} | grep -n ZPL "
-                   "| grep -v init | awk '{print $5}'")
-            output = self.cli.run(cmd).strip()
-
-        dataset_id = output.replace(',', '')
-        split_data_id = dataset_id.split()
+        split_data_id = [data['id'] for data in
+                         self._query_zdb_index(pool_id)]
+        dataset_id = '\n'.join(split_data_id)
         if data_id:
             return split_data_id[-1]
         elif snap_id:
@@ -82,6 +106,64 @@ class ZFS(object):
         LOGGER.info(f'Dataset id [{dataset_id}]\n')
         return dataset_id
 
+    def _get_zdb_index(self, pool_id):
+        '''
+        Get `zdb -d zpool<pool_id>` datasets as list of dict (zdb order)
+        - Run zdb once per pool state, reuse till invalidate_zdb_index
+        '''
+        pool_id = str(pool_id)
+        if pool_id in self._zdb_index:
+            LOGGER.debug(f'Use zdb index of zpool{pool_id}')
+            return self._zdb_index[pool_id]
+
+        index = []
+        for line in self.cli.run(f'zdb -d zpool{pool_id}').splitlines():
+            match = ZDB_DATASET_RE.search(line)
+            if not match:
+                continue
+            name, dtype, obj_id = match.groups()
+            index.append({
+                'name': name,
+                'type': dtype,
+                'id': obj_id,
+                'snapshot': '@' in name,
+                'line': line,
+            })
+        # Data structure
+        # [{'name': 'zpool2/zfs274@snap1', 'type': 'ZPL', 'id': '389',
+        #   'snapshot': True, 'line': 'Dataset zpool2/zfs274@snap1 ...'},
+        #  ...]
+        self._zdb_index[pool_id] = index
+        return index
+
+    def _query_zdb_index(self, pool_id, ignore_str=None):
+        '''
+        Get ZVOL datasets of pool (ZPL datasets if pool has no ZVOL)
+        - Skip 'init' datasets and lines containing ignore_str
+        '''
+        datasets = [data for data in self._get_zdb_index(pool_id)
+                    if 'init' not in data['line'] and
+                    not (ignore_str and ignore_str in data['line'])]
+        for dtype in ('ZVOL', 'ZPL'):
+            found = [data for data in datasets if data['type'] == dtype]
+            if found:
+                return found
+        return []
+
+    @keyword('NAS: Utils: Invalidate zdb index')
+    def invalidate_zdb_index(self, pool_id=None):
+        '''
+        Drop the parsed zdb dataset index (all pools if pool_id not given)
+        - Called by keywords which create / destroy datasets or snapshots
+        - Call it from suite after out-of-band changes (e.g. manual zfs cmd)
+        '''
+        if pool_id is None:
+            self._zdb_index = {}
+        else:
+            self._zdb_index.pop(str(pool_id), None)
+        LOGGER.debug('zdb index invalidated')
+        return True
+
     @keyword('NAS: Utils: Scrub zpool')
     def zpool_scrub(self, zpool_name):
         '''
@@ -116,37 +198,320 @@ class ZFS(object):
         '''
         LOGGER.info(f'|___Get expected {zpool_name} status___|')
 
-        got_value = ''
-        timeout = timeout or self.check_timeout
-        start_time = time.time()
-
-        # Wait for expected zpool status
-        while True:
-            if time.time() - start_time > int(timeout):
-                raise ValueError(f'{zpool_name} expected {check_key} '
-                                 f'to show {expected_value} '
-                                 f'but nothing occur!')
-
-            # Fetch the zpool status info.
-            out = self.cli.run(f'zpool status {zpool_name}')
-            for line in out.splitlines():
-                # Extract the expected value for the provided key
-                if line.split(':')[0].strip() == check_key:
-                    got_value = line.split(':')[1].strip()
-                    break
+        def probe():
+            # Fetch the zpool status info and extract value of the key
+            status = self._get_zpool_status(zpool_name)
+            got_value = status.headers.get(check_key, '')
 
             # Check if expected value occurs ignoring the case
-            if expected_value.lower() in got_value.lower():
-                break
+            return expected_value.lower() in got_value.lower()
 
+        def pending(_):
             LOGGER.info(f'{zpool_name} expected {check_key} '
                         f'value not show up yet, pending retry ..')
-            time.sleep(5)
+
+        # Wait for expected zpool status
+        timeout = timeout or self.check_timeout
+        wait_until(probe, timeout=int(timeout), pending=pending, interval=5,
+                   name=f'{zpool_name} {check_key}', logger=LOGGER,
+                   error=f'{zpool_name} expected {check_key} '
+                         f'to show {expected_value} but nothing occur!')
 
         LOGGER.info(f'{zpool_name} expected {check_key} '
                     f'{expected_value} occurs!\n')
         return True
 
+    def _get_zpool_status(self, zpool_name):
+        '''
+        Get parsed `zpool status <zpool_name>` as ZpoolStatus
+        - headers (state / scan / errors ..), vdev tree with
+          READ / WRITE / CKSUM counters of every device
+        '''
+        out = self.cli.run(f'zpool status {zpool_name}')
+        pools = parse_zpool_status(out)
+        if zpool_name not in pools:
+            raise ValueError(f'{zpool_name} not found in zpool status:\n'
+                             f'{out}')
+        return pools[zpool_name]
+
+    @keyword('NAS: Utils: Get zpool status')
+    def get_zpool_status(self, zpool_name):
+        '''
+        Get structured zpool status
+
+        Arguments
+        | zpool_name: zpool name (e.g: zpool2)
+
+        Return:
+        | {'name': .., 'headers': {'state': .., 'scan': .., ..},
+        |  'vdevs': [{'name', 'state', 'read', 'write', 'cksum', 'note',
+        |             'children': [..]}, ..]}
+        '''
+        return self._get_zpool_status(zpool_name).to_dict()
+
+    def watch_zpool_status(self, zpool_name, interval=5, timeout=None):
+        '''
+        Sample zpool status and yield (status, changes) only when the
+        status changed since previous sample (first sample always yields)
+        - changes: list from diff_zpool_status
+        - Stop after timeout seconds (run forever if None)
+        '''
+        start_time = time.time()
+        prev = None
+        while timeout is None or time.time() - start_time <= float(timeout):
+            status = self._get_zpool_status(zpool_name)
+            changes = diff_zpool_status(prev, status)
+            if changes:
+                yield status, changes
+            prev = status
+            time.sleep(interval)
+
+    def _wait_zpool(self, zpool_name, check, name, timeout=None):
+        '''
+        Wait till check(ZpoolStatus) returns True, log changes in between
+        '''
+        prev = [None]
+
+        def probe():
+            status = self._get_zpool_status(zpool_name)
+            for change in diff_zpool_status(prev[0], status):
+                if prev[0] is not None:
+                    LOGGER.info(f'{zpool_name} changed: {change}')
+            prev[0] = status
+            return check(status)
+
+        timeout = timeout or self.check_timeout
+        return wait_until(probe, timeout=int(timeout), interval=5,
+                          name=f'{zpool_name} {name}', logger=LOGGER,
+                          error=f'{zpool_name} {name} not met in '
+                                f'{timeout}s!')
+
+    @keyword('NAS: Utils: Wait zpool device errors')
+    def wait_zpool_device_errors(self, zpool_name, device, counter='write',
+                                 minimum=1, timeout=None):
+        '''
+        Wait till zpool device error counter reaches minimum
+
+        Arguments
+        | zpool_name: zpool name (e.g: zpool2)
+        | device:     device name or unique part of it (e.g: disk_0x1)
+        | counter:    read / write / cksum
+        | minimum:    wait till counter >= minimum (default=1)
+        | timeout:    set specific check timeout (default=120s)
+
+        Return:
+        | counter value
+        '''
+        LOGGER.info(f'|___Wait {zpool_name} {device} {counter} errors___|')
+
+        if counter not in ('read', 'write', 'cksum'):
+            raise ValueError(f'Invalid counter [{counter}]! '
+                             '(Only support read/write/cksum)')
+
+        def check(status):
+            value = getattr(status.device(device), counter)
+            return value is not None and value >= int(minimum)
+
+        self._wait_zpool(zpool_name, check,
+                         f'{device} {counter} errors >= {minimum}', timeout)
+        value = getattr(self._get_zpool_status(zpool_name).device(device),
+                        counter)
+
+        LOGGER.info(f'{device} {counter} errors: {value}\n')
+        return value
+
+    @keyword('NAS: Utils: Wait zpool scan finished')
+    def wait_zpool_scan_finished(self, zpool_name, timeout=None):
+        '''
+        Wait till scrub / resilver of zpool finished
+
+        Arguments
+        | zpool_name: zpool name (e.g: zpool2)
+        | timeout:    set specific check timeout (default=120s)
+
+        Return:
+        | scan line of zpool status (e.g: scrub repaired 0B in ..)
+        '''
+        LOGGER.info(f'|___Wait {zpool_name} scan finished___|')
+
+        status = self._wait_zpool(
+            zpool_name, lambda status: status.scan_finished and status,
+            'scan finished', timeout)
+
+        LOGGER.info(f'{zpool_name} scan: {status.scan}\n')
+        return status.scan
+
+    @keyword('NAS: Utils: Monitor zpool scan')
+    def monitor_zpool_scan(self, zpool_name, interval=10, timeout=None,
+                           stall_timeout=300, start_timeout=60, export=True):
+        '''
+        Sample scrub / resilver progress till it finishes
+        - Record scanned / issued / processed (repaired or resilvered)
+          bytes of every sample, compute throughput and ETA
+        - Fail early if issued (or scanned) bytes do not grow within
+          stall_timeout
+        - Export time series as JSON under ${OUTPUT DIR}, tagged with
+          the pool resilver_ratio / scrub_ratio (rebuild priority)
+
+        Arguments
+        | zpool_name:    zpool name (e.g: zpool2)
+        | interval:      seconds between samples
+        | timeout:       max seconds to wait scan finish (default: no limit)
+        | stall_timeout: seconds without progress before failing
+        | start_timeout: seconds to wait scan to start (e.g. right after
+        |                Recover raid group)
+        | export:        Boolean, write time series JSON file
+
+        Return:
+        | {'function', 'duration', 'avg_rate', 'samples', 'file', ..}
+        '''
+        LOGGER.info(f'|___Monitor {zpool_name} scan___|')
+
+        start_time = time.time()
+        first_scan = self._get_zpool_status(zpool_name).scan
+        series = []
+        last_growth = start_time
+        last_done = None
+        result = {}
+
+        while True:
+            now = time.time()
+            status = self._get_zpool_status(zpool_name)
+            progress = parse_scan_progress(status.scan)
+
+            if progress['state'] == 'in progress':
+                done = progress['issued'] or progress['scanned'] or 0
+                sample = dict(progress, time=round(now - start_time, 1),
+                              rate=None, eta=None)
+                if series:
+                    prev = series[-1]
+                    prev_done = prev['issued'] or prev['scanned'] or 0
+                    if now - start_time > prev['time']:
+                        sample['rate'] = int((done - prev_done) /
+                                             (now - start_time - prev['time']))
+                if sample['rate'] and progress['total']:
+                    sample['eta'] = int(
+                        max(progress['total'] - done, 0) / sample['rate'])
+                series.append(sample)
+                LOGGER.info(f'{progress["function"]} {progress["percent"]}% '
+                            f'done, rate {sample["rate"]} B/s, '
+                            f'ETA {sample["eta"]}s')
+
+                if last_done is None or done > last_done:
+                    last_done = done
+                    last_growth = now
+                elif now - last_growth > float(stall_timeout):
+                    result['error'] = f'{zpool_name} scan stalled at ' \
+                                      f'{done} bytes for {stall_timeout}s'
+
+            elif progress['state'] in ('finished', 'canceled') and \
+                    (series or status.scan != first_scan or
+                     now - start_time > float(start_timeout)):
+                result['state'] = progress['state']
+                result['function'] = progress['function']
+                result['final'] = status.scan.split('\n')[0]
+
+            elif progress['state'] == 'none' and \
+                    now - start_time > float(start_timeout):
+                result['error'] = f'{zpool_name} scan not started in ' \
+                                  f'{start_timeout}s'
+
+            if timeout and now - start_time > float(timeout) and \
+                    'state' not in result:
+                result['error'] = f'{zpool_name} scan not finished in ' \
+                                  f'{timeout}s'
+            if 'state' in result or 'error' in result:
+                break
+            time.sleep(interval)
+
+        duration = time.time() - start_time
+        rates = [sample['rate'] for sample in series if sample['rate']]
+        result.update({
+            'zpool': zpool_name,
+            'function': result.get('function') or (
+                series[-1]['function'] if series else None),
+            'duration': round(duration, 1),
+            'avg_rate': int(sum(rates) / len(rates)) if rates else None,
+            'samples': len(series),
+            'file': None,
+        })
+        for prop in ('resilver_ratio', 'scrub_ratio'):
+            result[prop] = self.cli.run(
+                f'zpool get -H -o value {prop} {zpool_name} 2>/dev/null '
+                '|| true').strip() or None
+
+        if export:
+            filename = self.client.utils.get_output_path(
+                f'{zpool_name}_scan_{int(start_time)}.json')
+            with open(filename, 'w') as out:
+                json.dump({'summary': result, 'series': series}, out,
+                          indent=2)
+            result['file'] = filename
+
+        if 'error' in result:
+            raise ValueError(result['error'])
+
+        LOGGER.info(f'{zpool_name} {result["function"]} {result["state"]} '
+                    f'in {result["duration"]}s, avg rate '
+                    f'{result["avg_rate"]} B/s\n')
+        return result
+
+    @keyword('NAS: Utils: Start zpool iostat sampler')
+    def start_zpool_iostat_sampler(self, zpool_name, interval=1):
+        '''
+        Sample per vdev ops / bandwidth / latency of zpool in background
+        - `zpool iostat -v -l` runs on its own SSH channel, so fault
+          injection and IO keywords keep running in parallel
+        - Stop it with Stop zpool iostat sampler (e.g. in Suite Teardown)
+
+        Arguments
+        | zpool_name: zpool name (e.g: zpool2)
+        | interval:   seconds between samples
+        '''
+        LOGGER.info(f'|___Start {zpool_name} iostat sampler___|')
+
+        if self.iostat_sampler is not None:
+            self.stop_zpool_iostat_sampler()
+        self.iostat_sampler = IostatSampler(
+            self.client, zpool_name, interval=interval).start()
+
+        LOGGER.info(f'Sampling {zpool_name} every {interval}s\n')
+        return True
+
+    @keyword('NAS: Utils: Stop zpool iostat sampler')
+    def stop_zpool_iostat_sampler(self):
+        '''
+        Stop iostat sampler, export its series as JSON / CSV under
+        ${OUTPUT DIR} and link them from the log
+        - Does nothing if no sampler is running
+
+        Return:
+        | {vdev: {'samples', 'max_total_wait_w', 'avg_total_wait_w',
+        |         'max_write_bw', 'avg_write_bw'}}
+        '''
+        if self.iostat_sampler is None:
+            return {}
+        sampler, self.iostat_sampler = self.iostat_sampler, None
+        LOGGER.info(f'|___Stop {sampler.zpool_name} iostat sampler___|')
+
+        sampler.stop()
+        prefix = f'{sampler.zpool_name}_iostat_{int(sampler.start_time)}'
+        json_file = self.client.utils.get_output_path(f'{prefix}.json')
+        csv_file = self.client.utils.get_output_path(f'{prefix}.csv')
+        sampler.export(json_file, csv_file)
+
+        summary = sampler.summary()
+        for vdev, vdev_sum in summary.items():
+            LOGGER.info(f'{vdev}: {vdev_sum}')
+        if EXECUTION_CONTEXTS.current is not None:
+            links = ' '.join(f'<a href="{os.path.basename(path)}">'
+                             f'{os.path.basename(path)}</a>'
+                             for path in (json_file, csv_file))
+            BuiltIn().log(f'zpool iostat: {links}', html=True)
+
+        LOGGER.info(f'{sampler.zpool_name} iostat saved to {json_file}\n')
+        return summary
+
     @keyword('NAS: Utils: Get ZFS pool dataset path')
     def get_zfs_pool_dataset_path(self, pool_id, data_path=False,
                                   snap_path=False):
@@ -162,15 +527,9 @@ class ZFS(object):
         '''
         LOGGER.info(f'Fetching ZFS pool [{pool_id}] dataset path')
 
-        cmd = (f"zdb -d zpool{pool_id} | grep -n ZVOL "
-               "| grep -v init | awk '{print $2}'")
-        path = self.cli.run(cmd).strip()
-        if not path:
-            cmd = (f"zdb -d zpool{pool_id} | grep -n ZPL "
-                   "| grep -v init | awk '{print $2}'")
-            path = self.cli.run(cmd).strip()
-
-        split_path = path.split()
+        split_path = [data['name'] for data in
+                      self._query_zdb_index(pool_id)]
+        path = '\n'.join(split_path)
         if data_path:
             return split_path[-1]
         elif snap_path:
@@ -191,6 +550,80 @@ class ZFS(object):
         LOGGER.info(f'ZFS ARC caches flushed\n')
         return True
 
+    @keyword('NAS: Utils: Snapshot ARC stats')
+    def snapshot_arc_stats(self, label):
+        '''
+        Read ZFS arcstats and /proc/meminfo at a phase boundary
+        (e.g. before / after Flush ZFS ARC caches or a read phase)
+        - arcstats is empty if ZFS module is not loaded
+
+        Arguments
+        | label: name of snapshot, used by Get ARC stats delta
+        '''
+        LOGGER.info(f'|___Snapshot ARC stats [{label}]___|')
+
+        with self.client.batch() as batch:
+            batch.add(f'cat {ARCSTATS_PATH}', check=False)
+            batch.add(f'cat {MEMINFO_PATH}')
+        arcstats, meminfo = [result.output for result in batch.results]
+
+        snapshot = ArcSnapshot(label, parse_arcstats(arcstats),
+                               parse_meminfo(meminfo))
+        self.arc_snapshots[label] = snapshot
+
+        LOGGER.info(f'ARC size {snapshot.arcstats.get("size")}, hits '
+                    f'{snapshot.arcstats.get("hits")}, misses '
+                    f'{snapshot.arcstats.get("misses")}\n')
+        return True
+
+    @keyword('NAS: Utils: Get ARC stats delta')
+    def get_arc_stats_delta(self, start, end=None, export=True):
+        '''
+        Compute ARC deltas (hits, misses, size, prefetch, evictions)
+        between two snapshots of Snapshot ARC stats
+        - Delta is recorded under current test case name, all recorded
+          deltas are written to arcstats_metrics.json under ${OUTPUT DIR}
+
+        Arguments
+        | start:  label of first snapshot
+        | end:    label of second snapshot, take one now if not given
+        | export: Boolean, rewrite metrics JSON file
+
+        Return dict (see arcstats.arc_delta)
+        '''
+        LOGGER.info(f'|___Get ARC stats delta [{start}] -> '
+                    f'[{end or "now"}]___|')
+
+        if start not in self.arc_snapshots:
+            raise ValueError(f'No ARC snapshot [{start}]: '
+                             f'{list(self.arc_snapshots)}')
+        if end is None:
+            end = f'{start}_end'
+            self.snapshot_arc_stats(end)
+        elif end not in self.arc_snapshots:
+            raise ValueError(f'No ARC snapshot [{end}]: '
+                             f'{list(self.arc_snapshots)}')
+
+        delta = arc_delta(self.arc_snapshots[start], self.arc_snapshots[end])
+        test_name = 'NA'
+        if EXECUTION_CONTEXTS.current is not None:
+            test_name = BuiltIn().get_variable_value('${TEST NAME}', 'Suite')
+        self.arc_metrics.setdefault(test_name, []).append(delta)
+
+        if export:
+            filename = self.client.utils.get_output_path(
+                'arcstats_metrics.json')
+            with open(filename, 'w') as out:
+                json.dump(self.arc_metrics, out, indent=2)
+
+        arc_size = delta['gauges'].get('arc_size', {})
+        LOGGER.info(f'hits {delta["counters"].get("hits")}, misses '
+                    f'{delta["counters"].get("misses")}, hit ratio '
+                    f'{delta["hit_ratio"]}, evictions {delta["evictions"]}, '
+                    f'ARC size {arc_size.get("start")} -> '
+                    f'{arc_size.get("end")}\n')
+        return delta
+
     @keyword('NAS: Utils: Get ZFS folder path')
     def get_folder_path(self, folder):
         '''
@@ -245,24 +678,28 @@ class ZFS(object):
         if sync:
             cmd = f'zfs create -o sync={sync} {data_path}'
         self.cli.run(cmd)
+        self.invalidate_zdb_index()
 
         LOGGER.info(f'ZFS datapath {data_path} created\n')
         return data_path
 
     @keyword('NAS: Utils: Create ZFS snapshot')
-    def create_zfs_snapshot(self, data_path, snap_name):
+    def create_zfs_snapshot(self, data_path, snap_name, recursive=False):
         '''
         Lib to create ZFS snapshot
 
         Arguments:
         | data_path: Dataset path for pool
         | snap_name: snapshot name
+        | recursive: Boolean (True|False)
+        |            Set True to snapshot all descendent datasets as well
         '''
         LOGGER.info('|___Create ZFS snapshot___|')
 
         snap_path = f'{data_path}@{snap_name}'
-        cmd = f'zfs snapshot {snap_path}'
+        cmd = f'zfs snapshot {"-r " if recursive else ""}{snap_path}'
         self.cli.run(cmd)
+        self.invalidate_zdb_index()
 
         LOGGER.info('ZFS snapshot created\n')
         return snap_path
@@ -282,6 +719,7 @@ class ZFS(object):
         clone_path = f'zpool{pool_id}/{clone_name}'
         cmd = f'zfs clone {snap_path} {clone_path}'
         self.cli.run(cmd)
+        self.invalidate_zdb_index()
 
         LOGGER.info('Cloned ZFS snapshot\n')
         return clone_path
@@ -298,6 +736,7 @@ class ZFS(object):
 
         cmd = f'zfs promote {clone_path}'
         self.cli.run(cmd)
+        self.invalidate_zdb_index()
 
         LOGGER.info('ZFS snapshot promote is successful\n')
         return True
@@ -340,6 +779,7 @@ class ZFS(object):
 
         cmd = f'zpool export zpool{pool_id}'
         self.cli.run(cmd)
+        self.invalidate_zdb_index()
         zpool_name = f'zpool{pool_id}'
         self.client.utils.run_keyword_expect_error(
             self.check_zpool_status, zpool_name=zpool_name, check_key='pool',
@@ -375,6 +815,7 @@ class ZFS(object):
         if not enable_options:
             cmd = f'zpool import zpool{pool_id}'
         self.cli.run(cmd)
+        self.invalidate_zdb_index()
         # Check pool in ready state (online)
         self.client.utils.check_expected_pool(pool_id, expected_status='Ready')
 
@@ -473,6 +914,143 @@ class ZFS(object):
 
         LOGGER.info('Fileclone command executed\n')
 
+    @keyword('NAS: Utils: Generate benchmark files')
+    def generate_benchmark_files(self, path, file_count=100, file_size='1M',
+                                 prefix='file'):
+        '''
+        Fill directory with random content files in one command
+
+        Arguments
+        | path:       directory on NAS (created if missing)
+        | file_count: number of files
+        | file_size:  size of each file (e.g: 4K, 1M, 1G)
+        | prefix:     file name prefix (<prefix>1 .. <prefix>N)
+
+        Return total bytes written
+        '''
+        LOGGER.info(f'|___Generate {file_count} x {file_size} files___|')
+
+        size = parse_size_str(file_size)
+        file_count = int(file_count)
+        self.cli.run(
+            f'mkdir -p {path} && idx=1; while [ $idx -le {file_count} ]; do '
+            f'head -c {size} /dev/urandom > {path}/{prefix}$idx || break; '
+            f'idx=$((idx + 1)); done; [ $idx -gt {file_count} ] && sync')
+
+        LOGGER.info(f'{file_count * size} bytes written under {path}\n')
+        return file_count * size
+
+    @keyword('NAS: Utils: Benchmark copydiff and fileclone')
+    def benchmark_copydiff_fileclone(self, pool_id, file_count=100,
+                                     file_size='1M', fileclone_args='',
+                                     history_file=None, cleanup=True):
+        '''
+        Time QNAP fast copy paths against plain cp on generated data
+        - Source dataset gets file_count files, snapshot @bench1, then
+          file_count more files, snapshot @bench2 (the diff)
+        - cp:        cp of the diff files into a clone of @bench1
+        - copydiff:  zfs copydiff @bench2 @bench1 into a clone of @bench1
+        - fileclone: zfileclone of every diff file into a clone of @bench1
+        - Throughput (bytes/s) and metadata ops/s (files/s) are measured
+          on NAS side, tagged with firmware / build and appended to
+          history_file (JSON lines) for trend comparison
+
+        Arguments
+        | pool_id:        Storage pool ID
+        | file_count:     files in base data set and in diff
+        | file_size:      size of each file (e.g: 4K, 1M)
+        | fileclone_args: extra zfileclone arguments (see Execute ZFS
+        |                 fileclone)
+        | history_file:   JSON lines file kept across runs
+        |                 (default: env NAS_BENCH_HISTORY or
+        |                 ~/.nas_bench_history.jsonl)
+        | cleanup:        Boolean, destroy benchmark datasets afterwards
+
+        Return:
+        | {'firmware', 'build', 'file_count', 'bytes',
+        |  'results': {cp|copydiff|fileclone: {'duration', 'rate',
+        |              'ops_rate'}}, 'file'}
+        '''
+        LOGGER.info(f'|___Benchmark copydiff and fileclone '
+                    f'({file_count} x {file_size})___|')
+
+        file_count = int(file_count)
+        src = f'zpool{pool_id}/bench_src'
+        targets = {name: f'zpool{pool_id}/bench_{name}'
+                   for name in ('cp', 'copydiff', 'fileclone')}
+        run_id = int(time.time())
+        self.client.run_batch(*[f'zfs destroy -r {dataset} 2>/dev/null; true'
+                                for dataset in [src] + list(targets.values())])
+        self.cli.run(f'zfs create {src}')
+        self.invalidate_zdb_index()
+        src_mnt = self._zfs_get(src, 'mountpoint')[src]['mountpoint']
+
+        self.generate_benchmark_files(f'{src_mnt}/base', file_count,
+                                      file_size)
+        self.create_zfs_snapshot(src, 'bench1')
+        total = self.generate_benchmark_files(f'{src_mnt}/diff', file_count,
+                                              file_size)
+        self.create_zfs_snapshot(src, 'bench2')
+
+        with self.client.batch(stop_on_error=True) as batch:
+            for dataset in targets.values():
+                batch.add(f'zfs clone {src}@bench1 {dataset}')
+        props = self._zfs_get(list(targets.values()), 'mountpoint')
+        mounts = {name: props[dataset]['mountpoint']
+                  for name, dataset in targets.items()}
+
+        cmds = {
+            'cp': f'cp -a {src_mnt}/diff {mounts["cp"]}/ && sync',
+            'copydiff': f'zfs copydiff {src}@bench2 {src}@bench1 '
+                        f'{targets["copydiff"]} && sync',
+            'fileclone': f'mkdir -p {mounts["fileclone"]}/diff && rc=0 && '
+                         f'for file in {src_mnt}/diff/*; do '
+                         f'zfileclone $file {mounts["fileclone"]}/diff/'
+                         f'$(basename $file) {fileclone_args} || '
+                         f'{{ rc=1; break; }}; done && [ $rc -eq 0 ] && sync',
+        }
+        results = {}
+        try:
+            with self.client.batch(stop_on_error=True) as batch:
+                for cmd in cmds.values():
+                    batch.add(cmd)
+            for name, result in zip(cmds, batch.results):
+                duration = result.duration
+                results[name] = {
+                    'duration': duration,
+                    'rate': int(total / duration) if duration else None,
+                    'ops_rate':
+                        round(file_count / duration, 1) if duration else None,
+                }
+                LOGGER.info(f'{name}: {duration}s, '
+                            f'{results[name]["rate"]} B/s, '
+                            f'{results[name]["ops_rate"]} files/s')
+        finally:
+            if cleanup:
+                # Tolerant: targets may not exist if setup failed
+                self.client.run_batch(*[f'zfs destroy -r {dataset} '
+                                        f'2>/dev/null; true' for
+                                        dataset in list(targets.values()) +
+                                        [src]])
+            self.invalidate_zdb_index()
+
+        record = dict(self._get_firmware(), time=run_id,
+                      pool=f'zpool{pool_id}', file_count=file_count,
+                      file_size=file_size, bytes=total, results=results)
+        history_file = history_file or os.environ.get(
+            'NAS_BENCH_HISTORY',
+            os.path.expanduser('~/.nas_bench_history.jsonl'))
+        with open(history_file, 'a') as out:
+            out.write(json.dumps(dict(record, benchmark='copydiff_fileclone'))
+                      + '\n')
+        record['file'] = self.client.utils.get_output_path(
+            f'copydiff_fileclone_{file_count}x{file_size}_{run_id}.json')
+        with open(record['file'], 'w') as out:
+            json.dump(record, out, indent=2)
+
+        LOGGER.info(f'Benchmark results appended to {history_file}\n')
+        return record
+
     @keyword('NAS: Utils: Get ZFS metaspace percent')
     def get_zfs_metaspace_percent(self):
         '''
@@ -522,6 +1100,7 @@ class ZFS(object):
 
         cmd = f'zfs destroy {snap_path}'
         self.cli.run(cmd)
+        self.invalidate_zdb_index()
 
         LOGGER.info('ZFS destroy snapshot is successful\n')
         return True
@@ -542,6 +1121,219 @@ class ZFS(object):
         LOGGER.info('ZFS hold snapshot is successful\n')
         return True
 
+    def _get_firmware(self):
+        '''
+        Return {'firmware', 'build'} of NAS, to tag benchmark results
+        '''
+        version, build = self.client.run_batch(
+            'getcfg System Version', 'getcfg System "Build Number"')
+        return {'firmware': version.strip(), 'build': build.strip()}
+
+    def _run_timed_snapshot_ops(self, operation, cmds, counts):
+        '''
+        Run snapshot commands in one round trip, record NAS side latency
+        of every command in snapshot_timings
+
+        Arguments
+        | operation: create / destroy / hold / clone / promote
+        | cmds:      zfs commands
+        | counts:    snapshots handled by each command (None if unknown
+        |            till it runs, e.g. destroy range)
+
+        Return list of timing dicts (one per command)
+        '''
+        with self.client.batch() as batch:
+            for cmd in cmds:
+                batch.add(cmd, check=False)
+        self.invalidate_zdb_index()
+
+        timings = []
+        for result, count in zip(batch.results, counts):
+            if count is None:
+                # `zfs destroy -v` prints one line per destroyed snapshot
+                count = len([line for line in result.output.splitlines()
+                             if line.startswith('will destroy')])
+            per_snapshot = None
+            if result.duration is not None and count:
+                per_snapshot = result.duration / count
+            timings.append({
+                'operation': operation, 'cmd': result.cmd,
+                'exit_code': result.exit_code, 'snapshots': count,
+                'duration': result.duration, 'per_snapshot': per_snapshot})
+            LOGGER.debug(f'{operation} {count} snapshots in '
+                         f'{result.duration}s')
+        self.snapshot_timings.extend(timings)
+
+        failed = [result for result in batch.results if not result.ok]
+        if failed:
+            raise ValueError(f'CMD [{failed[0].cmd}] failed with exit code '
+                             f'{failed[0].exit_code}\n{failed[0].output}')
+        return timings
+
+    @keyword('NAS: Utils: Create ZFS snapshots')
+    def create_zfs_snapshots(self, *data_paths, snap_name='snap', count=1,
+                             recursive=False):
+        '''
+        Create snapshots of many datasets in one round trip
+        - Every round is one atomic `zfs snapshot` of all data_paths
+          (same txg), count rounds are sent as one batch
+        - Snapshot names: snap_name if count is 1, else snap_name1 ..
+          snap_nameN (ready for Destroy ZFS snapshot range)
+
+        Arguments
+        | data_paths: dataset paths (e.g: zpool2/fs1  zpool2/fs2)
+        | snap_name:  snapshot name (prefix if count > 1)
+        | count:      number of snapshots per dataset
+        | recursive:  Boolean, snapshot descendant datasets as well
+
+        Return list of snapshot paths
+        '''
+        LOGGER.info(f'|___Create {count} ZFS snapshots of '
+                    f'{len(data_paths)} datasets___|')
+
+        count = int(count)
+        names = [snap_name] if count == 1 else \
+            [f'{snap_name}{idx}' for idx in range(1, count + 1)]
+        option = '-r ' if recursive else ''
+        rounds = [[f'{path}@{name}' for path in data_paths]
+                  for name in names]
+        self._run_timed_snapshot_ops(
+            'create',
+            [f'zfs snapshot {option}{" ".join(snaps)}' for snaps in rounds],
+            [len(snaps) for snaps in rounds])
+
+        snap_paths = [snap for snaps in rounds for snap in snaps]
+        LOGGER.info(f'{len(snap_paths)} ZFS snapshots created\n')
+        return snap_paths
+
+    @keyword('NAS: Utils: Destroy ZFS snapshot range')
+    def destroy_zfs_snapshot_range(self, *data_paths, first, last,
+                                   recursive=False):
+        '''
+        Destroy snapshots first .. last (by creation order) of many
+        datasets in one round trip, using `zfs destroy <fs>@first%last`
+
+        Arguments
+        | data_paths: dataset paths (e.g: zpool2/fs1  zpool2/fs2)
+        | first:      first snapshot name of range (e.g: snap1)
+        | last:       last snapshot name of range (e.g: snap100)
+        | recursive:  Boolean, destroy range in descendant datasets as well
+
+        Return number of destroyed snapshots
+        '''
+        LOGGER.info(f'|___Destroy ZFS snapshots {first}%{last}___|')
+
+        option = '-r ' if recursive else ''
+        timings = self._run_timed_snapshot_ops(
+            'destroy',
+            [f'zfs destroy -v {option}{path}@{first}%{last}'
+             for path in data_paths],
+            [None] * len(data_paths))
+        destroyed = sum(timing['snapshots'] for timing in timings)
+
+        LOGGER.info(f'{destroyed} ZFS snapshots destroyed\n')
+        return destroyed
+
+    @keyword('NAS: Utils: Hold ZFS snapshots')
+    def hold_zfs_snapshots(self, *snap_paths, tag='keep'):
+        '''
+        Hold many snapshots with one `zfs hold`
+
+        Arguments
+        | snap_paths: snapshot paths
+        | tag:        hold tag
+        '''
+        LOGGER.info(f'|___Hold {len(snap_paths)} ZFS snapshots___|')
+
+        self._run_timed_snapshot_ops(
+            'hold', [f'zfs hold {tag} {" ".join(snap_paths)}'],
+            [len(snap_paths)])
+
+        LOGGER.info('ZFS hold snapshots is successful\n')
+        return True
+
+    @keyword('NAS: Utils: Clone ZFS snapshots')
+    def clone_zfs_snapshots(self, pool_id, *snap_paths, clone_name='clone'):
+        '''
+        Clone many snapshots in one round trip
+
+        Arguments
+        | pool_id:    Storage pool ID
+        | snap_paths: snapshot paths
+        | clone_name: clone name prefix, clones are
+        |             zpool<pool_id>/<clone_name>1 .. N
+
+        Return list of clone paths
+        '''
+        LOGGER.info(f'|___Clone {len(snap_paths)} ZFS snapshots___|')
+
+        clone_paths = [f'zpool{pool_id}/{clone_name}{idx}'
+                       for idx in range(1, len(snap_paths) + 1)]
+        self._run_timed_snapshot_ops(
+            'clone',
+            [f'zfs clone {snap} {clone}'
+             for snap, clone in zip(snap_paths, clone_paths)],
+            [1] * len(snap_paths))
+
+        LOGGER.info(f'Cloned {len(clone_paths)} ZFS snapshots\n')
+        return clone_paths
+
+    @keyword('NAS: Utils: Promote ZFS clones')
+    def promote_zfs_clones(self, *clone_paths):
+        '''
+        Promote many clones in one round trip
+
+        Arguments
+        | clone_paths: ZFS snapshot clone paths
+        '''
+        LOGGER.info(f'|___Promote {len(clone_paths)} ZFS clones___|')
+
+        self._run_timed_snapshot_ops(
+            'promote', [f'zfs promote {clone}' for clone in clone_paths],
+            [1] * len(clone_paths))
+
+        LOGGER.info('ZFS clones promote is successful\n')
+        return True
+
+    @keyword('NAS: Utils: Export ZFS snapshot timings')
+    def export_zfs_snapshot_timings(self, filename='zfs_snapshot_timings.json',
+                                    reset=True):
+        '''
+        Write latency of batched snapshot operations as JSON under
+        ${OUTPUT DIR}, tagged with NAS firmware version and build
+
+        Arguments
+        | filename: JSON file name
+        | reset:    Boolean, clear recorded timings after export
+
+        Return {operation: {'commands', 'snapshots', 'duration',
+                            'per_snapshot'}}
+        '''
+        LOGGER.info('|___Export ZFS snapshot timings___|')
+
+        summary = {}
+        for timing in self.snapshot_timings:
+            op_sum = summary.setdefault(timing['operation'], {
+                'commands': 0, 'snapshots': 0, 'duration': 0.0})
+            op_sum['commands'] += 1
+            op_sum['snapshots'] += timing['snapshots'] or 0
+            op_sum['duration'] += timing['duration'] or 0
+        for op_sum in summary.values():
+            op_sum['per_snapshot'] = op_sum['duration'] / \
+                op_sum['snapshots'] if op_sum['snapshots'] else None
+
+        path = self.client.utils.get_output_path(filename)
+        with open(path, 'w') as out:
+            json.dump(dict(self._get_firmware(), summary=summary,
+                           timings=self.snapshot_timings), out, indent=2)
+        if reset:
+            self.snapshot_timings = []
+
+        for operation, op_sum in summary.items():
+            LOGGER.info(f'{operation}: {op_sum}')
+        LOGGER.info(f'ZFS snapshot timings saved to {path}\n')
+        return summary
+
     @keyword('NAS: Utils: Freeze ZFS pool')
     def freeze_zfs_pool(self, pool_id):
         '''
@@ -555,6 +1347,90 @@ class ZFS(object):
         LOGGER.info('Freeze ZFS pool is successful\n')
         return True
 
+    @keyword('NAS: Utils: Benchmark ZIL replay')
+    def benchmark_zil_replay(self, pool_id, sizes='64M,256M,1G',
+                             replay_modes='on,off', block_size='128K',
+                             timeout=None):
+        '''
+        Measure export / import / ZIL replay time against dirty data size
+        (proxy of NAS boot time after unclean shutdown)
+        - For every size and replay mode: create sync=always dataset,
+          freeze pool (txgs stop syncing, data lives in ZIL only), write
+          size bytes, export pool, then import with -N and mount dataset
+          (ZIL replay happens on mount)
+        - Replay off sets zil_replay_disable, flag is restored to replay
+          on afterwards
+        - Curve is written as JSON and CSV under ${OUTPUT DIR}
+        - zpool freeze needs ZFS debug build
+
+        Arguments
+        | pool_id:      Storage pool ID
+        | sizes:        comma separated dirty data sizes (e.g: 64M,1G)
+        | replay_modes: comma separated on / off
+        | block_size:   write block size
+        | timeout:      seconds to wait pool Ready after import
+
+        Return list of points
+        | [{'size', 'replay', 'export', 'import', 'mount', 'total'}, ..]
+        '''
+        LOGGER.info(f'|___Benchmark ZIL replay zpool{pool_id} [{sizes}]___|')
+
+        zpool_name = f'zpool{pool_id}'
+        data_path = f'{zpool_name}/zilbench'
+        block = parse_size_str(block_size)
+        curve = []
+        try:
+            for size in [val.strip() for val in sizes.split(',')]:
+                count = max(parse_size_str(size) // block, 1)
+                for mode in [val.strip() for val in replay_modes.split(',')]:
+                    self.cli.run(f'zfs destroy -r {data_path} 2>/dev/null; '
+                                 f'true')
+                    self.create_zfs_datapath(pool_id, 'zilbench',
+                                             sync='always')
+                    mount = self._zfs_get(
+                        data_path, 'mountpoint')[data_path]['mountpoint']
+                    self.set_zil_replay_disable_flag(enable=(mode == 'on'))
+                    self.freeze_zfs_pool(pool_id)
+
+                    self.cli.run(f'dd if=/dev/urandom of={mount}/dirty '
+                                 f'bs={block} count={count} 2>&1')
+                    with self.client.batch(stop_on_error=True) as batch:
+                        batch.add(f'zpool export {zpool_name}')
+                        batch.add(f'zpool import -f -N {zpool_name}')
+                        batch.add(f'zfs mount {data_path}')
+                    self.invalidate_zdb_index()
+                    self.client.utils.check_expected_pool(
+                        pool_id, expected_status='Ready', timeout=timeout)
+
+                    export, imp, mnt = [result.duration
+                                        for result in batch.results]
+                    point = {'size': size, 'bytes': count * block,
+                             'replay': mode, 'export': export,
+                             'import': imp, 'mount': mnt,
+                             'total': sum(val for val in (export, imp, mnt)
+                                          if val is not None)}
+                    curve.append(point)
+                    LOGGER.info(f'{size} replay {mode}: export {export}s, '
+                                f'import {imp}s, mount {mnt}s')
+        finally:
+            self.set_zil_replay_disable_flag(enable=True)
+            self.cli.run(f'zfs destroy -r {data_path} 2>/dev/null; true')
+            self.invalidate_zdb_index()
+
+        prefix = f'{zpool_name}_zil_replay_{int(time.time())}'
+        with open(self.client.utils.get_output_path(f'{prefix}.json'),
+                  'w') as out:
+            json.dump(dict(self._get_firmware(), curve=curve), out, indent=2)
+        with open(self.client.utils.get_output_path(f'{prefix}.csv'), 'w',
+                  newline='') as out:
+            writer = csv.DictWriter(out, fieldnames=list(curve[0]) if curve
+                                    else ['size'])
+            writer.writeheader()
+            writer.writerows(curve)
+
+        LOGGER.info(f'ZIL replay curve saved as {prefix}.json / .csv\n')
+        return curve
+
     @keyword('NAS: Utils: Get zpool vdev disks')
     def get_zpool_vdev_disks(self, zpool):
         '''
@@ -565,9 +1441,8 @@ class ZFS(object):
         '''
         LOGGER.info('|___Get zpool vdev disks___|')
 
-        ret = self.cli.run(f'zpool status {zpool}')
-        disks = [line.split()[0] for line in ret.splitlines() if
-                 'disk_0x' in line and len(line) > 0]
+        status = self._get_zpool_status(zpool)
+        disks = [name for name in status.devices() if 'disk_0x' in name]
 
         LOGGER.info(f'Retrieved vdev disks: {disks}\n')
         return disks
@@ -598,6 +1473,8 @@ class ZFS(object):
         vdev_names = ' '.join([f'{vd}3' for vd in vdev_list])
         cmd = f'zpool create -f {zpool_name} {vdev_names}'
         self.cli.run(cmd)
+        self.client.utils.invalidate_storage_info()
+        self.invalidate_zdb_index()
 
         LOGGER.info(f'zpool {zpool_name} created successfully!\n')
         return True
@@ -609,18 +1486,138 @@ class ZFS(object):
         '''
         LOGGER.info(f'|___Destroy zpool {zpool_name}___|')
 
-        zpool_status = self.cli.run('zpool status')
+        zpool_status = parse_zpool_status(self.cli.run('zpool status'))
 
         # Destroys zpool only if its info exists in zpool status
         if zpool_name in zpool_status:
             cmd = f'zpool destroy {zpool_name}'
             self.cli.run(cmd)
+            self.invalidate_zdb_index()
 
         LOGGER.info(f'zpool {zpool_name} is deleted successfully!\n')
         return True
 
+    def _zfs_get(self, datasets, properties='all', recursive=False,
+                 source=False, parsable=True):
+        '''
+        Query properties of several datasets with one `zfs get`
+        - Values are parsable (-p) by default: sizes in bytes, times in
+          epoch
+
+        Arguments
+        | datasets:   dataset path or list of paths
+        | properties: property name or list of names (default all)
+        | recursive:  Boolean, include descendant datasets
+        | source:     Boolean, return (value, source) instead of value
+        | parsable:   Boolean, False for human readable values (e.g. 8K)
+
+        Return {dataset: {property: value}}
+        '''
+        if isinstance(datasets, str):
+            datasets = [datasets]
+        if isinstance(properties, str):
+            properties = [properties]
+
+        cmd = f'zfs get -H {"-p " if parsable else ""}' \
+              f'{"-r " if recursive else ""}' \
+              f'-o name,property,value,source {",".join(properties)} ' \
+              f'{" ".join(datasets)}'
+        out = self.cli.run(cmd)
+        # Example output (tab separated)
+        # zpool2/dataset1	casesensitivity	insensitive	-
+        # zpool2/dataset1	volblocksize	8192	default
+
+        props = {}
+        for line in out.splitlines():
+            fields = line.split('\t')
+            if len(fields) != 4:
+                continue
+            name, prop, value, src = fields
+            props.setdefault(name, {})[prop] = \
+                (value, src) if source else value
+        return props
+
+    @keyword('NAS: Utils: Get dataset properties')
+    def get_dataset_properties(self, *datasets, properties='all',
+                               recursive=False):
+        '''
+        Get properties of many datasets in one round trip
+
+        Arguments
+        | datasets:   dataset paths (e.g: zpool2/fs1  zpool2/fs2)
+        | properties: comma separated names (e.g: utf8only,normalization)
+        | recursive:  Boolean, include descendant datasets
+
+        Return {dataset: {property: value}}, values are parsable
+        (sizes in bytes)
+        '''
+        LOGGER.info(f'|___Get dataset properties [{properties}]___|')
+
+        if isinstance(properties, str):
+            properties = [prop.strip() for prop in properties.split(',')]
+        props = self._zfs_get(list(datasets), properties, recursive)
+
+        LOGGER.info(f'Got properties of {len(props)} datasets\n')
+        return props
+
+    @staticmethod
+    def _normalize_prop_value(value):
+        '''
+        Compare sizes as bytes (8K == 8192), other values case-insensitively
+        '''
+        value = str(value).strip()
+        match = re.match(r'^([\d.]+)([KMGTPE]?)$', value, re.IGNORECASE)
+        if match:
+            return str(parse_size(*match.groups()))
+        return value.lower()
+
+    @keyword('NAS: Utils: Check dataset properties')
+    def check_dataset_properties(self, *datasets, recursive=False,
+                                 **expected):
+        '''
+        Assert several properties of several datasets with one `zfs get`
+        - All mismatches are reported together
+
+        Arguments
+        | datasets:  dataset paths (e.g: zpool2/fs1  zpool2/fs2)
+        | recursive: Boolean, check descendant datasets as well
+        | expected:  property=value pairs
+        |            (e.g: utf8only=on  casesensitivity=insensitive
+        |            recordsize=128K)
+
+        Example
+        | NAS: Utils: Check dataset properties  zpool2/fs1  zpool2/fs2
+        | ...  utf8only=on  normalization=formD
+        '''
+        LOGGER.info(f'|___Check dataset properties {expected}___|')
+
+        if not expected:
+            raise ValueError('No expected property given!')
+        props = self._zfs_get(list(datasets), list(expected), recursive)
+
+        errors = []
+        for dataset in (props if recursive else datasets):
+            values = props.get(dataset)
+            if values is None:
+                errors.append(f'{dataset}: not found')
+                continue
+            for prop, want in expected.items():
+                got = values.get(prop)
+                if got is None or self._normalize_prop_value(got) != \
+                        self._normalize_prop_value(want):
+                    errors.append(f'{dataset}: {prop} expected {want} '
+                                  f'but got {got}')
+        if errors:
+            raise ValueError('Dataset property mismatch:\n' +
+                             '\n'.join(errors))
+
+        LOGGER.info(f'Expected properties found on {len(props)} '
+                    f'datasets\n')
+        return True
+
     @keyword('NAS: Utils: Get dataset property value')
-    def get_dataset_property_value(self, datapath, check_property='type'):
+    def get_dataset_property_value(self, datapath, check_property='type',
+                                   parsable=False):
         '''
         Lib to get dataset property value
 
@@ -628,21 +1625,16 @@ class ZFS(object):
         | datapath: zfs dataset path
         | check_property: zfs dataset property value to be fetched (e.g: utf-8,
         |           case-sensitivity, normalization.)
+        | parsable: Boolean, return exact value (bytes, epoch) instead of
+        |           human readable one (e.g: 8K)
         '''
         LOGGER.info(f'|___Fetch dataset property {check_property} value___|')
 
-        cmd = f'zfs get {check_property} {datapath}'
-        out = self.cli.run(cmd)
-        # Example output
-        # NAME             PROPERTY         VALUE        SOURCE
-        # zpool2/dataset1  casesensitivity  insensitive  -
-
-        # Get VALUE from the output
-        lines = out.strip().split('\n')
-        keys = lines[0].split()
-        values = lines[1].split()
-        index = keys.index('VALUE')
-        value = values[index]
+        props = self._zfs_get(datapath, check_property, parsable=parsable)
+        value = props.get(datapath, {}).get(check_property)
+        if value is None:
+            raise ValueError(f'Property {check_property} of {datapath} '
+                             f'not found: {props}')
 
         LOGGER.info(f'Dataset property {check_property}: {value}\n')
         return value
@@ -661,6 +1653,7 @@ class ZFS(object):
         data_path = f'{zpool_name}/{dataset}'
         cmd = f'zfs create {options} {data_path}'
         self.cli.run(cmd)
+        self.invalidate_zdb_index()
 
         LOGGER.info(f'Dataset created on {data_path}\n')
         return data_path
@@ -682,17 +1675,21 @@ class ZFS(object):
         return True
 
     @keyword('NAS: Utils: Rollback ZFS snapshot')
-    def rollback_zfs_snapshot(self, snap_path):
+    def rollback_zfs_snapshot(self, snap_path, recursive=False):
         '''
         Lib to rollback ZFS snapshot
 
         Arguments:
         | snap_path: ZFS snapshot path
+        | recursive: Boolean (True|False)
+        |            Set True to destroy snapshots newer than snap_path
+        |            (needed if snap_path is not the latest snapshot)
         '''
         LOGGER.info('|___Rollback ZFS snapshot___|')
 
-        cmd = f'zfs rollback {snap_path}'
+        cmd = f'zfs rollback {"-r " if recursive else ""}{snap_path}'
         self.cli.run(cmd)
+        self.invalidate_zdb_index()
 
         LOGGER.info('ZFS rollback snapshot is successful\n')
         return True
@@ -710,10 +1707,105 @@ class ZFS(object):
 
         cmd = f'zfs send {snap_file} | zfs recv {to_path}'
         out = self.cli.run(cmd)
+        self.invalidate_zdb_index()
 
         LOGGER.info(f'ZFS send and recv status: {out}\n')
         return True
 
+    @keyword('NAS: Utils: Benchmark ZFS send recv')
+    def benchmark_zfs_send_recv(self, snapshot, target, from_snap=None,
+                                raw=False, streams=1, timeout=3600,
+                                cleanup=True, export=True):
+        '''
+        Measure `zfs send | zfs recv` throughput
+        - Progress of `zfs send -P -v` is streamed, bytes/s is reported end
+          to end and per phase (setup / streaming / finish)
+        - streams > 1 runs that many sends of the same snapshot in
+          parallel into <target>_1 .. <target>_N, to compare single and
+          multi stream throughput of the pool
+
+        Arguments
+        | snapshot:  snapshot to send (e.g: zpool2/fs@snap2)
+        | target:    dataset to receive into (e.g: zpool2/recv)
+        | from_snap: incremental source (zfs send -i), received target
+        |            must already hold it
+        | raw:       Boolean, raw send (zfs send -w)
+        | streams:   number of parallel send / recv pipelines
+        | timeout:   max seconds to wait all streams
+        | cleanup:   Boolean, destroy received datasets afterwards (full
+        |            sends only)
+        | export:    Boolean, write result JSON under ${OUTPUT DIR}
+
+        Return:
+        | {'streams', 'bytes', 'duration', 'rate', 'results': [..], 'file'}
+        '''
+        LOGGER.info(f'|___Benchmark ZFS send recv {snapshot} x{streams}___|')
+
+        streams = int(streams)
+        targets = [target] if streams == 1 else \
+            [f'{target}_{idx}' for idx in range(1, streams + 1)]
+        jobs = [SendRecvStream(self.client, snapshot, dst,
+                               from_snap=from_snap, raw=raw)
+                for dst in targets]
+
+        start_time = time.time()
+        try:
+            for job in jobs:
+                job.start()
+            wait_until(
+                lambda: all(job.finished for job in jobs), timeout,
+                interval=2, name='zfs send recv',
+                pending=lambda _: LOGGER.debug(
+                    'Sent ' + ', '.join(
+                        f'{job.samples[-1][1] if job.samples else 0}'
+                        f'/{job.estimate}' for job in jobs)))
+        finally:
+            for job in jobs:
+                job.stop()
+        duration = time.time() - start_time
+        self.invalidate_zdb_index()
+
+        results = [job.result() for job in jobs]
+        total = sum(result['bytes'] for result in results)
+        summary = {
+            'snapshot': snapshot,
+            'from_snap': from_snap,
+            'raw': raw,
+            'streams': streams,
+            'bytes': total,
+            'duration': round(duration, 2),
+            'rate': int(total / duration) if duration > 0 else None,
+            'results': results,
+            'file': None,
+        }
+        for result in results:
+            LOGGER.info(f'{result["target"]}: {result["bytes"]} bytes in '
+                        f'{result["duration"]}s ({result["rate"]} B/s), '
+                        f'phases {result["phases"]}')
+
+        if export:
+            name = snapshot.replace('/', '_').replace('@', '_')
+            summary['file'] = self.client.utils.get_output_path(
+                f'sendrecv_{name}_x{streams}_{int(start_time)}.json')
+            with open(summary['file'], 'w') as out:
+                json.dump(summary, out, indent=2)
+
+        if cleanup and not from_snap:
+            # Tolerant: target of a failed recv may not exist
+            self.client.run_batch(*[f'zfs destroy -r {dst} 2>/dev/null; true'
+                                    for dst in targets])
+            self.invalidate_zdb_index()
+
+        failed = [result for result in results if result['exit_code'] != 0]
+        if failed:
+            raise ValueError(f'zfs send recv into {failed[0]["target"]} '
+                             f'failed (exit code {failed[0]["exit_code"]}):'
+                             f'\n{failed[0]["output"]}')
+
+        LOGGER.info(f'{streams} streams: {total} bytes in '
+                    f'{summary["duration"]}s ({summary["rate"]} B/s)\n')
+        return summary
+
     @keyword('NAS: Utils: Get richacl of file')
     def get_richacl_of_file(self, filename):
         '''
@@ -842,8 +1934,8 @@ class ZFS(object):
         '''
         LOGGER.info('|___Get ZFS dataset blocksize___|')
 
-        size = self.cli.run(f'zfs get all {dataset} '
-                            f'| grep volblocksize').split()[-2]
+        size = self.get_dataset_property_value(
+            dataset, check_property='volblocksize')
         block_size = tool.tool.conv_to_basesize(size)
 
         LOGGER.info(f'Blocksize of dataset: {block_size}\n')
@@ -871,13 +1963,8 @@ class ZFS(object):
         '''
         LOGGER.info('|___Get Dataset Paths with ignore string___|')
 
-        cmd = (f"zdb -d zpool{pool_id} | grep -v {ignore_str} "
-               "| grep -v init | grep -n ZVOL | awk '{print $2}'")
-        path = self.cli.run(cmd).strip()
-        if not path:
-            cmd = (f"zdb -d zpool{pool_id} | grep -v {ignore_str} "
-                   "| grep -v init | grep -n ZPL | awk '{print $2}'")
-            path = self.cli.run(cmd).strip()
+        path = '\n'.join(data['name'] for data in self._query_zdb_index(
+            pool_id, ignore_str=ignore_str))
 
         LOGGER.info(f'Dataset path [{path}]\n')
         return path
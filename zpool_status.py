@@ -0,0 +1,305 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import re
+
+# Header line of `zpool status`, e.g. "  pool: zpool2", " state: ONLINE"
+HEADER_RE = re.compile(r'^\s*([a-z]+): ?(.*)$')
+# Error counter, e.g. 0 / 12 / 1.5K
+COUNTER_RE = re.compile(r'^(\d+(?:\.\d+)?)([KMGT]?)$')
+COUNTER_UNITS = {'': 1, 'K': 10**3, 'M': 10**6, 'G': 10**9, 'T': 10**12}
+
+
+def parse_counter(value):
+    '''
+    Convert READ / WRITE / CKSUM column into int (1.5K -> 1500)
+    '''
+    match = COUNTER_RE.match(value)
+    if not match:
+        return None
+    return int(float(match.group(1)) * COUNTER_UNITS[match.group(2)])
+
+
+class VdevNode(object):
+    '''
+    One line of config section (pool, raid vdev, disk, spares, ...)
+    '''
+
+    def __init__(self, name, state=None, read=None, write=None, cksum=None,
+                 note='', depth=0):
+        self.name = name
+        self.state = state
+        self.read = read
+        self.write = write
+        self.cksum = cksum
+        self.note = note
+        self.depth = depth
+        self.children = []
+
+    @property
+    def is_leaf(self):
+        return not self.children
+
+    def walk(self):
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+    def to_dict(self):
+        return {
+            'name': self.name, 'state': self.state, 'read': self.read,
+            'write': self.write, 'cksum': self.cksum, 'note': self.note,
+            'children': [child.to_dict() for child in self.children],
+        }
+
+    def __repr__(self):
+        return (f'VdevNode({self.name}, {self.state}, '
+                f'{self.read}/{self.write}/{self.cksum})')
+
+
+class ZpoolStatus(object):
+    '''
+    Parsed `zpool status <pool>` output of one pool
+
+    - headers: every "key: value" section (multi-line values joined by \\n)
+    - state / scan / errors: shortcuts of headers
+    - vdevs: config tree roots (pool itself, then logs / cache / spares)
+    '''
+
+    def __init__(self, name):
+        self.name = name
+        self.headers = {}
+        self.vdevs = []
+
+    @property
+    def state(self):
+        return self.headers.get('state')
+
+    @property
+    def scan(self):
+        return self.headers.get('scan', '')
+
+    @property
+    def errors(self):
+        return self.headers.get('errors')
+
+    @property
+    def scan_in_progress(self):
+        return 'in progress' in self.scan
+
+    @property
+    def scan_finished(self):
+        '''
+        True if last scrub / resilver completed (or was canceled)
+        '''
+        first = self.scan.split('\n')[0]
+        return bool(first) and not self.scan_in_progress and \
+            first.strip() != 'none requested'
+
+    def devices(self):
+        '''
+        Return {name: VdevNode} of every config line
+        '''
+        return {node.name: node for root in self.vdevs
+                for node in root.walk()}
+
+    def leaves(self):
+        return [node for node in self.devices().values() if node.is_leaf]
+
+    def device(self, name):
+        '''
+        Find device by exact name, fall back to unique prefix / substring
+        (e.g. disk_0x1 matches disk_0x1_5000C500A1B2C3D4)
+        '''
+        devices = self.devices()
+        if name in devices:
+            return devices[name]
+        found = [node for dev, node in devices.items() if name in dev]
+        if len(found) != 1:
+            raise ValueError(f'Device [{name}] not unique / not found in '
+                             f'{self.name}: {list(devices)}')
+        return found[0]
+
+    def to_dict(self):
+        return {
+            'name': self.name, 'headers': dict(self.headers),
+            'vdevs': [root.to_dict() for root in self.vdevs],
+        }
+
+
+def _parse_config(lines, status):
+    stack = []
+    base_indent = None
+    for line in lines:
+        if not line.strip():
+            continue
+        fields = line.split()
+        if fields[:2] == ['NAME', 'STATE']:
+            continue
+
+        indent = len(line.expandtabs(8)) - len(line.expandtabs(8).lstrip())
+        if base_indent is None:
+            base_indent = indent
+        depth = max(indent - base_indent, 0) // 2
+
+        node = VdevNode(fields[0], depth=depth)
+        if len(fields) > 1:
+            node.state = fields[1]
+        if len(fields) >= 5:
+            counters = [parse_counter(val) for val in fields[2:5]]
+            if None not in counters:
+                node.read, node.write, node.cksum = counters
+                node.note = ' '.join(fields[5:])
+            else:
+                node.note = ' '.join(fields[2:])
+        else:
+            node.note = ' '.join(fields[2:])
+
+        while stack and stack[-1].depth >= depth:
+            stack.pop()
+        if stack:
+            stack[-1].children.append(node)
+        else:
+            status.vdevs.append(node)
+        stack.append(node)
+
+
+def parse_zpool_status(output):
+    '''
+    Parse `zpool status [pool]` output
+
+    Return {pool name: ZpoolStatus} (empty if no pools)
+    '''
+    pools = {}
+    status = None
+    key = None
+    config_lines = None
+
+    for line in output.splitlines():
+        match = HEADER_RE.match(line)
+        if match and not line.startswith(('\t', '        ')):
+            key, value = match.groups()
+            if key == 'pool':
+                if status is not None and config_lines is not None:
+                    _parse_config(config_lines, status)
+                status = ZpoolStatus(value.strip())
+                pools[status.name] = status
+                config_lines = None
+            if status is None:
+                continue
+            if key == 'config':
+                config_lines = []
+                continue
+            if config_lines is not None:
+                _parse_config(config_lines, status)
+                config_lines = None
+            status.headers[key] = value.strip()
+            continue
+
+        if status is None:
+            continue
+        if config_lines is not None:
+            config_lines.append(line)
+        elif key and line.strip():
+            # Continuation of multi-line header value (status / scan)
+            status.headers[key] = \
+                f'{status.headers.get(key, "")}\n{line.strip()}'.strip()
+
+    if status is not None and config_lines is not None:
+        _parse_config(config_lines, status)
+    return pools
+
+
+def diff_zpool_status(old, new):
+    '''
+    Compare two ZpoolStatus samples
+
+    Return list of changes
+    | ('state', old, new)
+    | ('scan', old, new)
+    | ('errors', old, new)
+    | ('device', name, field, old, new)   field: state/read/write/cksum
+    '''
+    changes = []
+    for key in ('state', 'scan', 'errors'):
+        old_val = old.headers.get(key) if old else None
+        new_val = new.headers.get(key)
+        if old_val != new_val:
+            changes.append((key, old_val, new_val))
+
+    old_devs = old.devices() if old else {}
+    for name, node in new.devices().items():
+        prev = old_devs.get(name)
+        for field in ('state', 'read', 'write', 'cksum'):
+            old_val = getattr(prev, field) if prev else None
+            new_val = getattr(node, field)
+            if old_val != new_val:
+                changes.append(('device', name, field, old_val, new_val))
+    for name in set(old_devs) - set(new.devices()):
+        changes.append(('device', name, 'state', old_devs[name].state, None))
+    return changes
+
+
+SIZE_RE = r'([\d.]+)([KMGTPE]?)i?B?'
+SIZE_UNITS = {'': 1, 'K': 2**10, 'M': 2**20, 'G': 2**30, 'T': 2**40,
+              'P': 2**50, 'E': 2**60}
+SCAN_FIELDS = {
+    'scanned': re.compile(SIZE_RE + r' scanned'),
+    'issued': re.compile(SIZE_RE + r' issued'),
+    'total': re.compile(SIZE_RE + r' total|scanned out of ' + SIZE_RE),
+    'processed': re.compile(SIZE_RE + r' (?:repaired|resilvered),'),
+}
+PERCENT_RE = re.compile(r'([\d.]+)% done')
+
+
+def parse_size(number, unit=''):
+    '''
+    Convert zfs size (e.g. 1.23G) into bytes
+    '''
+    return int(float(number) * SIZE_UNITS[unit.upper()])
+
+
+def parse_size_str(value):
+    '''
+    Convert size string (e.g. 128K, 1G, 5GB) into bytes
+    '''
+    match = re.match(f'^{SIZE_RE}$', str(value).strip().upper())
+    if not match:
+        raise ValueError(f'Invalid size [{value}]')
+    return parse_size(*match.groups())
+
+
+def parse_scan_progress(scan):
+    '''
+    Parse scan section of zpool status
+
+    Return dict
+    | function:  scrub / resilver / None
+    | state:     in progress / finished / canceled / none
+    | scanned / issued / total / processed: bytes (None if not shown)
+    |            processed = repaired (scrub) or resilvered bytes
+    | percent:   float (None if not shown)
+    '''
+    first = scan.split('\n')[0]
+    progress = {
+        'function': next((func for func in ('scrub', 'resilver')
+                          if first.startswith(func)), None),
+        'state': 'none',
+        'percent': None,
+    }
+    if 'in progress' in first:
+        progress['state'] = 'in progress'
+    elif 'canceled' in first:
+        progress['state'] = 'canceled'
+    elif progress['function']:
+        progress['state'] = 'finished'
+
+    for key, regex in SCAN_FIELDS.items():
+        match = regex.search(scan)
+        progress[key] = None
+        if match:
+            groups = [grp for grp in match.groups() if grp is not None]
+            progress[key] = parse_size(*groups[:2])
+    match = PERCENT_RE.search(scan)
+    if match:
+        progress['percent'] = float(match.group(1))
+    return progress